@@ -4,5 +4,7 @@ set -o errexit
 pip install -r server/requirements.txt
 
 cd server
+# Hashed names + .gz/.br copies, served as immutable by WhiteNoise
 python manage.py collectstatic --no-input
+echo "Brotli files: $(find staticfiles -name '*.br' | wc -l)"
 python manage.py migrate
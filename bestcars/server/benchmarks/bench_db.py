@@ -0,0 +1,112 @@
+"""Requests/sec and "database is locked" errors on SQLite, with and without
+the connection settings (persistent connections + SQLITE_PRAGMAS).
+
+Each run uses a fresh SQLite file; workers (threads, or processes as with
+gunicorn) replay a read/write mix through the test Client (reads: a review
+page, writes: add_review):
+
+    cd server && python -m benchmarks.bench_db --workers 8 --processes --requests 200 --write-ratio 0.3
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.support import no_rate_limits, setup_django, test_database
+
+
+def run_mix(workers, requests, write_ratio, users, dealer_ids, processes=False):
+    """Run the mix in `workers` threads, or forked processes (like gunicorn workers)."""
+    import multiprocessing
+    from django.db import connection
+    from django.test import Client
+
+    results = multiprocessing.get_context("fork").SimpleQueue()
+
+    def worker(n):
+        client = Client()
+        client.force_login(users[n % len(users)])
+        rng = random.Random(n)
+        ok = err = busy = 0
+        try:
+            for _ in range(requests):
+                dealer = rng.choice(dealer_ids)
+                if rng.random() < write_ratio:
+                    res = client.post("/djangoapp/add_review", content_type="application/json",
+                                      data=json.dumps({"dealership": dealer, "review": "Great staff"}))
+                    body = res.json()
+                    if body.get("status") == 200:
+                        ok += 1
+                    else:
+                        err += 1
+                        busy += "locked" in body.get("message", "")
+                else:
+                    res = client.get(f"/djangoapp/reviews/dealer/{dealer}?limit=20")
+                    ok += res.status_code == 200
+                    err += res.status_code != 200
+        finally:
+            connection.close()
+            results.put((ok, err, busy))
+
+    if processes:
+        spawn = multiprocessing.get_context("fork").Process
+    else:
+        spawn = threading.Thread
+    start = time.perf_counter()
+    pool = [spawn(target=worker, args=(n,)) for n in range(workers)]
+    for p in pool:
+        p.start()
+    for p in pool:
+        p.join()
+    elapsed = time.perf_counter() - start
+    ok, err, busy = (sum(col) for col in zip(*(results.get() for _ in pool)))
+    return {"rps": round((ok + err) / elapsed, 1), "ok": ok, "errors": err, "locked": busy,
+            "seconds": round(elapsed, 2)}
+
+
+def bench(label, pragmas, conn_max_age, options, args):
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from benchmarks.datagen import generate
+
+    settings.SQLITE_PRAGMAS = pragmas
+    settings.SLOW_REQUEST_MS = 0
+    connection.settings_dict["CONN_MAX_AGE"] = conn_max_age
+    connection.settings_dict["OPTIONS"] = options
+    with tempfile.TemporaryDirectory() as tmp:
+        # A file database: the in-memory test database has no locking to measure.
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        with no_rate_limits(), test_database():
+            generate(dealers=50, reviews=5000)
+            users = [User.objects.create_user(f"bench{i}", password="x") for i in range(args.workers)]
+            dealer_ids = list(range(1, 51))
+            connection.close()  # each thread opens its own; reopen with the settings under test
+            result = run_mix(args.workers, args.requests, args.write_ratio, users, dealer_ids, args.processes)
+    print(f"{label:<34} {result['rps']:8.1f} req/s  {result['errors']:5d} errors "
+          f"({result['locked']} database is locked)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--processes", action="store_true", help="Fork workers instead of threads.")
+    parser.add_argument("--requests", type=int, default=200, help="per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    tuned = dict(settings.SQLITE_PRAGMAS)
+    options = dict(settings.DATABASES["default"].get("OPTIONS", {}))
+    bench("before: no pragmas, CONN_MAX_AGE=0", {}, 0, {}, args)
+    bench("after: pragmas + persistent", tuned, settings.DB_CONN_MAX_AGE, options, args)
+
+
+if __name__ == "__main__":
+    main()
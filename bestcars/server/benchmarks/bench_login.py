@@ -0,0 +1,81 @@
+"""Logins/sec per core and authenticated-request cost, per password hasher and
+session engine.
+
+Single process, so req/s is per core; multiply by the worker count for a
+server estimate:
+
+    cd server && python -m benchmarks.bench_login --logins 50 --requests 500
+"""
+import argparse
+import importlib.util
+import json
+import time
+
+from benchmarks.support import no_rate_limits, setup_django, test_database
+
+HASHERS = {
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "argon2": "djangoapp.hashers.Argon2PasswordHasher",
+}
+ENGINES = ["db", "cached_db", "signed_cookies"]
+
+
+def bench_logins(n):
+    from django.test import Client
+    body = json.dumps({"userName": "bench", "password": "bench-pass"})
+    start = time.perf_counter()
+    for _ in range(n):
+        Client().post("/djangoapp/login", content_type="application/json", data=body)
+    return n / (time.perf_counter() - start)
+
+
+def bench_requests(n):
+    """Authenticated requests that only touch the session and the user."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    client = Client()
+    client.post("/djangoapp/login", content_type="application/json",
+                data=json.dumps({"userName": "bench", "password": "bench-pass"}))
+    client.post("/djangoapp/add_reviews_bulk", content_type="application/json", data="x")  # warm up
+    with CaptureQueriesContext(connection) as ctx:
+        start = time.perf_counter()
+        for _ in range(n):
+            client.post("/djangoapp/add_reviews_bulk", content_type="application/json", data="x")
+        elapsed = time.perf_counter() - start
+    return n / elapsed, len(ctx.captured_queries) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.test.utils import override_settings
+
+    settings.SLOW_REQUEST_MS = 0
+    with no_rate_limits(), test_database():
+        print(f"{'hasher':<8} {'sessions':<15} {'logins/s':>9} {'auth req/s':>11} {'queries/req':>12}")
+        for name, hasher in HASHERS.items():
+            if name == "argon2" and importlib.util.find_spec("argon2") is None:
+                print(f"{name:<8} (argon2-cffi not installed)")
+                continue
+            with override_settings(PASSWORD_HASHERS=[hasher]):
+                User.objects.filter(username="bench").delete()
+                User.objects.create_user("bench", password="bench-pass")
+                for engine in ENGINES:
+                    with override_settings(SESSION_ENGINE=f"django.contrib.sessions.backends.{engine}"):
+                        cache.clear()
+                        logins = bench_logins(args.logins)
+                        rps, queries = bench_requests(args.requests)
+                    print(f"{name:<8} {engine:<15} {logins:9.1f} {rps:11.1f} {queries:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare the compiled sentiment engine with the original substring scan.
+
+    cd server && python -m benchmarks.bench_sentiment --n 20000
+"""
+import argparse
+import random
+import time
+
+from djangoapp.sentiment import engine
+
+
+def legacy_analyze_sentiment(text):
+    """analyze_sentiment as it was in views.py before the engine replaced it."""
+    if not text:
+        return "neutral"
+    positive = ["great","excellent","amazing","fantastic","wonderful","good","best",
+                "love","perfect","outstanding","superb","awesome","happy","satisfied",
+                "recommend","helpful","friendly","clean","fast","professional","honest"]
+    negative = ["bad","terrible","horrible","awful","worst","hate","poor","disappointing",
+                "unhappy","rude","slow","overpriced","broken","failed","waste","problem",
+                "issue","dishonest","unprofessional","scam","angry","frustrated"]
+    t = text.lower()
+    pos = sum(1 for w in positive if w in t)
+    neg = sum(1 for w in negative if w in t)
+    if pos > neg:
+        return "positive"
+    elif neg > pos:
+        return "negative"
+    return "neutral"
+
+
+WORDS = ("the a and was we our my dealer staff car truck price service visit deal "
+         "financing sales trade office paperwork test drive week day manager salesman "
+         "great good not rude slow friendly terrible helpful never overpriced fast").split()
+
+
+def make_texts(n, length=40, seed=1):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(length)) for _ in range(n)]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=10000, help="number of review texts")
+    parser.add_argument("--length", type=int, default=40, help="words per text")
+    args = parser.parse_args()
+
+    texts = make_texts(args.n, args.length)
+    legacy = timed(lambda: [legacy_analyze_sentiment(t) for t in texts])
+    single = timed(lambda: [engine.analyze(t) for t in texts])
+    batch = timed(lambda: engine.analyze_batch(texts))
+    for name, seconds in (("legacy substring scan", legacy), ("engine.analyze", single),
+                          ("engine.analyze_batch", batch)):
+        print(f"{name:<22} {seconds * 1000:9.1f} ms  {args.n / seconds:12.0f} texts/s")
+
+
+if __name__ == "__main__":
+    main()
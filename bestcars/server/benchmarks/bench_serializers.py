@@ -0,0 +1,59 @@
+"""Compare Model.to_dict serialization with the values_list() serializers.
+
+    cd server && python -m benchmarks.bench_serializers --rows 100000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.support import setup_django, test_database
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.serializers.json import DjangoJSONEncoder
+    from djangoapp import serializers
+    from djangoapp.models import Dealer, Review
+
+    with test_database():
+        dealers = [Dealer(full_name=f"Dealer {i}", short_name=f"D{i}", address=f"{i} Main St",
+                          city="Austin", state="Texas", st="TX", zip_code="73301",
+                          lat=30 + i % 100 / 100, lng=-97 - i % 100 / 100) for i in range(args.rows)]
+        for dealer in dealers:
+            dealer.normalize()
+        Dealer.objects.bulk_create(dealers, batch_size=5000)
+        first = Dealer.objects.order_by("id").first()
+        Review.objects.bulk_create([Review(dealer=first, name=f"Reviewer {i}", review="Good service",
+                                           car_make="Toyota", car_model="Camry", car_year=2022)
+                                    for i in range(args.rows)], batch_size=5000)
+
+        cases = [
+            ("dealers  to_dict + json", lambda: json.dumps(
+                [d.to_dict() for d in Dealer.objects.all()], cls=DjangoJSONEncoder)),
+            ("dealers  values_list + dumps", lambda: serializers.dumps(
+                list(serializers.serializer("dealer").rows(Dealer.objects.all())))),
+            ("dealers  fields=id,full_name,city", lambda: serializers.dumps(
+                list(serializers.serializer("dealer", "id,full_name,city").rows(Dealer.objects.all())))),
+            ("reviews  to_dict + json", lambda: json.dumps(
+                [r.to_dict() for r in Review.objects.all()], cls=DjangoJSONEncoder)),
+            ("reviews  values_list + dumps", lambda: serializers.dumps(
+                list(serializers.serializer("review").rows(Review.objects.all())))),
+        ]
+        print(f"{args.rows} rows, encoder: {'orjson' if serializers.orjson else 'stdlib json'}")
+        for name, fn in cases:
+            seconds, body = timed(fn)
+            print(f"{name:<36} {seconds * 1000:9.1f} ms  {len(body) / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
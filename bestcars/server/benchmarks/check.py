@@ -0,0 +1,85 @@
+"""Compare a benchmark results file with the stored baseline; exit 1 on regression.
+
+    cd server && python -m benchmarks.check micro.json
+    python -m benchmarks.check micro.json --update      # accept the results as the new baseline
+
+A case regresses when its p95 exceeds the baseline p95 times the tolerance
+(timings vary between machines, hence the slack) or when it runs more SQL
+queries than the baseline (query counts are exact). Cases missing from either
+side are reported but do not fail the check. Works with the JSON written by
+benchmarks.micro (--json-out) and by benchmarks.loadtest (--json-out).
+"""
+import argparse
+import json
+import os
+import sys
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_TOLERANCE = 2.0
+
+
+def load_results(path):
+    with open(path) as f:
+        data = json.load(f)
+    # micro writes "results", loadtest "paths"
+    return data.get("results") or data.get("paths") or {}
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """(failures, notes): lists of human-readable lines."""
+    failures, notes = [], []
+    for name, expected in sorted(baseline.items()):
+        actual = results.get(name)
+        if actual is None:
+            notes.append(f"{name}: not in the results")
+            continue
+        if "p95_ms" in expected and actual.get("p95_ms") is not None:
+            limit = expected["p95_ms"] * tolerance
+            if actual["p95_ms"] > limit:
+                failures.append(f"{name}: p95 {actual['p95_ms']:.2f} ms > {limit:.2f} ms "
+                                f"(baseline {expected['p95_ms']:.2f} ms x {tolerance})")
+        if "queries" in expected and actual.get("queries") is not None:
+            if actual["queries"] > expected["queries"]:
+                failures.append(f"{name}: {actual['queries']} queries > baseline {expected['queries']}")
+    for name in sorted(set(results) - set(baseline)):
+        notes.append(f"{name}: no baseline")
+    return failures, notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float,
+                        help=f"p95 slack factor (default: the baseline's, else {DEFAULT_TOLERANCE})")
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baseline.")
+    args = parser.parse_args()
+
+    results = load_results(args.results)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    tolerance = args.tolerance or baseline.get("tolerance", DEFAULT_TOLERANCE)
+
+    if args.update:
+        entries = {name: {k: r[k] for k in ("p95_ms", "queries") if k in r} for name, r in results.items()}
+        with open(args.baseline, "w") as f:
+            json.dump({"tolerance": tolerance, "results": entries}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline} ({len(entries)} cases)")
+        return
+
+    failures, notes = compare(results, baseline.get("results", {}), tolerance)
+    for line in notes:
+        print(f"note: {line}")
+    for line in failures:
+        print(f"REGRESSION: {line}")
+    if failures:
+        sys.exit(1)
+    checked = len(set(results) & set(baseline.get("results", {})))
+    print(f"OK: {checked} cases within the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Generate large, reproducible volumes of dealers, reviews and car models.
+
+Writes into the configured database (point DATABASE_URL at a scratch one):
+
+    cd server && python -m benchmarks.datagen --dealers 50000 --reviews 5000000 --car-models 10000
+
+Rows are inserted in chunks with bulk_create, so memory stays flat whatever
+the volumes. The same seed always produces the same data.
+"""
+import argparse
+import datetime
+import random
+import time
+
+from benchmarks.bench_sentiment import make_texts
+from benchmarks.support import setup_django
+
+MAKES = [("Toyota", "Japan"), ("Honda", "Japan"), ("Nissan", "Japan"), ("Mazda", "Japan"),
+         ("Ford", "USA"), ("Chevrolet", "USA"), ("Tesla", "USA"), ("Jeep", "USA"),
+         ("BMW", "Germany"), ("Audi", "Germany"), ("Volkswagen", "Germany"), ("Mercedes", "Germany"),
+         ("Hyundai", "South Korea"), ("Kia", "South Korea"), ("Volvo", "Sweden"), ("Fiat", "Italy")]
+
+CITIES = ["Springfield", "Riverside", "Franklin", "Greenville", "Fairview", "Madison",
+          "Clinton", "Georgetown", "Salem", "Arlington", "Ashland", "Dover"]
+
+# Continental US bounding box.
+LAT_RANGE = (25.0, 49.0)
+LNG_RANGE = (-124.0, -67.0)
+
+
+def _chunks(total, size):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def generate_car_models(n, seed=1, chunk_size=5000):
+    from djangoapp.models import CarMake, CarModel
+    rng = random.Random(seed)
+    makes = CarMake.objects.bulk_create(
+        [CarMake(name=f"{name} {i // len(MAKES)}" if i >= len(MAKES) else name,
+                 description=f"{name} vehicles", country=country)
+         for i, (name, country) in ((i, MAKES[i % len(MAKES)]) for i in range(max(1, min(n, len(MAKES) * 4))))])
+    types = [t for t, _ in CarModel.CAR_TYPES]
+    for start, count in _chunks(n, chunk_size):
+        CarModel.objects.bulk_create([
+            CarModel(car_make=makes[(start + i) % len(makes)], name=f"Model {start + i}",
+                     car_type=rng.choice(types), year=rng.randint(2000, 2025))
+            for i in range(count)])
+    return n
+
+
+def generate_dealers(n, seed=1, chunk_size=5000):
+    from djangoapp.models import Dealer
+    from djangoapp.states import US_STATES
+    rng = random.Random(seed)
+    states = sorted(US_STATES.items())
+    for start, count in _chunks(n, chunk_size):
+        dealers = []
+        for i in range(start, start + count):
+            st, state = rng.choice(states)
+            city = rng.choice(CITIES)
+            dealer = Dealer(full_name=f"{city} Motors {i}", short_name=f"Motors {i}",
+                            address=f"{rng.randint(1, 9999)} Main St", city=city, state=state, st=st,
+                            zip_code=f"{rng.randint(10000, 99999)}",
+                            lat=round(rng.uniform(*LAT_RANGE), 6), lng=round(rng.uniform(*LNG_RANGE), 6))
+            dealer.normalize()
+            dealers.append(dealer)
+        Dealer.objects.bulk_create(dealers)
+    return n
+
+
+def generate_reviews(n, seed=1, chunk_size=10000):
+    """Reviews spread over every dealer, scored with the sentiment engine."""
+    from django.utils import timezone
+    from djangoapp.models import Dealer, Review
+    from djangoapp.sentiment import engine
+
+    rng = random.Random(seed)
+    dealer_ids = list(Dealer.objects.values_list("id", flat=True))
+    if not dealer_ids:
+        raise ValueError("Generate dealers before reviews")
+    makes = [name for name, _ in MAKES]
+    now = timezone.now()
+    for chunk, (start, count) in enumerate(_chunks(n, chunk_size)):
+        texts = make_texts(count, length=rng.randint(8, 40), seed=seed + chunk)
+        reviews = []
+        for i, (text, sentiment) in enumerate(zip(texts, engine.analyze_batch(texts))):
+            purchase = rng.random() < 0.6
+            review = Review(dealer_id=rng.choice(dealer_ids), name=f"Reviewer {start + i}", review=text,
+                            purchase=purchase,
+                            purchase_date=(now - datetime.timedelta(days=rng.randint(1, 1500))).date()
+                            if purchase else None,
+                            car_make=rng.choice(makes), car_model=f"Model {rng.randint(1, 50)}",
+                            car_year=rng.randint(2005, 2025), sentiment=sentiment)
+            reviews.append(review)
+        created = Review.objects.bulk_create(reviews)
+        # auto_now_add stamps every row of a chunk alike; spread them over time
+        # so the keyset pagination and the "since" filters see realistic data.
+        stamps = [now - datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 1500)) for _ in created]
+        for review, stamp in zip(created, stamps):
+            review.created_at = stamp
+        Review.objects.bulk_update(created, ["created_at"], batch_size=1000)
+    return n
+
+
+def generate(dealers=0, reviews=0, car_models=0, seed=1, verbose=False):
+    """Insert the requested volumes, then rebuild the derived data (stats, rollups, caches)."""
+    from djangoapp import cache, catalog, geo, rollups
+    from djangoapp.stats import rebuild_dealer_stats
+
+    steps = [("car models", generate_car_models, car_models), ("dealers", generate_dealers, dealers),
+             ("reviews", generate_reviews, reviews)]
+    for label, fn, count in steps:
+        if count:
+            start = time.perf_counter()
+            fn(count, seed=seed)
+            if verbose:
+                print(f"{count:>10} {label:<11} {time.perf_counter() - start:8.1f} s")
+    if reviews:
+        rebuild_dealer_stats()
+        rollups.rebuild()
+    cache.invalidate_dealers()
+    cache.invalidate_cars()
+    catalog.invalidate()
+    geo.invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dealers", type=int, default=50000)
+    parser.add_argument("--reviews", type=int, default=5000000)
+    parser.add_argument("--car-models", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    generate(args.dealers, args.reviews, args.car_models, seed=args.seed, verbose=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Concurrent HTTP load driver (stdlib asyncio, no extra dependency).
+
+Start the server in one shell, then point this at it, e.g. to compare the
+sync WSGI workers with the ASGI/uvicorn deployment:
+
+    gunicorn djangoproj.wsgi -w 2 --bind 127.0.0.1:8000
+    gunicorn djangoproj.asgi -w 2 -k uvicorn.workers.UvicornWorker --bind 127.0.0.1:8000
+
+    cd server && python -m benchmarks.loadtest --concurrency 200 --requests 5000 \\
+        --path /djangoapp/get_dealers --path "/djangoapp/reviews/dealer/1?limit=20"
+
+Without --path, requests follow the weighted MIX of API calls; results are
+grouped per MIX entry and can be checked with benchmarks.check.
+
+Every request is a GET, which RATE_LIMITS do not apply to. The server runs
+in its own process, so a settings override here would not reach it: to load
+the write endpoints, start it with RATE_LIMITS_OFF=True.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import time
+from urllib.parse import urlsplit
+
+# (name, weight, path template): the traffic the API work has been tuned for,
+# mostly dealer browsing (lists, state filter, dealer page with its reviews),
+# then the car catalog, "near me" searches and sentiment calls. {dealer} is a
+# random id in 1..--dealers and {state} a random state code.
+MIX = [
+    ("get_dealers", 10, "/djangoapp/get_dealers"),
+    ("get_dealers/state", 15, "/djangoapp/get_dealers/{state}"),
+    ("get_dealers include_stats", 5, "/djangoapp/get_dealers?include_stats=1"),
+    ("dealer", 15, "/djangoapp/dealer/{dealer}"),
+    ("reviews/dealer page", 20, "/djangoapp/reviews/dealer/{dealer}?limit=20"),
+    ("reviews/dealer", 5, "/djangoapp/reviews/dealer/{dealer}"),
+    ("dealers/nearby", 10, "/djangoapp/dealers/nearby?lat={lat}&lng={lng}&radius_km=100"),
+    ("get_cars", 8, "/djangoapp/get_cars"),
+    ("get_cars filtered", 7, "/djangoapp/get_cars?make=Toyota&year_min=2015"),
+    ("analyze_review", 5, "/djangoapp/analyze_review?text=great+service+but+slow+paperwork"),
+]
+
+STATES = "AL AZ CA CO FL GA IL KS MA MI NY OH PA TX WA".split()
+
+
+def mix_jobs(total, dealers, seed=1):
+    """(name, path) pairs drawn from MIX."""
+    rng = random.Random(seed)
+    names = [name for name, _, _ in MIX]
+    templates = dict((name, path) for name, _, path in MIX)
+    for name in rng.choices(names, weights=[w for _, w, _ in MIX], k=total):
+        yield name, templates[name].format(
+            dealer=rng.randint(1, dealers), state=rng.choice(STATES),
+            lat=round(rng.uniform(26, 48), 3), lng=round(rng.uniform(-123, -70), 3))
+
+
+async def fetch(host, port, path, timeout):
+    """One GET over a fresh connection; returns (status, body bytes)."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, body = raw.partition(b"\r\n\r\n")
+    return int(head.split(b" ", 2)[1]), body
+
+
+async def run(base_url, jobs, concurrency, timeout):
+    """Replay (name, path) jobs; latencies are grouped by name."""
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    jobs = iter(jobs)
+    latencies, errors, sent_bytes = {}, 0, 0
+
+    async def worker():
+        nonlocal errors, sent_bytes
+        for name, path in jobs:
+            start = time.perf_counter()
+            try:
+                status, body = await fetch(host, port, path, timeout)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                errors += 1
+                continue
+            if status >= 400:
+                errors += 1
+            latencies.setdefault(name, []).append(time.perf_counter() - start)
+            sent_bytes += len(body)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, sent_bytes, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def summarize(latencies, errors, sent_bytes, elapsed):
+    every = [v for values in latencies.values() for v in values]
+    summary = {
+        "requests": len(every),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(every) / elapsed, 1) if elapsed else 0,
+        "bytes": sent_bytes,
+        "paths": {},
+    }
+    for name, values in sorted(latencies.items()):
+        summary["paths"][name] = {
+            "count": len(values),
+            "mean_ms": round(statistics.mean(values) * 1000, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", help="Request path (repeatable), cycled through "
+                                                        "instead of the MIX.")
+    parser.add_argument("--dealers", type=int, default=10, help="Dealer ids used by the MIX: 1..N.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json-out", help="Also write the summary to this file.")
+    args = parser.parse_args()
+
+    if args.path:
+        jobs = itertools.islice(itertools.cycle((p, p) for p in args.path), args.requests)
+    else:
+        jobs = mix_jobs(args.requests, args.dealers, args.seed)
+    summary = summarize(*asyncio.run(run(args.url, jobs, args.concurrency, args.timeout)))
+    print(json.dumps(summary, indent=2))
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Microbenchmarks: sentiment, serializers and every API view through the test Client.
+
+Runs against a throwaway test database filled by benchmarks.datagen:
+
+    cd server && python -m benchmarks.micro --dealers 2000 --reviews 50000 --json-out micro.json
+    python -m benchmarks.check micro.json
+
+Each case is warmed up, then timed over --rounds calls (min/mean/median/p95),
+and the number of SQL queries of one call is recorded alongside.
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import time
+
+from benchmarks.bench_sentiment import make_texts
+from benchmarks.support import no_rate_limits, setup_django, test_database
+
+
+def bench(fn, rounds=30, warmup=2, setup=None):
+    """pytest-benchmark style timing of fn(); setup() runs before each call, untimed."""
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    if setup:
+        setup()
+    reset_queries()  # the query log is capped, a full one would count 0
+    with CaptureQueriesContext(connection) as queries:
+        fn()
+    samples = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "rounds": rounds,
+        "min_ms": round(samples[0], 3),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(rounds - 1, int(round(0.95 * (rounds - 1))))], 3),
+        "max_ms": round(samples[-1], 3),
+        "stddev_ms": round(statistics.pstdev(samples), 3),
+        "queries": len(queries.captured_queries),
+    }
+
+
+def _get(client, path):
+    def call():
+        response = client.get(path)
+        if response.status_code != 200:
+            raise AssertionError(f"GET {path}: HTTP {response.status_code}")
+        return response
+    return call
+
+
+def cases():
+    """(name, fn, setup) for every benchmark; needs a populated database."""
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.db.models import Count
+    from django.test import Client
+    from djangoapp import serializers
+    from djangoapp.models import Dealer, Review
+    from djangoapp.sentiment import analyze_sentiment, engine
+
+    texts = make_texts(1000, 30)
+    dealer = Dealer.objects.annotate(n=Count("reviews")).order_by("-n").first()
+    client = Client()
+    user = User.objects.create_user("bench", password="bench-password")
+    writer = Client()
+    writer.force_login(user)
+    review_body = json.dumps({"dealership": dealer.id, "review": "Great staff, fast paperwork",
+                              "purchase": True, "purchase_date": "2024-01-15"})
+
+    def add_review():
+        response = writer.post("/djangoapp/add_review", data=review_body, content_type="application/json")
+        if response.json().get("status") != 200:
+            raise AssertionError(response.content)
+
+    return [
+        ("sentiment.analyze_sentiment x1000", lambda: [analyze_sentiment(t) for t in texts], None),
+        ("sentiment.analyze_batch 1000", lambda: engine.analyze_batch(texts), None),
+        ("serialize.dealers to_dict", lambda: serializers.dumps(
+            [d.to_dict() for d in Dealer.objects.all()]), None),
+        ("serialize.dealers rows", lambda: serializers.dumps(
+            serializers.serializer("dealer").rows(Dealer.objects.all())), None),
+        ("serialize.reviews to_dict", lambda: serializers.dumps(
+            [r.to_dict() for r in Review.objects.filter(dealer=dealer)]), None),
+        ("serialize.reviews rows", lambda: serializers.dumps(
+            serializers.serializer("review").rows(Review.objects.filter(dealer=dealer))), None),
+        # Views, with the response cache cleared so every call does the work.
+        ("view.get_dealers", _get(client, "/djangoapp/get_dealers"), cache.clear),
+        ("view.get_dealers cached", _get(client, "/djangoapp/get_dealers"), None),
+        ("view.get_dealers/state", _get(client, f"/djangoapp/get_dealers/{dealer.st}"), cache.clear),
+        ("view.get_dealers include_stats", _get(client, "/djangoapp/get_dealers?include_stats=1"), cache.clear),
+        ("view.dealers/nearby", _get(client, f"/djangoapp/dealers/nearby?lat={dealer.lat}&lng={dealer.lng}"
+                                             "&radius_km=200"), None),
+        ("view.dealer", _get(client, f"/djangoapp/dealer/{dealer.id}"), cache.clear),
+        ("view.reviews/dealer", _get(client, f"/djangoapp/reviews/dealer/{dealer.id}"), None),
+        ("view.reviews/dealer page", _get(client, f"/djangoapp/reviews/dealer/{dealer.id}?limit=20"), None),
+        ("view.get_cars", _get(client, "/djangoapp/get_cars"), cache.clear),
+        ("view.get_cars filtered", _get(client, "/djangoapp/get_cars?make=Toyota&year_min=2015"), cache.clear),
+        ("view.analyze_review", _get(client, "/djangoapp/analyze_review?text=Great+service+not+slow"), None),
+        ("view.add_review", add_review, None),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dealers", type=int, default=500)
+    parser.add_argument("--reviews", type=int, default=20000)
+    parser.add_argument("--car-models", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--filter", help="Only run cases whose name contains this text.")
+    parser.add_argument("--json-out", help="Write the results to this file.")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from benchmarks.datagen import generate
+
+    with no_rate_limits(), test_database():
+        generate(args.dealers, args.reviews, args.car_models)
+        results = {}
+        for name, fn, setup in cases():
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = bench(fn, rounds=args.rounds, setup=setup)
+            r = results[name]
+            print(f"{name:<36} p95 {r['p95_ms']:9.2f} ms  median {r['median_ms']:9.2f} ms  "
+                  f"{r['queries']:3d} queries")
+        vendor = connection.vendor
+
+    report = {
+        "meta": {
+            "kind": "micro",
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": vendor,
+            "scale": {"dealers": args.dealers, "reviews": args.reviews, "car_models": args.car_models},
+        },
+        "results": results,
+    }
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
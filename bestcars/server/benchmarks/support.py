@@ -0,0 +1,33 @@
+"""Django bootstrap shared by the benchmark scripts."""
+import os
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "djangoproj.settings")
+    django.setup()
+
+
+def no_rate_limits():
+    """Settings override for the benchmarks: they measure the views, not the rate limiter."""
+    from django.test.utils import override_settings
+
+    return override_settings(RATE_LIMITS={}, EXPENSIVE_CONCURRENCY=0)
+
+
+@contextmanager
+def test_database(keepdb=False):
+    """Run against a throwaway test database (test_<name>), as manage.py test does."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CarMake, CarModel, Dealer, Review
+from .models import CarMake, CarModel, Dealer, DealerStats, Review
 
 @admin.register(Dealer)
 class DealerAdmin(admin.ModelAdmin):
@@ -12,6 +12,10 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ('name', 'dealer', 'sentiment', 'purchase', 'created_at')
     list_filter = ('sentiment', 'purchase')
 
+@admin.register(DealerStats)
+class DealerStatsAdmin(admin.ModelAdmin):
+    list_display = ('dealer', 'review_count', 'positive_count', 'negative_count', 'neutral_count', 'last_review_at')
+
 @admin.register(CarMake)
 class CarMakeAdmin(admin.ModelAdmin):
     list_display = ('name', 'country')
@@ -1,4 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
 class DjangoappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'djangoapp'
+
+    def ready(self):
+        from . import db, middleware, signals, tasks  # noqa: F401 (tasks registers the job handlers)
+        post_migrate.connect(signals.seed_after_migrate, sender=self)
+        connection_created.connect(db.configure_sqlite)
+        connection_created.connect(middleware.install_query_wrapper)
@@ -0,0 +1,152 @@
+"""Async versions of the read endpoints, for the ASGI (uvicorn) deployment.
+
+Same URLs, parameters and responses as the views in views.py; urls.py routes
+to these when settings.ASYNC_READ_VIEWS is on. They use the async ORM
+(async for / aiterator, afirst, aexists), so a request waiting on the
+database does not hold a worker.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+
+from . import cache, catalog, live, serializers, views
+from .models import Dealer
+
+
+async def _ensure_seeded():
+    if not views._seeded:
+        await sync_to_async(views.ensure_seeded)()
+
+
+@cache.cached_json(views._dealers_key)
+async def get_dealerships(request, state="All"):
+    await _ensure_seeded()
+    try:
+        ser = serializers.serializer("dealer", request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    dealers = views._dealer_queryset(state)
+    if views._flag(request, "include_stats"):
+        rows = await sync_to_async(serializers.dealer_rows_with_stats)(dealers, ser)
+    else:
+        rows = [ser.row(values) async for values in dealers.values_list(*ser.columns)]
+    return serializers.json_response({"status": 200, "dealers": rows})
+
+
+@cache.cached_json(views._dealer_key)
+async def get_dealer_details(request, dealer_id):
+    await _ensure_seeded()
+    try:
+        ser = serializers.serializer("dealer", request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    values = await Dealer.objects.filter(id=dealer_id).values_list(*ser.columns).afirst()
+    if values is None:
+        return JsonResponse({"status": 404, "message": "Dealer not found"})
+    return serializers.json_response({"status": 200, "dealer": ser.row(values)})
+
+
+async def get_dealer_reviews(request, dealer_id):
+    await _ensure_seeded()
+    try:
+        feed = views.ReviewFeed(request, dealer_id)
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    if not await Dealer.objects.filter(id=dealer_id).aexists():
+        return JsonResponse({"status": 404, "message": "Dealer not found"})
+
+    if feed.ndjson:
+        async def lines():
+            # .values(), not .values_list(): on Django 4.2 values_list().aiterator()
+            # runs its query in the event loop thread and fails.
+            async for r in feed.reviews.values(*feed.ser.columns).aiterator(chunk_size=500):
+                yield serializers.dumps(feed.ser.row(r.values())) + b"\n"
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+    if not feed.paginated:
+        rows = [feed.ser.row(values) async for values in feed.reviews.values_list(*feed.ser.columns)]
+        return serializers.json_response({"status": 200, "reviews": rows})
+    page = [values async for values in feed.page_query()]
+    return serializers.json_response(feed.page_payload(page))
+
+
+async def get_review_changes(request, dealer_id):
+    """views.get_review_changes, plus the live feed: `format=sse` (or Accept:
+    text/event-stream) keeps the response open as Server-Sent Events, one
+    "review" event per new review with the review id as event id.
+    """
+    try:
+        changes = views.ReviewChanges(request, dealer_id)
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    if not await Dealer.objects.filter(id=dealer_id).aexists():
+        return JsonResponse({"status": 404, "message": "Dealer not found"})
+    if not changes.stream:
+        rows = [values async for values in changes.query(changes.since_id)]
+        return serializers.json_response(changes.payload(rows))
+    response = StreamingHttpResponse(_events(changes), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # let proxies pass each event at once
+    return response
+
+
+async def _events(changes):
+    """SSE body: pending reviews, then new ones as live.broadcaster announces them.
+
+    Ends after LIVE_STREAM_SECONDS; the browser reconnects with Last-Event-ID.
+    """
+    keepalive = getattr(settings, "LIVE_KEEPALIVE_SECONDS", 15)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + getattr(settings, "LIVE_STREAM_SECONDS", 300)
+    event = live.broadcaster.subscribe(changes.dealer_id)
+    live.ensure_poller()
+    last_id = changes.since_id
+    try:
+        yield f"retry: {getattr(settings, 'LIVE_RETRY_MS', 3000)}\n\n".encode()
+        while loop.time() < deadline:
+            event.clear()
+            # .values(), not .values_list(): see get_dealer_reviews.
+            reviews = changes.reviews(last_id).values(*changes.ser.columns, review_pk=F("id"))
+            rows = [r async for r in reviews[:changes.limit + 1]]
+            for r in rows[:changes.limit]:
+                last_id = r.pop("review_pk")
+                yield (f"id: {last_id}\nevent: review\ndata: ".encode()
+                       + serializers.dumps(changes.ser.row(r.values())) + b"\n\n")
+            if len(rows) > changes.limit:
+                continue
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(keepalive, max(deadline - loop.time(), 0)))
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+    finally:
+        live.broadcaster.unsubscribe(changes.dealer_id, event)
+
+
+@cache.cached_json(views._cars_key)
+async def get_cars(request):
+    await _ensure_seeded()
+    try:
+        filters = views._car_filters(request)
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    snapshot = await sync_to_async(catalog.get_snapshot)()
+    return serializers.json_response(views._cars_payload(snapshot.search(**filters)))
+
+
+async def export_data(request):
+    export, error = await sync_to_async(views.export_request)(request)
+    if error:
+        return error
+    chunks = export.chunks()
+    step = sync_to_async(next)  # thread_sensitive: the cursor stays on one thread
+
+    async def body():
+        # A sync iterator would be read whole into memory by the ASGI handler.
+        try:
+            while (data := await step(chunks, None)) is not None:
+                yield data
+        finally:
+            await sync_to_async(chunks.close)()
+    return views.export_response(export, body())
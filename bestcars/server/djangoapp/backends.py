@@ -0,0 +1,47 @@
+"""Authentication backend that keeps session users in the cache."""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+
+
+def _cache():
+    return caches[getattr(settings, "API_CACHE_ALIAS", "default")]
+
+
+def user_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose get_user() (run on every authenticated request) reads the cache.
+
+    Users are evicted when saved or deleted (signals.py), so the cache must be
+    shared by every worker: AUTH_USER_CACHE_TIMEOUT is 0 (no caching) unless
+    REDIS_URL or CACHE_DIR is set. Otherwise a password change or
+    is_active=False would not reach the other workers' copies.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None:
+            # Stop here: ModelBackend, listed after this one for the sessions
+            # opened before it, would check the password a second time.
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        timeout = getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 0)
+        if not timeout:
+            return super().get_user(user_id)
+        key = user_key(user_id)
+        user = _cache().get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                _cache().set(key, user, timeout)
+        return user
+
+
+def evict_user(user_id):
+    _cache().delete(user_key(user_id))
@@ -0,0 +1,160 @@
+"""Response cache for the read-mostly catalog endpoints.
+
+Rendered JSON bodies are stored with a strong ETag and a Last-Modified stamp,
+so a hit costs no query and a conditional GET is answered with 304.
+Entries are evicted explicitly from the model signals (see signals.py).
+"""
+import asyncio
+import hashlib
+import json
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .states import canonical_state
+
+
+def _cache():
+    return caches[getattr(settings, "API_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "API_CACHE_TIMEOUT", 3600)
+
+
+# ─── Keys ────────────────────────────────────────────────────────────────────
+# State-filtered listings are too many to enumerate on eviction, so they live
+# under a version number that is bumped whenever any Dealer changes.
+
+def _version(namespace):
+    return _cache().get_or_set(f"api:v:{namespace}", 1, None)
+
+
+def _bump(namespace):
+    cache = _cache()
+    try:
+        cache.incr(f"api:v:{namespace}")
+    except ValueError:
+        cache.set(f"api:v:{namespace}", 2, None)
+
+
+def _digest(*parts):
+    # Request parameters go through a hash: keys stay short and memcached-safe.
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+def dealers_key(state="All", include_stats=False, fields=""):
+    key = f"api:dealers:{_version('dealers')}:{_digest(canonical_state(state), fields)}"
+    if include_stats:
+        key += f":stats:{_version('dealer_stats')}"
+    return key
+
+
+def dealer_key(dealer_id, fields=""):
+    # Versioned per dealer so that every `fields` projection is evicted at once.
+    return f"api:dealer:{dealer_id}:{_version(f'dealer:{dealer_id}')}:{_digest(fields)}"
+
+
+def cars_key(filters=()):
+    return f"api:cars:{_version('cars')}:{_digest(*(f'{k}={v}' for k, v in filters))}"
+
+
+def invalidate_dealers(dealer_ids=()):
+    _bump("dealers")
+    for dealer_id in dealer_ids:
+        _bump(f"dealer:{dealer_id}")
+
+
+def invalidate_dealer_stats():
+    _bump("dealer_stats")
+
+
+def invalidate_cars():
+    _bump("cars")
+
+
+# ─── Responses ───────────────────────────────────────────────────────────────
+
+def _entry(body):
+    return {
+        "body": body,
+        "etag": '"%s"' % hashlib.md5(body).hexdigest(),
+        "last_modified": int(time.time()),
+    }
+
+
+def _respond(request, entry):
+    response = get_conditional_response(
+        request, etag=entry["etag"], last_modified=entry["last_modified"])
+    if response is None:
+        response = HttpResponse(entry["body"], content_type="application/json")
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    # Let clients keep the body but revalidate it on every poll.
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+def _error_status(body):
+    """The body's "status" when it is not a success (get_cars has none)."""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None
+    status = payload.get("status", 200) if isinstance(payload, dict) else 200
+    return None if status == 200 else status
+
+
+def cached_json(key_func):
+    """Cache a JSON view's body under key_func(request, *args, **kwargs).
+
+    Works for sync and async views; for async views the cache calls run in a
+    thread, since the configured backend may do blocking I/O.
+    """
+    def lookup(request, args, kwargs):
+        key = key_func(request, *args, **kwargs)
+        return key, _cache().get(key)
+
+    def store(key, response):
+        # Errors are answered with HTTP 200 and their status in the body: a
+        # bad id or filter must not be cached until the next eviction.
+        if response.status_code != 200 or _error_status(response.content):
+            return None
+        entry = _entry(response.content)
+        _cache().set(key, entry, _timeout())
+        return entry
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapped(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                key, entry = await sync_to_async(lookup)(request, args, kwargs)
+                if entry is None:
+                    response = await view(request, *args, **kwargs)
+                    entry = await sync_to_async(store)(key, response)
+                    if entry is None:
+                        return response
+                return _respond(request, entry)
+            return async_wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            key, entry = lookup(request, args, kwargs)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                entry = store(key, response)
+                if entry is None:
+                    return response
+            return _respond(request, entry)
+        return wrapped
+    return decorator
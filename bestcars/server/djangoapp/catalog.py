@@ -0,0 +1,86 @@
+"""Immutable in-memory snapshot of the car catalog, with filtering and facets.
+
+The snapshot is built once per process from a single CarModel/CarMake query
+and rebuilt after a CarMake/CarModel change (see signals.py), or every
+CATALOG_TTL seconds so that changes made by other workers show up too.
+"""
+import threading
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+
+CatalogEntry = namedtuple("CatalogEntry", "make model car_type type_display year country search_text")
+
+FILTERS = ("make", "car_type", "year_min", "year_max", "country", "q")
+
+
+class CatalogSnapshot:
+    def __init__(self, entries):
+        self.entries = tuple(entries)
+
+    def search(self, make=None, car_type=None, year_min=None, year_max=None, country=None, q=None):
+        """Entries matching every given filter (strings compare case-insensitively)."""
+        entries = self.entries
+        if make:
+            make = make.lower()
+            entries = [e for e in entries if e.make.lower() == make]
+        if car_type:
+            car_type = car_type.lower()
+            entries = [e for e in entries if car_type in (e.car_type.lower(), e.type_display.lower())]
+        if year_min is not None:
+            entries = [e for e in entries if e.year >= year_min]
+        if year_max is not None:
+            entries = [e for e in entries if e.year <= year_max]
+        if country:
+            country = country.lower()
+            entries = [e for e in entries if e.country.lower() == country]
+        if q:
+            q = q.lower()
+            entries = [e for e in entries if q in e.search_text]
+        return list(entries)
+
+    @staticmethod
+    def facets(entries):
+        """Model counts per make, per type and per year over `entries`."""
+        return {
+            "CarMake": dict(sorted(Counter(e.make for e in entries).items())),
+            "CarType": dict(sorted(Counter(e.type_display for e in entries).items())),
+            # JSON object keys are strings anyway; orjson refuses int keys.
+            "ModelYear": {str(year): n for year, n in sorted(Counter(e.year for e in entries).items())},
+        }
+
+
+def build_snapshot():
+    from .models import CarModel
+    type_display = dict(CarModel.CAR_TYPES)
+    rows = CarModel.objects.order_by("id").values_list(
+        "car_make__name", "name", "car_type", "year", "car_make__country")
+    return CatalogSnapshot(
+        CatalogEntry(make, model, car_type, type_display.get(car_type, car_type), year, country,
+                     f"{make} {model}".lower())
+        for make, model, car_type, year, country in rows.iterator()
+    )
+
+
+_snapshot = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    global _snapshot, _built_at
+    ttl = getattr(settings, "CATALOG_TTL", 300)
+    snapshot = _snapshot
+    if snapshot is None or time.monotonic() - _built_at > ttl:
+        with _lock:
+            if _snapshot is None or time.monotonic() - _built_at > ttl:
+                _snapshot = build_snapshot()
+                _built_at = time.monotonic()
+            snapshot = _snapshot
+    return snapshot
+
+
+def invalidate():
+    global _snapshot
+    _snapshot = None
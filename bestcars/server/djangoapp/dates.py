@@ -0,0 +1,16 @@
+"""Parsing of the date filters taken by the export endpoint and the management commands."""
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def parse_since(value):
+    """Aware datetime from a YYYY-MM-DD date or an ISO datetime; raises ValueError."""
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid since value: {value}")
+        since = datetime.datetime.combine(day, datetime.time.min)
+    return timezone.make_aware(since) if timezone.is_naive(since) else since
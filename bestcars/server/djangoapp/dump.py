@@ -0,0 +1,130 @@
+"""Bulk export of reviews and dealers as CSV or NDJSON, in constant memory.
+
+Rows are read in id order with .values_list().iterator(), a server-side
+cursor on PostgreSQL and a fetchmany() loop on SQLite, and encoded
+(optionally gzipped) one chunk at a time, so memory does not grow with the
+number of rows. Every row starts with its id: an interrupted export resumes
+with after_id set to the last id received.
+"""
+import csv
+import datetime
+import io
+import zlib
+
+from . import serializers
+from .dates import parse_since
+from .models import Dealer, Review
+from .states import canonical_state
+
+# Output key -> model column, in output order.
+COLUMNS = {
+    "reviews": {**serializers.REVIEW_FIELDS, "created_at": "created_at"},
+    "dealers": serializers.DEALER_FIELDS,
+}
+MODELS = {"reviews": Review, "dealers": Dealer}
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+CHUNK_ROWS = 2000
+
+
+def _text(value):
+    return value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value
+
+
+class Dump:
+    """One export: rows of `kind` after `after_id`, filtered, encoded as `fmt`."""
+
+    def __init__(self, kind="reviews", fmt="ndjson", since=None, dealer=None, state=None,
+                 after_id=0, gzip=False, chunk_size=CHUNK_ROWS):
+        """Raises ValueError on an unknown kind or format, or a filter the kind does not have."""
+        if kind not in MODELS:
+            raise ValueError(f"kind must be one of {', '.join(MODELS)}")
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if since and kind != "reviews":
+            raise ValueError("since only applies to reviews")
+        self.kind, self.fmt, self.gzip, self.chunk_size = kind, fmt, gzip, chunk_size
+        self.keys = tuple(COLUMNS[kind])
+        rows = MODELS[kind].objects.filter(id__gt=after_id).order_by("id")
+        if since:
+            rows = rows.filter(created_at__gte=parse_since(since) if isinstance(since, str) else since)
+        if kind == "reviews":
+            if dealer is not None:
+                rows = rows.filter(dealer_id=dealer)
+            if state:
+                rows = rows.filter(dealer__state_key=canonical_state(state))
+        else:
+            if dealer is not None:
+                rows = rows.filter(id=dealer)
+            if state:
+                rows = rows.filter(state_key=canonical_state(state))
+        self.rows = rows.values_list(*COLUMNS[kind].values())
+        self.after_id = self.last_id = after_id
+
+    @classmethod
+    def from_params(cls, params):
+        """Dump for the export endpoint's query parameters."""
+        try:
+            after_id = int(params.get("after_id") or 0)
+            dealer = int(params["dealer"]) if params.get("dealer") else None
+        except ValueError:
+            raise ValueError("after_id and dealer must be ids")
+        return cls(params.get("kind", "reviews"), params.get("format", "ndjson"), since=params.get("since"),
+                   dealer=dealer, state=params.get("state"), after_id=after_id,
+                   gzip=params.get("gzip") in ("1", "true"))
+
+    @property
+    def filename(self):
+        return f"{self.kind}.{self.fmt}" + (".gz" if self.gzip else "")
+
+    @property
+    def content_type(self):
+        return "application/gzip" if self.gzip else FORMATS[self.fmt]
+
+    def _encoded(self):
+        """Uncompressed bytes, one block per chunk_size rows, each with the id of its last row."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if self.fmt == "csv" and not self.after_id:  # a resumed export continues the same file
+            writer.writerow(self.keys)
+        block, count, last_id = [], 0, self.after_id
+        for values in self.rows.iterator(chunk_size=self.chunk_size):
+            if self.fmt == "csv":
+                writer.writerow([_text(v) for v in values])
+            else:
+                block.append(serializers.dumps(dict(zip(self.keys, values))))
+            count += 1
+            last_id = values[0]
+            if count == self.chunk_size:
+                yield self._flush(buffer, block), last_id
+                block, count = [], 0
+        if count or buffer.tell():  # buffer.tell(): the CSV header of an empty export
+            yield self._flush(buffer, block), last_id
+
+    def _flush(self, buffer, block):
+        if self.fmt == "csv":
+            data = buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            return data
+        return b"\n".join(block) + b"\n"
+
+    def blocks(self):
+        """The export body as (bytes, id of the last row in them) pairs, gzipped on the fly with gzip=True.
+
+        Once a block is written, its id is where a resumed export starts.
+        """
+        if not self.gzip:
+            yield from self._encoded()
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        last_id = self.after_id
+        for data, last_id in self._encoded():
+            # Sync flush: each block is complete in the output, so a cut-off
+            # file still decompresses up to its last id.
+            yield compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH), last_id
+        yield compressor.flush(), last_id
+
+    def chunks(self):
+        """The export body as a generator of bytes; last_id is the last row yielded so far."""
+        for data, self.last_id in self.blocks():
+            yield data
@@ -0,0 +1,98 @@
+"""In-process spatial index for the "dealers near me" search.
+
+Dealer coordinates are bucketed into a fixed lat/lng grid. A query only looks
+at the cells covering the search radius' bounding box, then ranks those
+candidates by exact haversine distance. Plain Python, so it behaves the same
+on SQLite and Postgres (no PostGIS).
+"""
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+EARTH_RADIUS_KM = 6371.0088
+CELL_DEG = 0.5
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class DealerGrid:
+    """Grid of (dealer_id, lat, lng) points keyed by CELL_DEG-sized cells."""
+
+    def __init__(self, points, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        self.columns = int(round(360 / cell_deg))
+        self.cells = defaultdict(list)
+        for dealer_id, lat, lng in points:
+            self.cells[self._cell(lat, lng)].append((dealer_id, lat, lng))
+        self.cells = dict(self.cells)
+        self.size = sum(len(c) for c in self.cells.values())
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg),
+                math.floor(((lng + 180) % 360) / self.cell_deg))
+
+    def _candidate_cells(self, lat, lng, radius_km):
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        rows = range(math.floor(max(lat - dlat, -90) / self.cell_deg),
+                     math.floor(min(lat + dlat, 90) / self.cell_deg) + 1)
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+        if cos_lat < 1e-9 or dlat / cos_lat >= 180:
+            columns = range(self.columns)  # the box reaches a pole or wraps the globe
+        else:
+            dlng = dlat / cos_lat
+            first = math.floor(((lng - dlng + 180) % 360) / self.cell_deg)
+            count = math.floor(2 * dlng / self.cell_deg) + 2
+            columns = [(first + k) % self.columns for k in range(min(count, self.columns))]
+        if len(rows) * len(columns) > len(self.cells):
+            # Huge radius: walking the occupied cells is cheaper than the box.
+            row_set, column_set = set(rows), set(columns)
+            return [c for c in self.cells if c[0] in row_set and c[1] in column_set]
+        return [(r, c) for r in rows for c in columns]
+
+    def nearby(self, lat, lng, radius_km, limit):
+        """[(distance_km, dealer_id)] of the `limit` closest points within radius_km."""
+        found = []
+        cells = self.cells
+        for cell in self._candidate_cells(lat, lng, radius_km):
+            for dealer_id, plat, plng in cells.get(cell, ()):
+                distance = haversine_km(lat, lng, plat, plng)
+                if distance <= radius_km:
+                    found.append((distance, dealer_id))
+        return heapq.nsmallest(limit, found)
+
+
+# ─── Process-wide index ──────────────────────────────────────────────────────
+# Rebuilt lazily after a Dealer change in this process (see signals.py), and
+# every GEO_INDEX_TTL seconds so changes made by other workers show up too.
+
+_index = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index():
+    global _index, _built_at
+    ttl = getattr(settings, "GEO_INDEX_TTL", 300)
+    index = _index
+    if index is None or time.monotonic() - _built_at > ttl:
+        with _lock:
+            if _index is None or time.monotonic() - _built_at > ttl:
+                from .models import Dealer
+                _index = DealerGrid(Dealer.objects.values_list("id", "lat", "lng").iterator())
+                _built_at = time.monotonic()
+            index = _index
+    return index
+
+
+def invalidate():
+    global _index
+    _index = None
@@ -0,0 +1,31 @@
+"""Argon2 password hasher with its cost taken from settings.
+
+Changing the preferred hasher or its parameters needs no migration: Django
+re-hashes a password with the current one on the user's next successful
+login (ModelBackend -> User.check_password). scrypt uses Django's own hasher,
+whose defaults (N = 2**14, r = 8, p = 1: ~16 MB and ~60 ms per hash) are
+already the bounded cost wanted here.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """argon2id (needs argon2-cffi), cost from ARGON2_TIME_COST / ARGON2_MEMORY_COST (KiB).
+
+    The defaults (2 passes over 19 MiB, 1 lane) are the OWASP minimum; Django's
+    own (100 MiB, 8 lanes) cost five times the memory per login. Read on each
+    use, so that settings changes apply without a reload.
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, "ARGON2_TIME_COST", 2)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, "ARGON2_MEMORY_COST", 19456)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, "ARGON2_PARALLELISM", 1)
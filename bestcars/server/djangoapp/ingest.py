@@ -0,0 +1,89 @@
+"""Bulk review ingestion, shared by the add_reviews_bulk view and import_reviews."""
+import datetime
+import itertools
+from functools import partial
+
+from django.db import transaction
+
+from . import live, rollups
+from .models import Dealer, Review
+from .sentiment import engine as sentiment_engine
+from .stats import rebuild_dealer_stats
+
+
+class RowError(ValueError):
+    pass
+
+
+def _parse_row(row, user):
+    if not isinstance(row, dict):
+        raise RowError("Expected a JSON object")
+    try:
+        dealer_id = int(row.get("dealership"))
+    except (TypeError, ValueError):
+        raise RowError("Missing or invalid dealership")
+    review_text = row.get("review")
+    if not isinstance(review_text, str) or not review_text.strip():
+        raise RowError("Missing review text")
+    purchase_date = None
+    if row.get("purchase_date"):
+        try:
+            purchase_date = datetime.date.fromisoformat(row["purchase_date"])
+        except (TypeError, ValueError):
+            raise RowError("Invalid purchase_date, expected YYYY-MM-DD")
+    car_year = row.get("car_year") or None
+    if car_year is not None:
+        try:
+            car_year = int(car_year)
+        except (TypeError, ValueError):
+            raise RowError("Invalid car_year")
+    name = row.get("name") or ""
+    if not name and user is not None:
+        name = f"{user.first_name} {user.last_name}".strip() or user.username
+    return Review(
+        dealer_id=dealer_id,
+        user=user,
+        name=name,
+        review=review_text,
+        purchase=bool(row.get("purchase", False)),
+        purchase_date=purchase_date,
+        car_make=row.get("car_make", "") or "",
+        car_model=row.get("car_model", "") or "",
+        car_year=car_year,
+    )
+
+
+def ingest_reviews(rows, user=None, chunk_size=500, row_numbers=None):
+    """Validate, score and insert review dicts in one transaction.
+
+    Invalid rows are skipped and reported; they do not abort the batch.
+    Returns {"created": n, "errors": [{"row": number, "error": message}, ...]}
+    where rows are numbered by their list index, or by row_numbers if given.
+    """
+    errors = []
+    parsed = []
+    for index, row in zip(row_numbers or itertools.count(), rows):
+        try:
+            parsed.append((index, _parse_row(row, user)))
+        except RowError as e:
+            errors.append({"row": index, "error": str(e)})
+
+    dealers = Dealer.objects.only("id").in_bulk({review.dealer_id for _, review in parsed})
+    valid = []
+    for index, review in parsed:
+        if review.dealer_id in dealers:
+            valid.append(review)
+        else:
+            errors.append({"row": index, "error": "Dealer not found"})
+    errors.sort(key=lambda e: e["row"])
+
+    for review, sentiment in zip(valid, sentiment_engine.analyze_batch([r.review for r in valid])):
+        review.sentiment = sentiment
+    if valid:
+        with transaction.atomic():
+            Review.objects.bulk_create(valid, batch_size=chunk_size)
+            dealer_ids = {r.dealer_id for r in valid}
+            rebuild_dealer_stats(dealer_ids)
+            rollups.record(valid)
+            transaction.on_commit(partial(live.publish, dealer_ids))
+    return {"created": len(valid), "errors": errors}
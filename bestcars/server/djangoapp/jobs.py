@@ -0,0 +1,157 @@
+"""Background jobs: follow-up work that request handlers enqueue instead of doing.
+
+JOBS_MODE "db" stores each job as a Job row, in the caller's transaction, and
+`manage.py run_jobs` runs them in a thread pool. A job's handler and the
+row's "done" update commit together, and the update only matches the attempt
+that owns the row, so a job's effects commit once even when requeue_stale()
+hands a slow attempt to another worker; a failed attempt is rolled back and
+retried with an exponential backoff (JOBS_RETRY_DELAY, doubled per attempt)
+until max_attempts. JOBS_MODE "inline" (tests, local development) runs the handler
+at once, inside the caller's transaction.
+
+Handlers are registered with @task and take the payload as keyword arguments.
+"""
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+
+
+def task(name, max_attempts=None):
+    """Register the decorated function as the handler of jobs called `name`."""
+    def decorator(func):
+        _tasks[name] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def mode():
+    return getattr(settings, "JOBS_MODE", "inline")
+
+
+def enqueue(name, key=None, delay=0, using="default", **payload):
+    """Queue the job `name` with `payload`; a job with the same key is only queued once.
+
+    Call it inside the transaction that writes the data the job reads.
+    """
+    func, max_attempts = _tasks[name]
+    if mode() == "inline":
+        func(**payload)
+        return
+    job = Job(name=name, payload=payload, key=key,
+              max_attempts=max_attempts or getattr(settings, "JOBS_MAX_ATTEMPTS", 5),
+              run_at=timezone.now() + datetime.timedelta(seconds=delay))
+    if key is None:
+        job.save(using=using)
+    else:
+        Job.objects.using(using).bulk_create([job], ignore_conflicts=True)
+
+
+# ─── Worker ──────────────────────────────────────────────────────────────────
+
+def backoff(attempts):
+    """Seconds before retrying a job that failed `attempts` times."""
+    return min(getattr(settings, "JOBS_RETRY_DELAY", 10) * 2 ** (attempts - 1), 3600)
+
+
+def requeue_stale(now=None):
+    """Give back jobs left running by a worker that died (their work was rolled back)."""
+    now = now or timezone.now()
+    cutoff = now - datetime.timedelta(seconds=getattr(settings, "JOBS_TIMEOUT", 300))
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=cutoff).update(status=Job.QUEUED, run_at=now)
+
+
+def claim(limit, now=None):
+    """Mark up to `limit` due jobs as running and return them.
+
+    The status check in the UPDATE makes the claim safe between workers on
+    every database, without row locks.
+    """
+    now = now or timezone.now()
+    due = (Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+           .order_by("run_at", "id").values_list("id", flat=True)[:limit])
+    claimed = []
+    for job_id in due:
+        if Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+                status=Job.RUNNING, attempts=F("attempts") + 1, started_at=now):
+            claimed.append(job_id)
+    return list(Job.objects.filter(id__in=claimed).order_by("run_at", "id"))
+
+
+def _owned(job):
+    """The job's row, as long as the attempt `job` was claimed for is the current one."""
+    return Job.objects.filter(id=job.id, status=Job.RUNNING, attempts=job.attempts)
+
+
+def run(job):
+    """Run a claimed job; True if it succeeded."""
+    lag = (job.started_at - job.run_at).total_seconds()
+    start = time.perf_counter()
+    try:
+        func, _ = _tasks[job.name]
+        with transaction.atomic():
+            # Mark the job done first, and only if this attempt still owns it:
+            # an attempt given back by requeue_stale() and claimed again, or
+            # already done, finds no row and commits nothing.
+            if not _owned(job).update(status=Job.DONE, finished_at=timezone.now(), last_error=""):
+                logger.warning("Job %s #%s attempt %d superseded, skipped", job.name, job.id, job.attempts)
+                return False
+            func(**job.payload)
+    except Exception as e:
+        now = timezone.now()
+        retry = job.attempts < job.max_attempts
+        if retry:
+            changes = {"status": Job.QUEUED, "run_at": now + datetime.timedelta(seconds=backoff(job.attempts))}
+        else:
+            changes = {"status": Job.FAILED, "finished_at": now}
+        _owned(job).update(last_error=repr(e)[:2000], **changes)
+        logger.warning("Job %s #%s failed (attempt %d/%d%s): %r", job.name, job.id, job.attempts,
+                       job.max_attempts, ", will retry" if retry else "", e)
+        return False
+    logger.info("Job %s #%s done in %.1f ms (lag %.2f s)", job.name, job.id,
+                (time.perf_counter() - start) * 1000, lag)
+    return True
+
+
+def prune(days, now=None):
+    """Delete finished jobs older than `days` days; returns how many."""
+    cutoff = (now or timezone.now()) - datetime.timedelta(days=days)
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()[0]
+
+
+def run_pending(limit=100):
+    """Run the due jobs in this thread (tests, `run_jobs --once`); returns how many ran."""
+    jobs = claim(limit)
+    for job in jobs:
+        run(job)
+    return len(jobs)
+
+
+# ─── Metrics ─────────────────────────────────────────────────────────────────
+
+def render_metrics(now=None):
+    """Queue gauges in the Prometheus text format, appended to djangoapp/metrics."""
+    now = now or timezone.now()
+    counts = dict.fromkeys([Job.QUEUED, Job.RUNNING, Job.FAILED], 0)
+    rows = Job.objects.filter(status__in=list(counts)).values("status").annotate(n=Count("id")).order_by()
+    counts.update((row["status"], row["n"]) for row in rows)
+    oldest = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).aggregate(oldest=Min("run_at"))["oldest"]
+    lag = (now - oldest).total_seconds() if oldest else 0.0
+    return "\n".join([
+        "# HELP bestcars_jobs Jobs by status.",
+        "# TYPE bestcars_jobs gauge",
+        *(f'bestcars_jobs{{status="{status}"}} {count}' for status, count in counts.items()),
+        "# HELP bestcars_job_lag_seconds How long the oldest due job has been waiting.",
+        "# TYPE bestcars_job_lag_seconds gauge",
+        f"bestcars_job_lag_seconds {lag:.3f}",
+    ]) + "\n"
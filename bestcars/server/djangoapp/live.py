@@ -0,0 +1,90 @@
+"""Live review feed: wake up the SSE streams of a dealer when reviews commit.
+
+Messages carry no review data, only "dealer X has new reviews": each stream
+then reads the rows after its last id (the same range scan as the
+reviews/dealer/<id>/changes poll), so a missed or coalesced message loses
+nothing.
+
+The broadcaster is in-process. With several workers, LIVE_BACKEND = "db"
+also runs one poller per worker that looks for new review ids every
+LIVE_POLL_SECONDS while streams are open, so reviews written by another
+worker (or by a job) still reach them.
+"""
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Review
+
+
+class Broadcaster:
+    """dealer id -> asyncio.Events of the open streams; publish() works from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    def subscribe(self, dealer_id):
+        """Return an Event set whenever the dealer gets new reviews (call in the stream's loop)."""
+        event = asyncio.Event()
+        with self._lock:
+            self._streams.setdefault(dealer_id, {})[event] = asyncio.get_running_loop()
+        return event
+
+    def unsubscribe(self, dealer_id, event):
+        with self._lock:
+            streams = self._streams.get(dealer_id, {})
+            streams.pop(event, None)
+            if not streams:
+                self._streams.pop(dealer_id, None)
+
+    def publish(self, dealer_id):
+        with self._lock:
+            streams = list(self._streams.get(dealer_id, {}).items())
+        for event, loop in streams:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # loop closed: the stream is gone
+                self.unsubscribe(dealer_id, event)
+
+    def count(self):
+        with self._lock:
+            return sum(len(streams) for streams in self._streams.values())
+
+
+broadcaster = Broadcaster()
+
+
+def publish(dealer_ids):
+    """transaction.on_commit() callback of the review writers."""
+    for dealer_id in dealer_ids:
+        broadcaster.publish(dealer_id)
+
+
+# ─── Database poller (LIVE_BACKEND = "db") ───────────────────────────────────
+
+_pollers = {}
+
+
+async def _poll(loop):
+    last = (await Review.objects.aaggregate(last=Max("id")))["last"] or 0
+    try:
+        while broadcaster.count():
+            await asyncio.sleep(getattr(settings, "LIVE_POLL_SECONDS", 2))
+            rows = Review.objects.filter(id__gt=last).values("dealer_id").annotate(last=Max("id")).order_by()
+            async for row in rows:
+                broadcaster.publish(row["dealer_id"])
+                last = max(last, row["last"])
+    finally:
+        _pollers.pop(loop, None)
+
+
+def ensure_poller():
+    """Start this event loop's poller if the db backend is on and none runs."""
+    if getattr(settings, "LIVE_BACKEND", "local") != "db":
+        return
+    loop = asyncio.get_running_loop()
+    if loop not in _pollers:
+        _pollers[loop] = loop.create_task(_poll(loop))
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from djangoapp.dump import CHUNK_ROWS, FORMATS, MODELS, Dump
+
+
+class Command(BaseCommand):
+    help = "Stream every review or dealer to a CSV or NDJSON file (optionally gzipped), in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(MODELS))
+        parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+        parser.add_argument("--output", "-o", default="-", help="File to write, '-' for stdout.")
+        parser.add_argument("--gzip", action="store_true")
+        parser.add_argument("--since", help="Reviews created on/after this date (YYYY-MM-DD or ISO datetime).")
+        parser.add_argument("--dealer", type=int, help="Only this dealer (or its reviews).")
+        parser.add_argument("--state", help="Only dealers (or their reviews) in this state, name or code.")
+        parser.add_argument("--after-id", type=int, default=0, help="Resume after this id.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_ROWS, help="Rows fetched and written at a time.")
+
+    def handle(self, *args, **options):
+        try:
+            export = Dump(options["kind"], options["format"], since=options["since"], dealer=options["dealer"],
+                          state=options["state"], after_id=options["after_id"], gzip=options["gzip"],
+                          chunk_size=options["chunk_size"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        # A resumed export is appended to the file; a cut-off gzip member cannot
+        # be continued, so gzipped ones should go to a new file.
+        append = options["after_id"] and not options["gzip"]
+        out = sys.stdout.buffer if options["output"] == "-" else open(options["output"], "ab" if append else "wb")
+        written = options["after_id"]
+        try:
+            for data, last_id in export.blocks():
+                out.write(data)
+                out.flush()
+                written = last_id
+        except BaseException:
+            self.stderr.write(f"Interrupted: resume with --after-id {written}")
+            raise
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        self.stderr.write(self.style.SUCCESS(f"Done: last id {written}."))
@@ -0,0 +1,60 @@
+import json
+import sys
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from djangoapp.ingest import ingest_reviews
+
+
+class Command(BaseCommand):
+    help = "Import reviews from a JSONL file (one add_review-style JSON object per line)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSONL file, '-' for stdin.")
+        parser.add_argument("--chunk-size", type=int, default=1000,
+                            help="Lines per transaction (and per INSERT batch).")
+        parser.add_argument("--username", help="Attach the reviews to this user.")
+        parser.add_argument("--max-errors", type=int, default=20, help="Errors to print (all are counted).")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["username"]:
+            try:
+                user = User.objects.get(username=options["username"])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user: {options['username']}")
+
+        if options["path"] == "-":
+            self._import(sys.stdin, user, options)
+        else:
+            with open(options["path"], encoding="utf-8") as f:
+                self._import(f, user, options)
+
+    def _import(self, lines, user, options):
+        chunk_size = options["chunk_size"]
+        created = failed = read = 0
+        numbered = enumerate(lines, start=1)
+        while True:
+            chunk = list(islice(numbered, chunk_size))
+            if not chunk:
+                break
+            read = chunk[-1][0]
+            rows, row_numbers, errors = [], [], []
+            for line_no, line in chunk:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                    row_numbers.append(line_no)
+                except ValueError:
+                    errors.append({"row": line_no, "error": "Invalid JSON"})
+            result = ingest_reviews(rows, user=user, chunk_size=chunk_size, row_numbers=row_numbers)
+            for error in sorted(errors + result["errors"], key=lambda e: e["row"]):
+                if failed < options["max_errors"]:
+                    self.stderr.write(f"line {error['row']}: {error['error']}")
+                failed += 1
+            created += result["created"]
+            self.stdout.write(f"{read} lines read, {created} reviews created, {failed} rejected")
+        self.stdout.write(self.style.SUCCESS(f"Done: {created} reviews created, {failed} rejected."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from djangoapp.stats import rebuild_dealer_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the DealerStats table from the Review table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dealer_ids", nargs="*", type=int, help="Only these dealers (default: all).")
+
+    def handle(self, *args, **options):
+        count = rebuild_dealer_stats(options["dealer_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} dealers."))
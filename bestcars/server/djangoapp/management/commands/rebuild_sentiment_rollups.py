@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from djangoapp import rollups
+from djangoapp.dates import parse_since
+
+
+class Command(BaseCommand):
+    help = "Recompute the sentiment trend rollups from the Review table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day to rebuild (YYYY-MM-DD; default: all).")
+        parser.add_argument("--end", help="Last day to rebuild (YYYY-MM-DD; default: all).")
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_since(options["start"]).date() if options["start"] else None
+            end = parse_since(options["end"]).date() if options["end"] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        count = rollups.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} rollup rows."))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from djangoapp import rollups
+from djangoapp.dates import parse_since
+from djangoapp.models import Review
+from djangoapp.sentiment import engine
+from djangoapp.stats import rebuild_dealer_stats
+
+
+def _since(value):
+    try:
+        return parse_since(value)
+    except ValueError as e:
+        raise CommandError(str(e))
+
+
+class Command(BaseCommand):
+    help = "Re-run sentiment analysis over stored reviews and save the labels that changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Only reviews created on/after this date (YYYY-MM-DD or ISO datetime).")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true", help="Count changes without writing them.")
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.order_by("id")
+        if options["since"]:
+            reviews = reviews.filter(created_at__gte=_since(options["since"]))
+
+        chunk_size = options["chunk_size"]
+        total = reviews.count()
+        seen = changed = 0
+        self.dealer_ids = set()
+        chunk = []
+        for row in reviews.only("id", "dealer_id", "review", "sentiment").iterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                changed += self._rescore(chunk, options["dry_run"])
+                seen += len(chunk)
+                chunk = []
+                self.stdout.write(f"{seen}/{total} reviews scored, {changed} changed")
+        if chunk:
+            changed += self._rescore(chunk, options["dry_run"])
+            seen += len(chunk)
+        if self.dealer_ids and not options["dry_run"]:
+            rebuild_dealer_stats(self.dealer_ids)
+            rollups.rebuild(start=_since(options["since"]).date() if options["since"] else None)
+        self.stdout.write(self.style.SUCCESS(f"Done: {seen} reviews scored, {changed} changed."))
+
+    def _rescore(self, reviews, dry_run):
+        updated = []
+        for review, sentiment in zip(reviews, engine.analyze_batch([r.review for r in reviews])):
+            if review.sentiment != sentiment:
+                review.sentiment = sentiment
+                updated.append(review)
+                self.dealer_ids.add(review.dealer_id)
+        if updated and not dry_run:
+            Review.objects.bulk_update(updated, ["sentiment"])
+        return len(updated)
@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from djangoapp import jobs
+
+
+def _run(job):
+    # Each pool thread keeps its own connection; drop it if broken or too old.
+    close_old_connections()
+    try:
+        return jobs.run(job)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (JOBS_MODE=db) in a thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=getattr(settings, "JOBS_WORKER_THREADS", 4))
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds between polls when idle.")
+        parser.add_argument("--once", action="store_true", help="Run the due jobs in this thread, then exit.")
+        parser.add_argument("--keep-days", type=int, default=7, help="Delete finished jobs older than this.")
+
+    def handle(self, *args, **options):
+        threads = options["threads"]
+        done = failed = 0
+        last_cleanup = float("-inf")
+        # --once runs in this thread: a cron job or a test, no pool needed.
+        pool = None if options["once"] else ThreadPoolExecutor(max_workers=threads, thread_name_prefix="job")
+        try:
+            while True:
+                if time.monotonic() - last_cleanup > 60:
+                    jobs.requeue_stale()
+                    jobs.prune(options["keep_days"])
+                    last_cleanup = time.monotonic()
+                batch = jobs.claim(threads * 2)
+                for ok in (pool.map(_run, batch) if pool else map(jobs.run, batch)):
+                    done += ok
+                    failed += not ok
+                if not batch:
+                    if options["once"]:
+                        break
+                    connection.close_if_unusable_or_obsolete()
+                    time.sleep(options["poll"])
+        finally:
+            if pool:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(f"Done: {done} jobs succeeded, {failed} failed."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from djangoapp.views import init_data
+
+
+class Command(BaseCommand):
+    help = "Populate the database with the sample dealers, reviews and car catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias to seed.")
+
+    def handle(self, *args, **options):
+        if init_data(using=options["database"]):
+            self.stdout.write(self.style.SUCCESS("Sample data created."))
+        else:
+            self.stdout.write("Dealers already present, nothing to do.")
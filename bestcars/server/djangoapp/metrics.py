@@ -0,0 +1,147 @@
+"""In-process request metrics.
+
+Each request handled by MetricsMiddleware gets a RequestMetrics object in a
+context variable. Database queries (through a wrapper installed on every new
+connection) and timed() blocks such as sentiment scoring and serialization
+add to it; the middleware then folds it into the process-wide registry, which
+the metrics endpoint renders in the Prometheus text format.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the request duration histogram buckets.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statements kept per request for the slow-request log.
+MAX_CAPTURED_QUERIES = 50
+
+_current = contextvars.ContextVar("bestcars_request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        self.spans = {}
+        self.sql = []
+
+    def add_query(self, sql, duration):
+        self.db_time += duration
+        self.queries += 1
+        if len(self.sql) < MAX_CAPTURED_QUERIES:
+            self.sql.append((duration, sql))
+
+
+def begin():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timed(name):
+    """Add the block's duration, minus the DB time spent inside it, to span `name`."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    db_before = metrics.db_time
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start - (metrics.db_time - db_before)
+        metrics.spans[name] = metrics.spans.get(name, 0.0) + max(elapsed, 0.0)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrappers hook timing every query of the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - start)
+
+
+# ─── Registry ────────────────────────────────────────────────────────────────
+
+class Registry:
+    """Per-route totals, safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, status, wall, metrics, response_bytes):
+        with self._lock:
+            r = self._routes.get(route)
+            if r is None:
+                r = self._routes[route] = {
+                    "count": 0, "errors": 0, "wall": 0.0, "db": 0.0, "queries": 0,
+                    "bytes": 0, "spans": {}, "buckets": [0] * len(BUCKETS),
+                }
+            r["count"] += 1
+            r["errors"] += status >= 500
+            r["wall"] += wall
+            r["db"] += metrics.db_time
+            r["queries"] += metrics.queries
+            r["bytes"] += response_bytes
+            for name, seconds in metrics.spans.items():
+                r["spans"][name] = r["spans"].get(name, 0.0) + seconds
+            for i, bound in enumerate(BUCKETS):
+                if wall <= bound:
+                    r["buckets"][i] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {route: {**r, "spans": dict(r["spans"]), "buckets": list(r["buckets"])}
+                    for route, r in self._routes.items()}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        routes = sorted(self.snapshot().items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        family("bestcars_requests_total", "counter", "Requests handled.",
+               [f'bestcars_requests_total{{route="{route}"}} {r["count"]}' for route, r in routes])
+        family("bestcars_request_errors_total", "counter", "Requests answered with a 5xx status.",
+               [f'bestcars_request_errors_total{{route="{route}"}} {r["errors"]}' for route, r in routes])
+        samples = []
+        for route, r in routes:
+            for bound, count in zip(BUCKETS, r["buckets"]):
+                samples.append(f'bestcars_request_duration_seconds_bucket{{route="{route}",le="{bound}"}} {count}')
+            samples.append(f'bestcars_request_duration_seconds_bucket{{route="{route}",le="+Inf"}} {r["count"]}')
+            samples.append(f'bestcars_request_duration_seconds_sum{{route="{route}"}} {r["wall"]:.6f}')
+            samples.append(f'bestcars_request_duration_seconds_count{{route="{route}"}} {r["count"]}')
+        family("bestcars_request_duration_seconds", "histogram", "Wall time per request.", samples)
+        family("bestcars_db_seconds_total", "counter", "Time spent in database queries.",
+               [f'bestcars_db_seconds_total{{route="{route}"}} {r["db"]:.6f}' for route, r in routes])
+        family("bestcars_db_queries_total", "counter", "Database queries executed.",
+               [f'bestcars_db_queries_total{{route="{route}"}} {r["queries"]}' for route, r in routes])
+        family("bestcars_response_bytes_total", "counter", "Response body bytes (non-streaming responses).",
+               [f'bestcars_response_bytes_total{{route="{route}"}} {r["bytes"]}' for route, r in routes])
+        family("bestcars_span_seconds_total", "counter", "Time in instrumented code paths, DB time excluded.",
+               [f'bestcars_span_seconds_total{{route="{route}",span="{name}"}} {seconds:.6f}'
+                for route, r in routes for name, seconds in sorted(r["spans"].items())])
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
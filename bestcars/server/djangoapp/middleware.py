@@ -0,0 +1,117 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics, routers
+
+slow_log = logging.getLogger("djangoapp.slow_requests")
+
+
+class MetricsMiddleware:
+    """Times each request and records it in metrics.registry under its URL name.
+
+    Adds a Server-Timing header (app, db, and the timed() spans) and logs the
+    captured SQL of requests slower than SLOW_REQUEST_MS. For streaming
+    responses only the time to the first byte is measured.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request_metrics, token = metrics.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end(token)
+        return self.finish(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        request_metrics, token = metrics.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end(token)
+        return self.finish(request, response, request_metrics)
+
+    def finish(self, request, response, request_metrics):
+        wall = time.perf_counter() - request_metrics.start
+        match = request.resolver_match
+        route = (match.url_name or match.route) if match else "unmatched"
+        size = 0 if response.streaming else len(response.content)
+        metrics.registry.record(route, response.status_code, wall, request_metrics, size)
+
+        if getattr(settings, "SERVER_TIMING", True):
+            parts = [f"app;dur={wall * 1000:.2f}",
+                     f'db;dur={request_metrics.db_time * 1000:.2f};desc="{request_metrics.queries} queries"']
+            parts += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in request_metrics.spans.items()]
+            response["Server-Timing"] = ", ".join(parts)
+
+        threshold = getattr(settings, "SLOW_REQUEST_MS", 0)
+        if threshold and wall * 1000 >= threshold:
+            lines = [f"  {duration * 1000:8.2f} ms  {sql}" for duration, sql in request_metrics.sql]
+            if request_metrics.queries > len(request_metrics.sql):
+                lines.append(f"  ... {request_metrics.queries - len(request_metrics.sql)} more queries")
+            slow_log.warning(
+                "Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms in DB\n%s",
+                request.method, request.get_full_path(), route, wall * 1000,
+                request_metrics.queries, request_metrics.db_time * 1000, "\n".join(lines))
+        return response
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver: time every query run on the connection."""
+    # First in the list so that connection.execute_wrapper() blocks, which
+    # pop() their own wrapper on exit, never remove this one.
+    if metrics.query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, metrics.query_wrapper)
+
+
+class ReplicaPinMiddleware:
+    """Reads from the primary for clients that wrote in the last REPLICA_PIN_SECONDS.
+
+    Must run outside SessionMiddleware so that session saves count as writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state, token = routers.begin(pinned=routers.PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = routers.begin(pinned=routers.PIN_COOKIE in request.COOKIES)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end(token)
+        return self.finish(state, response)
+
+    def finish(self, state, response):
+        if state.wrote and getattr(settings, "DATABASE_REPLICAS", ()):
+            response.set_cookie(routers.PIN_COOKIE, "1", max_age=getattr(settings, "REPLICA_PIN_SECONDS", 5),
+                                httponly=True, samesite="Lax")
+        return response
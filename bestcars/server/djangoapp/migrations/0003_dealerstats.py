@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:57
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+import django.db.models.deletion
+
+
+def backfill_stats(apps, schema_editor):
+    Review = apps.get_model('djangoapp', 'Review')
+    DealerStats = apps.get_model('djangoapp', 'DealerStats')
+    db = schema_editor.connection.alias
+    rows = Review.objects.using(db).values('dealer_id').annotate(
+        review_count=Count('id'),
+        positive_count=Count('id', filter=Q(sentiment='positive')),
+        negative_count=Count('id', filter=Q(sentiment='negative')),
+        neutral_count=Count('id', filter=Q(sentiment='neutral')),
+        purchase_count=Count('id', filter=Q(purchase=True)),
+        last_review_at=Max('created_at'),
+    ).order_by()
+    DealerStats.objects.using(db).bulk_create([DealerStats(**row) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0002_review_dealer_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DealerStats',
+            fields=[
+                ('dealer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='djangoapp.dealer')),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('positive_count', models.PositiveIntegerField(default=0)),
+                ('negative_count', models.PositiveIntegerField(default=0)),
+                ('neutral_count', models.PositiveIntegerField(default=0)),
+                ('purchase_count', models.PositiveIntegerField(default=0)),
+                ('last_review_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+# Frozen copy of djangoapp.states as of this migration, so the backfill does
+# not change if that module does.
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "DC": "District of Columbia",
+    "FL": "Florida", "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois",
+    "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana",
+    "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada",
+    "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon",
+    "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota",
+    "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont", "VA": "Virginia",
+    "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming",
+    "PR": "Puerto Rico",
+}
+
+
+def canonical_state(value):
+    value = " ".join((value or "").split())
+    return US_STATES.get(value.upper(), value).lower()
+
+
+def backfill_state_key(apps, schema_editor):
+    Dealer = apps.get_model('djangoapp', 'Dealer')
+    dealers = list(Dealer.objects.using(schema_editor.connection.alias).only('id', 'state'))
+    for dealer in dealers:
+        dealer.state_key = canonical_state(dealer.state)
+    Dealer.objects.using(schema_editor.connection.alias).bulk_update(dealers, ['state_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0003_dealerstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dealer',
+            name='state_key',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(backfill_state_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='dealer',
+            index=models.Index(fields=['state_key'], name='dealer_state_key_idx'),
+        ),
+    ]
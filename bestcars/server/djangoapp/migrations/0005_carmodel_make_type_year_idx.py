@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0004_dealer_state_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carmodel',
+            index=models.Index(fields=['car_make', 'car_type', 'year'], name='carmodel_make_type_year_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# Frozen here rather than imported from djangoapp.search: a migration must keep
+# doing what it did when it was written.
+FTS_TABLE = "djangoapp_review_fts"
+GIN_INDEX = "review_search_gin_idx"
+
+
+def _sqlite_statements(review_table):
+    fts = FTS_TABLE
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5(review, content='{review_table}', content_rowid='id', "
+        f"tokenize='porter unicode61')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {review_table} BEGIN "
+        f"INSERT INTO {fts}(rowid, review) VALUES (new.id, new.review); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {review_table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, review) VALUES ('delete', old.id, old.review); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF review ON {review_table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, review) VALUES ('delete', old.id, old.review); "
+        f"INSERT INTO {fts}(rowid, review) VALUES (new.id, new.review); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _gin_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+    return GinIndex(SearchVector("review", config="english"), name=GIN_INDEX)
+
+
+def _has_fts5(connection):
+    """False for an SQLite built without FTS5: search() then scans instead."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_index(apps, schema_editor):
+    review = apps.get_model("djangoapp", "Review")
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.add_index(review, _gin_index())
+    elif vendor == "sqlite" and _has_fts5(schema_editor.connection):
+        # No error handling here: the migration's transaction undoes every
+        # statement if one fails, instead of leaving half an index behind.
+        for sql in _sqlite_statements(review._meta.db_table):
+            schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    review = apps.get_model("djangoapp", "Review")
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.remove_index(review, _gin_index())
+    elif vendor == "sqlite":
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0005_carmodel_make_type_year_idx'),
+    ]
+
+    operations = [
+        # Vendor-specific: GIN expression index on Postgres, FTS5 table + triggers on SQLite.
+        migrations.RunPython(create_index, drop_index),
+    ]
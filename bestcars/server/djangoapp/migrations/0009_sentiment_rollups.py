@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('djangoapp', '0008_review_dealer_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DealerSentimentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('bucket', models.DateField()),
+                ('review_count', models.IntegerField(default=0)),
+                ('positive_count', models.IntegerField(default=0)),
+                ('negative_count', models.IntegerField(default=0)),
+                ('neutral_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MakeSentimentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('bucket', models.DateField()),
+                ('review_count', models.IntegerField(default=0)),
+                ('positive_count', models.IntegerField(default=0)),
+                ('negative_count', models.IntegerField(default=0)),
+                ('neutral_count', models.IntegerField(default=0)),
+                ('car_make', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='makesentimentrollup',
+            constraint=models.UniqueConstraint(fields=('car_make', 'period', 'bucket'), name='make_rollup_bucket_uniq'),
+        ),
+        migrations.AddField(
+            model_name='dealersentimentrollup',
+            name='dealer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='djangoapp.dealer'),
+        ),
+        migrations.AddIndex(
+            model_name='dealersentimentrollup',
+            index=models.Index(fields=['period', 'bucket'], name='dealer_rollup_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dealersentimentrollup',
+            constraint=models.UniqueConstraint(fields=('dealer', 'period', 'bucket'), name='dealer_rollup_bucket_uniq'),
+        ),
+    ]
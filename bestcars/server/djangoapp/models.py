@@ -1,6 +1,8 @@
-from django.db import models
+from django.db import models, router
 from django.contrib.auth.models import User
 
+from .states import canonical_state
+
 
 class CarMake(models.Model):
     name = models.CharField(max_length=100)
@@ -22,6 +24,11 @@ class CarModel(models.Model):
     car_type = models.CharField(max_length=20, choices=CAR_TYPES, default='SEDAN')
     year = models.IntegerField(default=2023)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['car_make', 'car_type', 'year'], name='carmodel_make_type_year_idx'),
+        ]
+
     def __str__(self):
         return f"{self.car_make.name} {self.name} {self.year}"
 
@@ -36,10 +43,28 @@ class Dealer(models.Model):
     zip_code = models.CharField(max_length=20)
     lat = models.FloatField(default=0)
     lng = models.FloatField(default=0)
+    # canonical_state(state), written on save; the indexed column state filters use.
+    state_key = models.CharField(max_length=100, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state_key'], name='dealer_state_key_idx'),
+        ]
 
     def __str__(self):
         return self.full_name
 
+    def normalize(self):
+        """Fill the derived columns. save() does it; call it before bulk_create."""
+        self.state_key = canonical_state(self.state)
+
+    def save(self, *args, **kwargs):
+        self.normalize()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'state' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'state_key'}
+        super().save(*args, **kwargs)
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -55,6 +80,16 @@ class Dealer(models.Model):
         }
 
 
+class ReviewQuerySet(models.QuerySet):
+    def delete(self):
+        # Recounts the stats and rollups on commit (see signals.py). Not a
+        # delete signal: one would stop Django from deleting a dealer's
+        # reviews in a single statement, and send one signal per review.
+        from .signals import recount_after_delete
+        recount_after_delete(self.using(self._db or router.db_for_write(self.model)))
+        return super().delete()
+
+
 class Review(models.Model):
     SENTIMENT_CHOICES = [
         ('positive', 'Positive'),
@@ -73,13 +108,29 @@ class Review(models.Model):
     sentiment = models.CharField(max_length=20, choices=SENTIMENT_CHOICES, default='neutral')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a dealer's review feed (newest first).
+            models.Index(fields=['dealer', '-created_at', '-id'], name='review_dealer_created_idx'),
+            # Change feed: a dealer's reviews after a given id.
+            models.Index(fields=['dealer', 'id'], name='review_dealer_id_idx'),
+        ]
+
     def __str__(self):
         return f"Review by {self.name} for {self.dealer.full_name}"
 
+    def delete(self, using=None, keep_parents=False):
+        from .signals import recount_after_delete
+        using = using or router.db_for_write(Review, instance=self)
+        recount_after_delete(Review.objects.using(using).filter(pk=self.pk))
+        return super().delete(using, keep_parents)
+
     def to_dict(self):
         return {
             "id": self.id,
-            "dealership": self.dealer.id,
+            "dealership": self.dealer_id,
             "name": self.name,
             "review": self.review,
             "purchase": self.purchase,
@@ -89,3 +140,108 @@ class Review(models.Model):
             "car_year": self.car_year,
             "sentiment": self.sentiment,
         }
+
+
+class DealerStats(models.Model):
+    """Review aggregates per dealer, kept current by add_review (see stats.py)."""
+    dealer = models.OneToOneField(Dealer, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    review_count = models.PositiveIntegerField(default=0)
+    positive_count = models.PositiveIntegerField(default=0)
+    negative_count = models.PositiveIntegerField(default=0)
+    neutral_count = models.PositiveIntegerField(default=0)
+    purchase_count = models.PositiveIntegerField(default=0)
+    last_review_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Stats for dealer {self.dealer_id}"
+
+    @property
+    def purchase_ratio(self):
+        return round(self.purchase_count / self.review_count, 4) if self.review_count else 0.0
+
+    def to_dict(self):
+        return {
+            "review_count": self.review_count,
+            "positive": self.positive_count,
+            "negative": self.negative_count,
+            "neutral": self.neutral_count,
+            "purchase_ratio": self.purchase_ratio,
+            "last_review_at": self.last_review_at.isoformat() if self.last_review_at else None,
+        }
+
+
+class SentimentRollup(models.Model):
+    """Review counts by sentiment for one time bucket (see rollups.py)."""
+    DAY, MONTH = "day", "month"
+    PERIOD_CHOICES = [(DAY, 'Day'), (MONTH, 'Month')]
+
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES)
+    # First day of the bucket, in TIME_ZONE
+    bucket = models.DateField()
+    review_count = models.IntegerField(default=0)
+    positive_count = models.IntegerField(default=0)
+    negative_count = models.IntegerField(default=0)
+    neutral_count = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    def to_dict(self):
+        return {
+            "bucket": self.bucket.isoformat(),
+            "reviews": self.review_count,
+            "positive": self.positive_count,
+            "negative": self.negative_count,
+            "neutral": self.neutral_count,
+        }
+
+
+class DealerSentimentRollup(SentimentRollup):
+    dealer = models.ForeignKey(Dealer, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dealer', 'period', 'bucket'], name='dealer_rollup_bucket_uniq'),
+        ]
+        indexes = [
+            # Trends over all dealers (or a state's): one period, a date range.
+            models.Index(fields=['period', 'bucket'], name='dealer_rollup_period_idx'),
+        ]
+
+
+class MakeSentimentRollup(SentimentRollup):
+    # Review.car_make as written by the reviewer
+    car_make = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['car_make', 'period', 'bucket'], name='make_rollup_bucket_uniq'),
+        ]
+
+
+class Job(models.Model):
+    """A unit of background work (see jobs.py), run by `manage.py run_jobs`."""
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    # Idempotency key: a second enqueue() with the same key is a no-op.
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's poll: due jobs of one status, oldest first.
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
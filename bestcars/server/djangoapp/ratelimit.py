@@ -0,0 +1,164 @@
+"""Rate limiting and admission control for the expensive write endpoints.
+
+Limits are sliding windows counted in the API cache with add()/incr(): per
+process with locmem, shared by every worker with Redis, where INCR is atomic.
+(Django's file cache implements incr() as a read and a write, so concurrent
+workers sharing it can let a few extra requests through.) They replace the
+token bucket first used here, which needed a read-modify-write of the bucket
+under a lock; a window counter only needs the cache's atomic increment.
+
+The concurrency cap gives each request in flight one of EXPENSIVE_CONCURRENCY
+slots, a cache key taken with add() and deleted when the request ends, and
+rejects new requests with 503 when all are taken, instead of letting them
+queue inside the workers. Each slot key expires on its own, so the slot of a
+worker killed mid-request comes back after INFLIGHT_TIMEOUT.
+"""
+import json
+import math
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+INFLIGHT_KEY = "ratelimit:inflight"
+# Lifetime of an in-flight slot: longer than any request (gunicorn kills a
+# worker after 30 s), short enough that a leaked slot comes back soon.
+INFLIGHT_TIMEOUT = 60
+
+
+def _cache():
+    return caches[getattr(settings, "API_CACHE_ALIAS", "default")]
+
+
+def parse_rate(rate):
+    """"10/m" -> (10, 60): requests allowed per window and window length in seconds."""
+    count, _, period = rate.partition("/")
+    return int(count), _PERIODS[period]
+
+
+def client_ip(request):
+    """Client address; RATE_LIMIT_PROXIES trusted proxies append to X-Forwarded-For."""
+    proxies = getattr(settings, "RATE_LIMIT_PROXIES", 0)
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(",")]
+        return hops[max(len(hops) - proxies, 0)]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _incr(cache, key, timeout):
+    """Atomically count one more in `key`; the first call creates it."""
+    if cache.add(key, 1, timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:  # expired in between
+        cache.add(key, 1, timeout)
+        return 1
+
+
+def take(key, rate, now=None):
+    """Count a request against the limit; 0 if allowed, else seconds until one would be.
+
+    The sliding window is approximated with two fixed ones: the requests of
+    the current one, plus those of the previous one weighted by the share of
+    it still inside the window. Rejected requests are not counted.
+    """
+    capacity, period = parse_rate(rate)
+    now = time.time() if now is None else now
+    window, elapsed = divmod(now, period)
+    cache = _cache()
+    current_key = f"{key}:{int(window)}"
+    current = _incr(cache, current_key, period * 2)
+    previous = cache.get(f"{key}:{int(window) - 1}", 0)
+    count = previous * (1 - elapsed / period) + current
+    if count <= capacity:
+        return 0
+    try:
+        cache.decr(current_key)
+    except ValueError:
+        pass
+    if current > capacity or not previous:
+        return period - elapsed
+    # Until enough of the previous window has slid out.
+    return min(period - elapsed, (count - capacity) * period / previous)
+
+
+def _username(request):
+    if request.user.is_authenticated:
+        return request.user.username
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return ""
+    return str(data.get("userName", "")) if isinstance(data, dict) else ""
+
+
+def check(request, scope):
+    """Seconds to wait before retrying, or 0 when every limit of the scope allows it."""
+    limits = getattr(settings, "RATE_LIMITS", {}).get(scope, {})
+    keys = {"ip": client_ip(request)}
+    if "user" in limits:
+        keys["user"] = _username(request)
+    wait = 0
+    for kind, rate in limits.items():
+        if keys.get(kind):
+            wait = max(wait, take(f"ratelimit:{scope}:{kind}:{keys[kind]}", rate))
+    return wait
+
+
+def acquire():
+    """Take an in-flight slot for this request: (key, token), or None when all are taken."""
+    limit = getattr(settings, "EXPENSIVE_CONCURRENCY", 0)
+    if not limit:
+        return ("", "")
+    cache = _cache()
+    keys = [f"{INFLIGHT_KEY}:{i}" for i in range(limit)]
+    taken = cache.get_many(keys)
+    token = uuid.uuid4().hex
+    for key in keys:
+        # add() fails if another request took the slot since get_many().
+        if key not in taken and cache.add(key, token, INFLIGHT_TIMEOUT):
+            return (key, token)
+    return None
+
+
+def release(slot):
+    key, token = slot
+    if not key:
+        return
+    cache = _cache()
+    # The slot may have expired and gone to another request: leave that one.
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def _rejected(status, message, retry_after):
+    response = JsonResponse({"status": status, "message": message}, status=status)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def limit(scope):
+    """View decorator: RATE_LIMITS[scope] per IP / username, then the concurrency cap."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method != "POST":
+                return view(request, *args, **kwargs)
+            wait = check(request, scope)
+            if wait:
+                return _rejected(429, "Too many requests", wait)
+            slot = acquire()
+            if slot is None:
+                return _rejected(503, "Server busy, retry shortly", 1)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                release(slot)
+        return wrapped
+    return decorator
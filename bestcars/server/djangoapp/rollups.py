@@ -0,0 +1,156 @@
+"""Sentiment trend rollups: review counts per day and per month, by dealer and by make.
+
+New reviews are added incrementally (record()), with one upsert statement per
+rollup table, by the review_added job and by bulk ingestion alike. rebuild()
+recomputes a date range from the Review table, and refresh() the months of
+some dealers and makes after reviews are deleted. The analytics endpoint only
+reads these tables, so its cost depends on the number of buckets asked for,
+not on the number of reviews."""
+import datetime
+from collections import Counter
+
+from django.db import connections, transaction
+from django.db.models import Count, DateField, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import DealerSentimentRollup, MakeSentimentRollup, SentimentRollup
+from .stats import counted_reviews
+
+PERIODS = (SentimentRollup.DAY, SentimentRollup.MONTH)
+UPSERT_BATCH = 500
+_COUNTS = {"positive": "positive_count", "negative": "negative_count", "neutral": "neutral_count"}
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def bucket(day, period):
+    return month_start(day) if period == SentimentRollup.MONTH else day
+
+
+def next_month(day):
+    return (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+# ─── Incremental updates ─────────────────────────────────────────────────────
+
+def _upsert(model, key_fields, rows, using):
+    """Add rows' counts to the existing ones: INSERT ... ON CONFLICT DO UPDATE (SQLite and Postgres)."""
+    counts = ["review_count", *_COUNTS.values()]
+    columns = [*key_fields, *counts]
+    table = model._meta.db_table
+    sets = ", ".join(f"{c} = {table}.{c} + excluded.{c}" for c in counts)
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES {{placeholders}} "
+           f"ON CONFLICT ({', '.join(key_fields)}) DO UPDATE SET {sets}")
+    values = [(*key, *(c[f] for f in counts)) for key, c in rows.items()]
+    with connections[using].cursor() as cursor:
+        # Batches stay under SQLite's limit on query parameters.
+        for i in range(0, len(values), UPSERT_BATCH):
+            batch = values[i:i + UPSERT_BATCH]
+            placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(batch))
+            cursor.execute(sql.format(placeholders=placeholders), [v for row in batch for v in row])
+
+
+def record(reviews, sign=1, using="default"):
+    """Add (sign=-1: remove) reviews to the rollups. Call inside their transaction.
+
+    Needs dealer_id, car_make, sentiment and created_at on each review.
+    """
+    dealer_rows, make_rows = {}, {}
+    for review in reviews:
+        day = timezone.localdate(review.created_at)
+        for period in PERIODS:
+            keys = [(dealer_rows, (review.dealer_id, period, bucket(day, period)))]
+            if review.car_make:
+                keys.append((make_rows, (review.car_make, period, bucket(day, period))))
+            for rows, key in keys:
+                counts = rows.setdefault(key, Counter())
+                counts["review_count"] += sign
+                if review.sentiment in _COUNTS:
+                    counts[_COUNTS[review.sentiment]] += sign
+    if dealer_rows:
+        _upsert(DealerSentimentRollup, ["dealer_id", "period", "bucket"], dealer_rows, using)
+    if make_rows:
+        _upsert(MakeSentimentRollup, ["car_make", "period", "bucket"], make_rows, using)
+
+
+# ─── Rebuild ─────────────────────────────────────────────────────────────────
+
+def _aggregate(reviews, period, group):
+    return (reviews.annotate(bucket=Trunc("created_at", period, output_field=DateField()))
+            .values(group, "bucket").order_by()
+            .annotate(review_count=Count("id"),
+                      **{field: Count("id", filter=Q(sentiment=sentiment)) for sentiment, field in _COUNTS.items()}))
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+
+
+def _recompute(dealer_rollups, dealer_reviews, make_rollups, make_reviews, using):
+    """Replace the given rollup rows by the aggregates of the reviews; returns rows written."""
+    written = 0
+    with transaction.atomic(using=using):
+        dealer_rollups.delete()
+        make_rollups.delete()
+        for period in PERIODS:
+            written += _insert(DealerSentimentRollup, period, _aggregate(dealer_reviews, period, "dealer_id"), using)
+            written += _insert(MakeSentimentRollup, period,
+                               _aggregate(make_reviews.exclude(car_make=""), period, "car_make"), using)
+    return written
+
+
+def rebuild(start=None, end=None, using="default"):
+    """Recompute the rollups of the reviews created from `start` to `end` (dates, inclusive).
+
+    The range is widened to whole months, the buckets of the widest period.
+    Returns the number of rollup rows written.
+    """
+    dealer_rollups = DealerSentimentRollup.objects.using(using)
+    make_rollups = MakeSentimentRollup.objects.using(using)
+    reviews = counted_reviews(using)
+    if start is not None:
+        start = month_start(start)
+        dealer_rollups = dealer_rollups.filter(bucket__gte=start)
+        make_rollups = make_rollups.filter(bucket__gte=start)
+        reviews = reviews.filter(created_at__gte=_aware(start))
+    if end is not None:
+        end = next_month(end)
+        dealer_rollups = dealer_rollups.filter(bucket__lt=end)
+        make_rollups = make_rollups.filter(bucket__lt=end)
+        reviews = reviews.filter(created_at__lt=_aware(end))
+    return _recompute(dealer_rollups, reviews, make_rollups, reviews, using)
+
+
+def refresh(dealer_ids, car_makes, days, using="default"):
+    """Recompute the rollups of some dealers and makes over the months of `days`.
+
+    For deletes, whose reviews may or may not have been counted yet.
+    """
+    dealer_ids, car_makes = set(dealer_ids), set(car_makes) - {""}
+    if not days or not (dealer_ids or car_makes):
+        return 0
+    start, end = month_start(min(days)), next_month(max(days))
+    in_range = {"bucket__gte": start, "bucket__lt": end}
+    reviews = counted_reviews(using).filter(created_at__gte=_aware(start), created_at__lt=_aware(end))
+    return _recompute(
+        DealerSentimentRollup.objects.using(using).filter(dealer_id__in=dealer_ids, **in_range),
+        reviews.filter(dealer_id__in=dealer_ids),
+        MakeSentimentRollup.objects.using(using).filter(car_make__in=car_makes, **in_range),
+        reviews.filter(car_make__in=car_makes),
+        using)
+
+
+def _insert(model, period, rows, using, batch_size=1000):
+    written = 0
+    batch = []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(model(period=period, **row))
+        if len(batch) == batch_size:
+            written += len(model.objects.using(using).bulk_create(batch))
+            batch = []
+    if batch:
+        written += len(model.objects.using(using).bulk_create(batch))
+    return written
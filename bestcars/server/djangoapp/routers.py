@@ -0,0 +1,59 @@
+"""Primary/replica database routing.
+
+Reads go to a random alias of settings.DATABASE_REPLICAS, writes to
+"default". A request that writes reads from the primary for the rest of the
+request, and ReplicaPinMiddleware sets a short-lived cookie so that the same
+client keeps reading from the primary for REPLICA_PIN_SECONDS afterwards (its
+own review shows up even if the replicas lag behind). Outside requests
+(management commands) reads always go to a replica: use .using("default")
+where a read must see a write made just before.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+
+PRIMARY = "default"
+PIN_COOKIE = "bestcars_primary"
+
+
+class RequestRouting:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = contextvars.ContextVar("bestcars_routing", default=None)
+
+
+def begin(pinned=False):
+    state = RequestRouting(pinned)
+    return state, _state.set(state)
+
+
+def end(token):
+    _state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "DATABASE_REPLICAS", ())
+        if not replicas:
+            return None
+        state = _state.get()
+        if state is not None and (state.pinned or state.wrote):
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema and rows from the primary.
+        return db not in getattr(settings, "DATABASE_REPLICAS", ())
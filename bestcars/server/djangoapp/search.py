@@ -0,0 +1,125 @@
+"""Full-text review search.
+
+Postgres: a GIN expression index on to_tsvector('english', review), queried
+with the same SearchVector expression so the planner uses it. SQLite: an
+FTS5 table over djangoapp_review (porter stemming), kept in sync by triggers,
+so every insert, update or delete, bulk ones included, updates the index
+incrementally. Both rank matches (ts_rank / bm25, higher is better) and page
+with a (rank, id) keyset. Without FTS5 the search falls back to a LIKE scan.
+"""
+import base64
+import binascii
+import json
+import re
+
+from django.db import OperationalError, connections, router
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+
+from .models import Dealer, Review
+
+# Created by migration 0006.
+FTS_TABLE = "djangoapp_review_fts"
+MAX_TERMS = 8
+
+_WORD = re.compile(r"\w+")
+
+
+def terms(q):
+    """Lowercased search words of q (at most MAX_TERMS, duplicates dropped)."""
+    return list(dict.fromkeys(w.lower() for w in _WORD.findall(q or "")))[:MAX_TERMS]
+
+
+def encode_cursor(rank, review_id):
+    raw = json.dumps([rank, review_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (rank, id) for a cursor made by encode_cursor, or raise ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, review_id = json.loads(raw)
+        return float(rank), int(review_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+# ─── Queries ─────────────────────────────────────────────────────────────────
+
+# SQLite databases found without the FTS table (built without FTS5).
+_no_fts = set()
+
+
+def _search_postgres(db, words, state, sentiment, limit, after):
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+    vector = SearchVector("review", config="english")
+    query = SearchQuery(" ".join(words), config="english")
+    reviews = (Review.objects.using(db).annotate(document=vector).filter(document=query)
+               # float8 so that the rank in the cursor compares exactly
+               .annotate(rank=Cast(SearchRank(vector, query), FloatField())))
+    if state:
+        reviews = reviews.filter(dealer__state_key=state)
+    if sentiment:
+        reviews = reviews.filter(sentiment=sentiment)
+    if after:
+        rank, review_id = after
+        reviews = reviews.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=review_id))
+    return list(reviews.order_by("-rank", "-id").values_list("id", "rank")[:limit])
+
+
+def _search_fts(connection, words, state, sentiment, limit, after):
+    fts, reviews, dealers = FTS_TABLE, Review._meta.db_table, Dealer._meta.db_table
+    where, params = [f"{fts} MATCH %s"], [" ".join(f'"{w}"' for w in words)]
+    join = ""
+    if state:
+        join = f"JOIN {dealers} d ON d.id = r.dealer_id"
+        where.append("d.state_key = %s")
+        params.append(state)
+    if sentiment:
+        where.append("r.sentiment = %s")
+        params.append(sentiment)
+    page = ""
+    if after:
+        page = "WHERE rank < %s OR (rank = %s AND id < %s)"
+        params += [after[0], after[0], after[1]]
+    sql = (f"SELECT id, rank FROM (SELECT r.id AS id, -bm25({fts}) AS rank FROM {fts} "
+           f"JOIN {reviews} r ON r.id = {fts}.rowid {join} WHERE {' AND '.join(where)}) "
+           f"{page} ORDER BY rank DESC, id DESC LIMIT %s")
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+def _search_scan(db, words, state, sentiment, limit, after):
+    reviews = Review.objects.using(db)
+    for word in words:
+        reviews = reviews.filter(review__icontains=word)
+    if state:
+        reviews = reviews.filter(dealer__state_key=state)
+    if sentiment:
+        reviews = reviews.filter(sentiment=sentiment)
+    if after:
+        reviews = reviews.filter(id__lt=after[1])
+    return [(review_id, 0.0) for review_id in reviews.order_by("-id").values_list("id", flat=True)[:limit]]
+
+
+def search(words, state=None, sentiment=None, limit=20, after=None):
+    """[(review_id, rank)] of reviews containing every word, best first.
+
+    state is a canonical state key, after the (rank, id) of the last hit of
+    the previous page.
+    """
+    db = router.db_for_read(Review) or "default"
+    connection = connections[db]
+    if connection.vendor == "postgresql":
+        return _search_postgres(db, words, state, sentiment, limit, after)
+    key = (db, str(connection.settings_dict["NAME"]))
+    if connection.vendor == "sqlite" and key not in _no_fts:
+        try:
+            return _search_fts(connection, words, state, sentiment, limit, after)
+        except OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            _no_fts.add(key)
+    return _search_scan(db, words, state, sentiment, limit, after)
@@ -0,0 +1,99 @@
+"""Lexicon-based sentiment scoring.
+
+The lexicon is compiled once into a word -> weight dict and texts are split
+into whole words, so "good" no longer matches inside "goodbye". A negation
+word ("not", "never", ...) flips the sign of the sentiment words that follow
+it within NEGATION_WINDOW words.
+"""
+import string
+
+from .metrics import timed
+
+POSITIVE = {
+    "great": 1.0, "excellent": 2.0, "amazing": 2.0, "fantastic": 2.0, "wonderful": 2.0,
+    "good": 1.0, "best": 2.0, "love": 1.5, "loved": 1.5, "loves": 1.5, "perfect": 2.0,
+    "outstanding": 2.0, "superb": 2.0, "awesome": 2.0, "happy": 1.0, "satisfied": 1.0,
+    "recommend": 1.5, "recommended": 1.5, "recommends": 1.5, "helpful": 1.0,
+    "friendly": 1.0, "clean": 0.5, "fast": 0.5, "professional": 1.0, "honest": 1.0,
+}
+
+NEGATIVE = {
+    "bad": 1.0, "terrible": 2.0, "horrible": 2.0, "awful": 2.0, "worst": 2.0,
+    "hate": 2.0, "hated": 2.0, "poor": 1.0, "disappointing": 1.5, "disappointed": 1.5,
+    "unhappy": 1.0, "rude": 1.5, "slow": 0.5, "overpriced": 1.0, "broken": 1.0,
+    "failed": 1.0, "waste": 1.5, "problem": 1.0, "problems": 1.0, "issue": 1.0,
+    "issues": 1.0, "dishonest": 2.0, "unprofessional": 1.5, "scam": 2.0,
+    "scammed": 2.0, "angry": 1.5, "frustrated": 1.5, "frustrating": 1.5,
+}
+
+# Apostrophes are dropped before lookup: "don't" is matched as "dont".
+NEGATIONS = frozenset({
+    "not", "no", "never", "nothing", "hardly", "barely", "without",
+    "isnt", "wasnt", "arent", "werent", "dont", "didnt", "doesnt",
+    "wont", "wouldnt", "cant", "couldnt",
+})
+
+NEGATION_WINDOW = 3
+
+# Punctuation and digits become word separators, apostrophes disappear.
+_SEPARATORS = str.maketrans(
+    {c: " " for c in string.punctuation.replace("'", "") + string.digits} | {"'": None, "\u2019": None})
+
+
+class SentimentEngine:
+    """Scores text against a weighted lexicon; build once, reuse for every call."""
+
+    def __init__(self, positive=POSITIVE, negative=NEGATIVE, negations=NEGATIONS,
+                 window=NEGATION_WINDOW):
+        self.weights = {word: weight for word, weight in positive.items()}
+        self.weights.update({word: -weight for word, weight in negative.items()})
+        self.negations = frozenset(negations)
+        self.window = window
+
+    def score(self, text):
+        """Signed score: > 0 leans positive, < 0 leans negative."""
+        if not text:
+            return 0.0
+        tokens = text.lower().translate(_SEPARATORS).split()
+        get = self.weights.get
+        if self.negations.isdisjoint(tokens):
+            # Common case, kept in C: no negation, just add up the weights.
+            return float(sum(filter(None, map(get, tokens))))
+        total = 0.0
+        negated_until = -1
+        for i, token in enumerate(tokens):
+            if token in self.negations:
+                negated_until = i + self.window
+                continue
+            weight = get(token)
+            if weight is not None:
+                total += -weight if i <= negated_until else weight
+        return total
+
+    @staticmethod
+    def label(score):
+        if score > 0:
+            return "positive"
+        if score < 0:
+            return "negative"
+        return "neutral"
+
+    def analyze(self, text):
+        with timed("sentiment"):
+            return self.label(self.score(text))
+
+    def score_batch(self, texts):
+        score = self.score
+        return [score(t) for t in texts]
+
+    def analyze_batch(self, texts):
+        label = self.label
+        with timed("sentiment"):
+            return [label(s) for s in self.score_batch(texts)]
+
+
+engine = SentimentEngine()
+
+
+def analyze_sentiment(text):
+    return engine.analyze(text)
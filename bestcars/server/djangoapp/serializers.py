@@ -0,0 +1,148 @@
+"""Row serializers for the JSON API.
+
+Rows are built straight from .values_list() tuples, without instantiating
+models, and keep the historical response keys ("zip", "long", "dealership").
+A `fields=a,b,c` query parameter projects the rows onto a subset of keys.
+"""
+import json
+from functools import lru_cache
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+
+from .metrics import timed
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used without it
+    orjson = None
+
+# Response key -> model column, in response order.
+DEALER_FIELDS = {
+    "id": "id",
+    "full_name": "full_name",
+    "short_name": "short_name",
+    "address": "address",
+    "city": "city",
+    "state": "state",
+    "st": "st",
+    "zip": "zip_code",
+    "lat": "lat",
+    "long": "lng",
+}
+
+REVIEW_FIELDS = {
+    "id": "id",
+    "dealership": "dealer_id",
+    "name": "name",
+    "review": "review",
+    "purchase": "purchase",
+    "purchase_date": "purchase_date",
+    "car_make": "car_make",
+    "car_model": "car_model",
+    "car_year": "car_year",
+    "sentiment": "sentiment",
+}
+
+# DealerStats columns reached from Dealer (LEFT JOIN through the reverse one-to-one).
+STATS_COLUMNS = (
+    "stats__review_count", "stats__positive_count", "stats__negative_count",
+    "stats__neutral_count", "stats__purchase_count", "stats__last_review_at",
+)
+
+SPECS = {"dealer": DEALER_FIELDS, "review": REVIEW_FIELDS}
+
+
+def _purchase_date(value):
+    return str(value) if value else ""
+
+
+_CONVERTERS = {"purchase_date": _purchase_date}
+
+
+class RowSerializer:
+    """Turns values_list() tuples into response dicts for a fixed set of keys.
+
+    Tuples may carry extra trailing columns (e.g. a pagination key); they are
+    ignored when building the dict.
+    """
+
+    def __init__(self, spec, keys):
+        self.keys = keys
+        self.columns = tuple(spec[k] for k in keys)
+        self.converters = tuple((i, _CONVERTERS[k]) for i, k in enumerate(keys) if k in _CONVERTERS)
+
+    def row(self, values):
+        if self.converters:
+            values = list(values)
+            for i, convert in self.converters:
+                values[i] = convert(values[i])
+        return dict(zip(self.keys, values))
+
+    def rows(self, queryset, chunk_size=None):
+        """List of row dicts; a lazy iterator when chunk_size is given (streaming)."""
+        values = queryset.values_list(*self.columns)
+        if chunk_size:
+            return map(self.row, values.iterator(chunk_size=chunk_size))
+        with timed("serialize"):
+            return list(map(self.row, values))
+
+
+@lru_cache(maxsize=256)
+def _serializer(kind, keys):
+    return RowSerializer(SPECS[kind], keys)
+
+
+def serializer(kind, fields=None):
+    """Serializer for "dealer" or "review" rows, projected on a `fields=` value.
+
+    Raises ValueError for unknown field names.
+    """
+    spec = SPECS[kind]
+    if not fields:
+        return _serializer(kind, tuple(spec))
+    keys = tuple(dict.fromkeys(k.strip() for k in fields.split(",") if k.strip()))
+    unknown = [k for k in keys if k not in spec]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return _serializer(kind, keys)
+
+
+def stats_row(values):
+    """Stats dict (DealerStats.to_dict format) from the STATS_COLUMNS values."""
+    count, positive, negative, neutral, purchases, last_review_at = values
+    count = count or 0
+    return {
+        "review_count": count,
+        "positive": positive or 0,
+        "negative": negative or 0,
+        "neutral": neutral or 0,
+        "purchase_ratio": round(purchases / count, 4) if count else 0.0,
+        "last_review_at": last_review_at.isoformat() if last_review_at else None,
+    }
+
+
+def dealer_rows_with_stats(queryset, ser):
+    n = len(ser.columns)
+    rows = []
+    with timed("serialize"):
+        for values in queryset.values_list(*ser.columns, *STATS_COLUMNS):
+            row = ser.row(values)
+            row["stats"] = stats_row(values[n:])
+            rows.append(row)
+    return rows
+
+
+def dumps(payload):
+    """Compact JSON bytes; orjson when installed."""
+    with timed("serialize"):
+        if orjson is not None:
+            return orjson.dumps(payload)
+        return json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+
+
+def json_response(payload):
+    with timed("serialize"):
+        if orjson is not None:
+            return HttpResponse(orjson.dumps(payload), content_type="application/json")
+        return JsonResponse(payload)
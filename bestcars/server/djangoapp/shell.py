@@ -0,0 +1,114 @@
+"""The single-page app shell (index.html) served by the catch-all route.
+
+The template is rendered once per process into bytes, with gzip and (if the
+brotli package is installed) Brotli variants and an ETag per variant.
+ShellMiddleware answers the catch-all route from these before the session,
+CSRF and auth middleware run; view() serves the same bytes when the
+middleware is not installed. With DEBUG the template is re-read each time.
+"""
+import gzip
+import hashlib
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+TEMPLATE = "index.html"
+# API calls never need the shell: skip the extra resolve() for them.
+API_PREFIX = "/djangoapp/"
+_ACCEPTS = [("br", re.compile(r"\bbr\b")), ("gzip", re.compile(r"\bgzip\b"))]
+
+_variants = None
+
+
+def build():
+    """{encoding: (body, etag)} for "", "gzip" and "br" (when available)."""
+    body = render_to_string(TEMPLATE).encode()
+    digest = hashlib.md5(body).hexdigest()
+    variants = {"": (body, f'"{digest}"'),
+                "gzip": (gzip.compress(body, compresslevel=9, mtime=0), f'"{digest}-gz"')}
+    if brotli is not None:
+        variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+    return variants
+
+
+def variants():
+    global _variants
+    if _variants is None or settings.DEBUG:
+        _variants = build()
+    return _variants
+
+
+def invalidate():
+    global _variants
+    _variants = None
+
+
+def respond(request):
+    available = variants()
+    accept = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    encoding = next((name for name, pattern in _ACCEPTS if name in available and pattern.search(accept)), "")
+    body, etag = available[encoding]
+    if etag in request.META.get("HTTP_IF_NONE_MATCH", ""):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="text/html; charset=utf-8")
+        if encoding:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    # A new deploy must show up at once: keep the copy, revalidate every time.
+    response["Cache-Control"] = "no-cache"
+    response["X-Frame-Options"] = getattr(settings, "X_FRAME_OPTIONS", "DENY")
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+@require_safe
+def view(request, *args, **kwargs):
+    return respond(request)
+
+
+def is_shell(path):
+    try:
+        return resolve(path).func is view
+    except Resolver404:
+        return False
+
+
+class ShellMiddleware:
+    """Answers GET/HEAD requests routed to the shell before the rest of the stack."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def matches(self, request):
+        return (request.method in ("GET", "HEAD") and not request.path_info.startswith(API_PREFIX)
+                and is_shell(request.path_info))
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if self.matches(request):
+            return respond(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.matches(request):
+            return respond(request)
+        return await self.get_response(request)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import DateField
+from django.db.models.functions import Trunc
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import backends, cache, catalog, geo, rollups, stats
+from .models import CarMake, CarModel, Dealer, Review
+
+
+def seed_after_migrate(sender, using="default", plan=None, **kwargs):
+    """Seed sample data at deploy time (build.sh runs migrate) instead of on the first request."""
+    if not getattr(settings, "SEED_DATA_ON_MIGRATE", True):
+        return
+    # Rolling back migrations: the tables may not match the current models.
+    if plan and any(backwards for _, backwards in plan):
+        return
+    from .views import init_data
+    init_data(using=using)
+
+
+@receiver([post_save, post_delete], sender=Dealer)
+def evict_dealer(sender, instance, **kwargs):
+    cache.invalidate_dealers([instance.pk])
+    geo.invalidate()
+
+
+@receiver([post_save, post_delete], sender=CarMake)
+@receiver([post_save, post_delete], sender=CarModel)
+def evict_cars(sender, **kwargs):
+    cache.invalidate_cars()
+    catalog.invalidate()
+
+
+def recount_after_delete(reviews):
+    """Recount, when the transaction commits, the stats and rollups that deleting `reviews` changes.
+
+    Called before the delete by Review.delete() and ReviewQuerySet.delete(),
+    and for a dealer's cascaded reviews by the receiver below: one query for
+    the dealers, makes and months involved, one recount per delete.
+    """
+    using = reviews.db
+    touched = list(reviews.annotate(month=Trunc("created_at", "month", output_field=DateField()))
+                   .values_list("dealer_id", "car_make", "month").order_by().distinct())
+    if not touched:
+        return
+    dealer_ids, car_makes, months = (set(column) for column in zip(*touched))
+
+    def recount():
+        # A deleted dealer's stats and rollups went with it.
+        remaining = set(Dealer.objects.using(using).filter(id__in=dealer_ids).values_list("id", flat=True))
+        if remaining:
+            stats.rebuild_dealer_stats(remaining, using=using)
+        rollups.refresh(remaining, car_makes, months, using=using)
+
+    transaction.on_commit(recount, using=using)
+
+
+@receiver(pre_delete, sender=Dealer)
+def recount_dealer_reviews(sender, instance, using, **kwargs):
+    recount_after_delete(Review.objects.using(using).filter(dealer_id=instance.pk))
+
+
+@receiver([post_save, post_delete], sender=User)
+def evict_user(sender, instance, update_fields=None, **kwargs):
+    # Password, is_active... changes must reach CachedModelBackend.get_user();
+    # the last_login update made by every login can stay stale.
+    if update_fields != frozenset({"last_login"}):
+        backends.evict_user(instance.pk)
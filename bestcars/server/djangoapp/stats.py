@@ -0,0 +1,78 @@
+"""Maintenance of the denormalized DealerStats table.
+
+New reviews are added one at a time by record_review() (from the review_added
+job), with a single UPDATE of F() expressions; rebuild_dealer_stats()
+recomputes rows from the Review table, for seeding, repairs and deletes.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Max, Q, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce, Greatest
+
+from . import cache
+from .models import DealerStats, Job, Review
+
+_SENTIMENT_FIELDS = {
+    "positive": "positive_count",
+    "negative": "negative_count",
+    "neutral": "neutral_count",
+}
+
+
+def record_review(review, using="default"):
+    """Add one new review to its dealer's stats. Call inside the review's transaction."""
+    changes = {
+        "review_count": F("review_count") + 1,
+        # Coalesce first: MAX(NULL, x) is NULL on SQLite.
+        "last_review_at": Greatest(Coalesce("last_review_at", Value(review.created_at)),
+                                   Value(review.created_at)),
+    }
+    field = _SENTIMENT_FIELDS.get(review.sentiment)
+    if field:
+        changes[field] = F(field) + 1
+    if review.purchase:
+        changes["purchase_count"] = F("purchase_count") + 1
+    stats = DealerStats.objects.using(using).filter(dealer_id=review.dealer_id)
+    if not stats.update(**changes):
+        # The dealer's first review: create the row, then count.
+        DealerStats.objects.using(using).get_or_create(dealer_id=review.dealer_id)
+        stats.update(**changes)
+    transaction.on_commit(cache.invalidate_dealer_stats, using=using)
+
+
+def counted_reviews(using="default"):
+    """Reviews already added to the stats and rollups.
+
+    That is all of them but those whose review_added job has not run yet:
+    rebuilds leave these out, and the job adds them afterwards.
+    """
+    pending = (Job.objects.using(using).filter(name="review_added", status__in=[Job.QUEUED, Job.RUNNING])
+               .annotate(review_id=Cast(KeyTextTransform("review_id", "payload"), IntegerField()))
+               .filter(review_id__isnull=False).values("review_id"))
+    return Review.objects.using(using).exclude(id__in=pending)
+
+
+def rebuild_dealer_stats(dealer_ids=None, using="default"):
+    """Recompute stats from the Review table, for all dealers or only dealer_ids.
+
+    Returns the number of DealerStats rows written.
+    """
+    reviews = counted_reviews(using)
+    stats = DealerStats.objects.using(using)
+    if dealer_ids is not None:
+        dealer_ids = list(dealer_ids)
+        reviews = reviews.filter(dealer_id__in=dealer_ids)
+        stats = stats.filter(dealer_id__in=dealer_ids)
+    rows = reviews.values("dealer_id").annotate(
+        review_count=Count("id"),
+        positive_count=Count("id", filter=Q(sentiment="positive")),
+        negative_count=Count("id", filter=Q(sentiment="negative")),
+        neutral_count=Count("id", filter=Q(sentiment="neutral")),
+        purchase_count=Count("id", filter=Q(purchase=True)),
+        last_review_at=Max("created_at"),
+    ).order_by()
+    with transaction.atomic(using=using):
+        stats.delete()
+        created = DealerStats.objects.using(using).bulk_create([DealerStats(**row) for row in rows])
+    transaction.on_commit(cache.invalidate_dealer_stats, using=using)
+    return len(created)
@@ -0,0 +1,29 @@
+"""Job handlers (see jobs.py). Imported by DjangoappConfig.ready()."""
+from django.utils.dateparse import parse_datetime
+
+from . import rollups, stats
+from .jobs import task
+from .models import Review
+
+
+def review_added_payload(review):
+    """Payload of review_added: what the handlers need, so that they read nothing back."""
+    return {"review_id": review.id, "dealer_id": review.dealer_id, "sentiment": review.sentiment,
+            "purchase": review.purchase, "car_make": review.car_make, "created_at": review.created_at.isoformat()}
+
+
+@task("review_added")
+def review_added(review_id, dealer_id, sentiment, purchase, created_at, car_make=""):
+    """Follow-up work for a review written by add_review.
+
+    Adds the review to its dealer's stats and to the rollups. jobs.run() commits this once, and
+    rebuilds leave out reviews whose job has not run (stats.counted_reviews),
+    so the review is counted once. A review deleted before its job ran was
+    never counted: there is nothing to do.
+    """
+    if not Review.objects.filter(id=review_id).exists():
+        return
+    review = Review(id=review_id, dealer_id=dealer_id, sentiment=sentiment, purchase=purchase,
+                    car_make=car_make, created_at=parse_datetime(created_at))
+    stats.record_review(review)
+    rollups.record([review])
@@ -1,7 +1,33 @@
+import asyncio
+import csv
+import datetime
+import gzip
 import json
-from django.test import TestCase, Client
+import os
+import random
+import sqlite3
+import string
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from io import StringIO
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncRequestFactory, TestCase, Client, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from .models import Dealer, Review, CarMake, CarModel
+from django.utils import timezone
+from . import async_views, catalog, dump, geo, jobs, live, metrics, ratelimit, rollups, routers, shell, urls, views
+from .hashers import Argon2PasswordHasher
+from .models import Dealer, DealerSentimentRollup, DealerStats, Job, MakeSentimentRollup, Review, CarMake, CarModel
+from .stats import rebuild_dealer_stats
+from .sentiment import SentimentEngine, engine as sentiment_engine
 from .views import analyze_sentiment, init_data
 
 
@@ -18,6 +44,21 @@ class SentimentTest(TestCase):
     def test_empty(self):
         self.assertEqual(analyze_sentiment(""), "neutral")
 
+    def test_whole_words_only(self):
+        self.assertEqual(analyze_sentiment("Said goodbye, grabbed a tissue."), "neutral")
+
+    def test_negation(self):
+        self.assertEqual(analyze_sentiment("The service was not good."), "negative")
+        self.assertEqual(analyze_sentiment("They didn't do a bad job"), "positive")
+
+    def test_weights(self):
+        engine = SentimentEngine(positive={"nice": 1.0}, negative={"meh": 3.0})
+        self.assertEqual(engine.score("nice nice meh"), -1.0)
+
+    def test_batch_matches_single(self):
+        texts = ["great staff", "rude and slow", "", "not helpful at all", "we bought a car"]
+        self.assertEqual(sentiment_engine.analyze_batch(texts), [analyze_sentiment(t) for t in texts])
+
 
 class InitDataTest(TestCase):
     def test_init_creates_dealers(self):
@@ -36,10 +77,29 @@ class InitDataTest(TestCase):
         count2 = Dealer.objects.count()
         self.assertEqual(count1, count2)
 
+    def test_init_on_empty_db(self):
+        Dealer.objects.all().delete()
+        self.assertTrue(init_data())
+        self.assertEqual(Dealer.objects.count(), 10)
+        self.assertEqual(Review.objects.count(), 6)
+
+    def test_seeded_process_skips_check(self):
+        init_data()
+        with self.assertNumQueries(0):
+            views.ensure_seeded()
+
+    def test_seed_command(self):
+        Dealer.objects.all().delete()
+        out = StringIO()
+        call_command("seed_data", stdout=out)
+        self.assertIn("created", out.getvalue())
+        self.assertGreater(Dealer.objects.count(), 0)
+
 
 class DealerAPITest(TestCase):
     def setUp(self):
         init_data()
+        cache.clear()
         self.client = Client()
 
     def test_get_all_dealers(self):
@@ -83,12 +143,1325 @@ class DealerAPITest(TestCase):
         self.assertIn('CarModels', data)
         self.assertGreater(len(data['CarModels']), 0)
 
+    def test_field_projection(self):
+        data = json.loads(self.client.get('/djangoapp/get_dealers?fields=id,full_name,zip').content)
+        self.assertEqual(set(data['dealers'][0]), {'id', 'full_name', 'zip'})
+        dealer = Dealer.objects.first()
+        data = json.loads(self.client.get(f'/djangoapp/dealer/{dealer.id}?fields=long,st').content)
+        self.assertEqual(data['dealer'], {'long': dealer.lng, 'st': dealer.st})
+
+    def test_unknown_field(self):
+        data = json.loads(self.client.get('/djangoapp/get_dealers?fields=id,password').content)
+        self.assertEqual(data['status'], 400)
+
+    def test_rows_match_to_dict(self):
+        data = json.loads(self.client.get('/djangoapp/get_dealers').content)
+        self.assertEqual(data['dealers'], [d.to_dict() for d in Dealer.objects.order_by('id')])
+        dealer = Review.objects.first().dealer
+        data = json.loads(self.client.get(f'/djangoapp/reviews/dealer/{dealer.id}').content)
+        expected = [r.to_dict() for r in Review.objects.filter(dealer=dealer).order_by('-created_at', '-id')]
+        self.assertEqual(data['reviews'], expected)
+
     def test_analyze_review(self):
         res = self.client.get('/djangoapp/analyze_review?text=Fantastic+services')
         self.assertEqual(res.status_code, 200)
         data = json.loads(res.content)
         self.assertEqual(data['sentiment'], 'positive')
 
+    def test_analyze_reviews_batch(self):
+        res = self.client.post('/djangoapp/analyze_reviews',
+            data=json.dumps(["Great staff", "Rude and awful", "We came by"]),
+            content_type='application/json')
+        data = json.loads(res.content)
+        self.assertEqual(data['sentiments'], ['positive', 'negative', 'neutral'])
+
+    def test_analyze_reviews_rejects_non_list(self):
+        res = self.client.post('/djangoapp/analyze_reviews',
+            data=json.dumps({"text": "Great"}), content_type='application/json')
+        self.assertEqual(json.loads(res.content)['status'], 400)
+
+
+class StateFilterTest(TestCase):
+    def setUp(self):
+        init_data()
+        cache.clear()
+        self.client = Client()
+
+    def names(self, state):
+        data = json.loads(self.client.get(f'/djangoapp/get_dealers/{state}').content)
+        return sorted(d['full_name'] for d in data['dealers'])
+
+    def test_name_code_and_case_agree(self):
+        expected = ["Bluegrass Hyundai", "Prairie Ford", "Sunshine Toyota"]
+        for state in ("Kansas", "kansas", "KS", "ks"):
+            self.assertEqual(self.names(state), expected)
+
+    def test_multi_word_state(self):
+        self.assertEqual(self.names("new%20york"), ["Empire Mercedes"])
+        self.assertEqual(self.names("NY"), ["Empire Mercedes"])
+
+    def test_state_key_kept_in_sync(self):
+        dealer = Dealer.objects.get(full_name="Gateway VW")
+        dealer.state = "Wisconsin"
+        dealer.save(update_fields=["state"])
+        self.assertEqual(Dealer.objects.get(pk=dealer.pk).state_key, "wisconsin")
+
+    def test_state_query_uses_index(self):
+        views.ensure_seeded()
+        with self.assertNumQueries(1):
+            self.client.get('/djangoapp/get_dealers/TX')
+        if connection.vendor == 'sqlite':
+            plan = Dealer.objects.filter(state_key="texas").explain()
+            self.assertIn("dealer_state_key_idx", plan)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        init_data()
+        cache.clear()
+        self.client = Client()
+
+    def test_cached_hit_costs_no_queries(self):
+        self.client.get('/djangoapp/get_dealers/Kansas')
+        with self.assertNumQueries(0):
+            res = self.client.get('/djangoapp/get_dealers/Kansas')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', res)
+
+    def test_conditional_get_not_modified(self):
+        res = self.client.get('/djangoapp/get_cars')
+        res2 = self.client.get('/djangoapp/get_cars', HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res2.status_code, 304)
+        self.assertEqual(res2.content, b'')
+
+    def test_errors_are_not_cached(self):
+        for path, status in (('/djangoapp/dealer/999999', 404), ('/djangoapp/get_dealers?fields=nope', 400),
+                             ('/djangoapp/get_cars?year_min=soon', 400)):
+            with self.subTest(path=path):
+                for _ in range(2):
+                    res = self.client.get(path)
+                    self.assertEqual(res.json()['status'], status)
+                    self.assertNotIn('ETag', res)
+
+    def test_dealer_save_evicts(self):
+        dealer = Dealer.objects.first()
+        self.client.get(f'/djangoapp/dealer/{dealer.id}')
+        self.client.get('/djangoapp/get_dealers')
+        dealer.full_name = "Renamed Dealer"
+        dealer.save()
+        data = json.loads(self.client.get(f'/djangoapp/dealer/{dealer.id}').content)
+        self.assertEqual(data['dealer']['full_name'], "Renamed Dealer")
+        data = json.loads(self.client.get('/djangoapp/get_dealers').content)
+        self.assertIn("Renamed Dealer", [d['full_name'] for d in data['dealers']])
+
+    def test_car_model_delete_evicts(self):
+        count = len(json.loads(self.client.get('/djangoapp/get_cars').content)['CarModels'])
+        CarModel.objects.first().delete()
+        data = json.loads(self.client.get('/djangoapp/get_cars').content)
+        self.assertEqual(len(data['CarModels']), count - 1)
+
+
+class ReviewFeedTest(TestCase):
+    def setUp(self):
+        init_data()
+        self.dealer = Dealer.objects.create(full_name="Feed Motors", address="1 Loop", city="Austin",
+                                            state="Texas", st="TX", zip_code="73301")
+        self.reviews = [Review.objects.create(dealer=self.dealer, name=f"R{i}", review="ok")
+                        for i in range(7)]
+        self.client = Client()
+
+    def test_keyset_pages_cover_all_reviews(self):
+        seen, cursor = [], None
+        while True:
+            url = f'/djangoapp/reviews/dealer/{self.dealer.id}?limit=3'
+            if cursor:
+                url += f'&cursor={cursor}'
+            data = json.loads(self.client.get(url).content)
+            self.assertLessEqual(len(data['reviews']), 3)
+            seen += [r['id'] for r in data['reviews']]
+            cursor = data['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [r.id for r in reversed(self.reviews)])
+
+    def test_unpaginated_keeps_full_list(self):
+        data = json.loads(self.client.get(f'/djangoapp/reviews/dealer/{self.dealer.id}').content)
+        self.assertEqual(len(data['reviews']), 7)
+        self.assertNotIn('next', data)
+        self.assertEqual(data['reviews'][0]['dealership'], self.dealer.id)
+
+    def test_invalid_cursor(self):
+        data = json.loads(self.client.get(f'/djangoapp/reviews/dealer/{self.dealer.id}?cursor=@@').content)
+        self.assertEqual(data['status'], 400)
+
+    def test_paginated_projection(self):
+        data = json.loads(self.client.get(
+            f'/djangoapp/reviews/dealer/{self.dealer.id}?limit=2&fields=name').content)
+        self.assertEqual(data['reviews'], [{'name': 'R6'}, {'name': 'R5'}])
+        self.assertIsNotNone(data['next'])
+
+    def test_ndjson_stream(self):
+        res = self.client.get(f'/djangoapp/reviews/dealer/{self.dealer.id}?format=ndjson')
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], [f"R{i}" for i in range(6, -1, -1)])
+
+    def test_page_query_count_is_flat(self):
+        with self.assertNumQueries(2):
+            self.client.get(f'/djangoapp/reviews/dealer/{self.dealer.id}?limit=2')
+
+
+class RescoreReviewsTest(TestCase):
+    def setUp(self):
+        init_data()
+
+    def test_rescore_fixes_stale_labels(self):
+        Review.objects.update(sentiment='neutral')
+        out = StringIO()
+        call_command("rescore_reviews", "--chunk-size", "2", stdout=out)
+        self.assertIn("changed", out.getvalue())
+        for review in Review.objects.all():
+            self.assertEqual(review.sentiment, analyze_sentiment(review.review))
+
+    def test_rescore_since_filter(self):
+        Review.objects.update(sentiment='neutral')
+        call_command("rescore_reviews", "--since", "2999-01-01", stdout=StringIO())
+        self.assertFalse(Review.objects.exclude(sentiment='neutral').exists())
+
+
+class DealerStatsTest(TestCase):
+    def setUp(self):
+        init_data()
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='statsuser', password='testpass123')
+        self.client.login(username='statsuser', password='testpass123')
+
+    def post_review(self, dealer, text, purchase=False):
+        return self.client.post('/djangoapp/add_review',
+            data=json.dumps({'dealership': dealer.id, 'review': text, 'purchase': purchase}),
+            content_type='application/json')
+
+    def test_seed_builds_stats(self):
+        dealer = Dealer.objects.get(full_name="Sunshine Toyota")
+        self.assertEqual(dealer.stats.review_count, 2)
+        self.assertEqual(dealer.stats.positive_count, 2)
+
+    def test_add_review_updates_incrementally(self):
+        dealer = Dealer.objects.get(full_name="Rocky Mountain Subaru")
+        self.post_review(dealer, "Great people", purchase=True)
+        self.post_review(dealer, "Rude and slow")
+        stats = DealerStats.objects.get(dealer=dealer)
+        self.assertEqual((stats.review_count, stats.positive_count, stats.negative_count), (2, 1, 1))
+        self.assertEqual(stats.purchase_ratio, 0.5)
+        self.assertEqual(stats.last_review_at, Review.objects.filter(dealer=dealer).latest('created_at').created_at)
+
+    def test_incremental_matches_rebuild(self):
+        for dealer in Dealer.objects.all()[:3]:
+            self.post_review(dealer, "Not good at all", purchase=True)
+        before = {s.dealer_id: s.to_dict() for s in DealerStats.objects.all()}
+        rebuild_dealer_stats()
+        after = {s.dealer_id: s.to_dict() for s in DealerStats.objects.all()}
+        self.assertEqual(before, after)
+
+    def test_listing_with_stats_is_one_query(self):
+        views.ensure_seeded()
+        with self.assertNumQueries(1):
+            res = self.client.get('/djangoapp/get_dealers?include_stats=1')
+        dealers = json.loads(res.content)['dealers']
+        self.assertEqual(len(dealers), Dealer.objects.count())
+        self.assertTrue(all('stats' in d for d in dealers))
+
+    def test_listing_stats_refresh_after_review(self):
+        dealer = Dealer.objects.get(full_name="Gateway VW")
+        self.client.get('/djangoapp/get_dealers?include_stats=1')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_review(dealer, "Excellent")
+        dealers = json.loads(self.client.get('/djangoapp/get_dealers?include_stats=1').content)['dealers']
+        row = next(d for d in dealers if d['id'] == dealer.id)
+        self.assertEqual(row['stats']['review_count'], 1)
+
+
+@override_settings(JOBS_MODE="db", JOBS_RETRY_DELAY=10, JOBS_MAX_ATTEMPTS=3)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        init_data()
+        self.user = User.objects.create_user(username='jobuser', password='pw')
+        self.client.force_login(self.user)
+        self.dealer = Dealer.objects.get(full_name="Rocky Mountain Subaru")
+        self.calls = []
+        jobs.task("test_flaky")(self.flaky)
+
+    def tearDown(self):
+        jobs._tasks.pop("test_flaky", None)
+
+    def flaky(self, fail_times):
+        self.calls.append(timezone.now())
+        Review.objects.filter(dealer=self.dealer).update(name="touched")  # rolled back on failure
+        if len(self.calls) <= fail_times:
+            raise RuntimeError("boom")
+
+    def post_review(self, text="Great people"):
+        return self.client.post('/djangoapp/add_review', content_type='application/json',
+                                data=json.dumps({'dealership': self.dealer.id, 'review': text})).json()
+
+    def test_add_review_defers_stats(self):
+        review = self.post_review()['review']
+        self.assertFalse(DealerStats.objects.filter(dealer=self.dealer, review_count=1).exists())
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.key, job.status), ("review_added", f"review_added:{review['id']}", "queued"))
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(DealerStats.objects.get(dealer=self.dealer).positive_count, 1)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertEqual(jobs.run_pending(), 0)
+
+    def test_add_review_cost_does_not_grow_with_jobs(self):
+        self.post_review()  # session and user cached
+        with CaptureQueriesContext(connection) as ctx:
+            self.post_review()
+        # Session user, dealer lookup, savepoint, review INSERT, job INSERT,
+        # release: new follow-up work adds to the job, not to the request.
+        self.assertEqual(len(ctx.captured_queries), 6)
+
+    def counts(self):
+        return (DealerStats.objects.get(dealer=self.dealer).to_dict(), sorted(DealerSentimentRollup.objects.values_list(
+            'dealer_id', 'period', 'bucket', 'review_count', 'positive_count', 'negative_count')))
+
+    def test_job_after_rebuild_does_not_count_twice(self):
+        self.post_review()
+        self.post_review("Rude and slow")
+        rebuild_dealer_stats([self.dealer.id])  # leaves the two queued reviews to their jobs
+        rollups.rebuild()
+        self.assertEqual(jobs.run_pending(), 2)
+        counted = self.counts()
+        self.assertEqual(counted[0]["review_count"], Review.objects.filter(dealer=self.dealer).count())
+        rebuild_dealer_stats([self.dealer.id])
+        rollups.rebuild()
+        self.assertEqual(self.counts(), counted)
+
+    def test_job_of_deleted_review_does_nothing(self):
+        self.post_review()
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.get(id=self.post_review("Rude and slow")['review']['id']).delete()
+        self.assertEqual(jobs.run_pending(), 2)
+        counted = self.counts()
+        self.assertEqual(counted[0]["negative"], 0)
+        rebuild_dealer_stats([self.dealer.id])
+        rollups.rebuild()
+        self.assertEqual(self.counts(), counted)
+
+    def test_inline_mode_runs_at_once(self):
+        with override_settings(JOBS_MODE="inline"):
+            self.post_review()
+        self.assertEqual(DealerStats.objects.get(dealer=self.dealer).review_count, 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_idempotent_keys(self):
+        for _ in range(3):
+            jobs.enqueue("test_flaky", key="once", fail_times=0)
+        jobs.enqueue("test_flaky", fail_times=0)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_retries_with_backoff(self):
+        jobs.enqueue("test_flaky", fail_times=1)
+        Review.objects.create(dealer=self.dealer, name="n", review="r")
+        self.assertEqual(jobs.run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("boom", job.last_error)
+        self.assertAlmostEqual((job.run_at - timezone.now()).total_seconds(), 10, delta=2)
+        self.assertFalse(Review.objects.filter(name="touched").exists())
+        self.assertEqual(jobs.run_pending(), 0)  # not due yet
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(Job.objects.get().status, Job.DONE)
+        self.assertTrue(Review.objects.filter(name="touched").exists())
+        self.assertEqual(jobs.backoff(3), 40)
+
+    def test_gives_up_after_max_attempts(self):
+        jobs.enqueue("test_flaky", fail_times=10)
+        for _ in range(3):
+            Job.objects.update(run_at=timezone.now())
+            jobs.run_pending()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+
+    def test_stale_running_jobs_are_requeued(self):
+        jobs.enqueue("test_flaky", fail_times=0)
+        jobs.claim(10)
+        self.assertEqual(jobs.requeue_stale(), 0)
+        self.assertEqual(jobs.requeue_stale(now=timezone.now() + datetime.timedelta(hours=1)), 1)
+
+    def test_requeued_attempt_commits_once(self):
+        jobs.enqueue("test_flaky", fail_times=0)
+        [slow] = jobs.claim(10)
+        later = timezone.now() + datetime.timedelta(hours=1)
+        jobs.requeue_stale(now=later)
+        [retry] = jobs.claim(10, now=later)
+        self.assertTrue(jobs.run(retry))
+        self.assertFalse(jobs.run(slow))  # the slow worker finishes late: nothing committed
+        self.assertEqual(len(self.calls), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), (Job.DONE, 2, ""))
+
+    def test_lag_metric(self):
+        jobs.enqueue("test_flaky", fail_times=0)
+        Job.objects.update(run_at=timezone.now() - datetime.timedelta(seconds=30))
+        body = self.client.get('/djangoapp/metrics').content.decode()
+        self.assertIn('bestcars_jobs{status="queued"} 1', body)
+        lag = float(next(line.split()[1] for line in body.splitlines() if line.startswith('bestcars_job_lag_seconds ')))
+        self.assertGreaterEqual(lag, 30)
+
+    def test_worker_command(self):
+        self.post_review()
+        self.post_review("Rude")
+        out = StringIO()
+        call_command('run_jobs', '--once', '--threads', '1', stdout=out)
+        self.assertIn('2 jobs succeeded', out.getvalue())
+        stats = DealerStats.objects.get(dealer=self.dealer)
+        self.assertEqual((stats.positive_count, stats.negative_count), (1, 1))
+
+
+class DealerGridTest(TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        points = [(i, rng.uniform(-89, 89), rng.uniform(-180, 180)) for i in range(3000)]
+        grid = geo.DealerGrid(points)
+        for lat, lng, radius in [(30.27, -97.74, 300), (10, 179.9, 800), (88, 0, 500), (0, 0, 20000)]:
+            expected = sorted((geo.haversine_km(lat, lng, plat, plng), i) for i, plat, plng in points
+                              if geo.haversine_km(lat, lng, plat, plng) <= radius)[:25]
+            self.assertEqual(grid.nearby(lat, lng, radius, 25), expected)
+
+    def test_haversine(self):
+        # Austin -> Houston is about 235 km.
+        self.assertAlmostEqual(geo.haversine_km(30.27, -97.74, 29.76, -95.37), 235, delta=5)
+
+
+class NearbyDealersTest(TestCase):
+    def setUp(self):
+        init_data()
+        geo.invalidate()
+        self.client = Client()
+
+    def test_nearby_ranked_by_distance(self):
+        res = self.client.get('/djangoapp/dealers/nearby?lat=30.27&lng=-97.74&radius_km=300')
+        dealers = json.loads(res.content)['dealers']
+        self.assertEqual([d['full_name'] for d in dealers], ["Lakeside Honda", "Metro Chevrolet"])
+        self.assertEqual(dealers[0]['distance_km'], 0.0)
+
+    def test_limit_and_validation(self):
+        data = json.loads(self.client.get('/djangoapp/dealers/nearby?lat=39&lng=-95&radius_km=2000&limit=2').content)
+        self.assertEqual(len(data['dealers']), 2)
+        data = json.loads(self.client.get('/djangoapp/dealers/nearby?lat=abc&lng=1').content)
+        self.assertEqual(data['status'], 400)
+
+    def test_index_rebuilt_on_dealer_change(self):
+        self.client.get('/djangoapp/dealers/nearby?lat=47.6&lng=-122.3')
+        Dealer.objects.create(full_name="Seattle Kia", address="1 Pike St", city="Seattle",
+                              state="Washington", st="WA", zip_code="98101", lat=47.61, lng=-122.33)
+        data = json.loads(self.client.get('/djangoapp/dealers/nearby?lat=47.6&lng=-122.3').content)
+        self.assertEqual([d['full_name'] for d in data['dealers']], ["Seattle Kia"])
+
+
+class BulkReviewIngestTest(TestCase):
+    def setUp(self):
+        init_data()
+        self.client = Client()
+        User.objects.create_user(username='feeduser', password='testpass123')
+        self.dealer = Dealer.objects.get(full_name="Gateway VW")
+
+    def rows(self, n):
+        return [{'dealership': self.dealer.id, 'review': f'Great visit {i}', 'purchase': True,
+                 'name': f'Partner {i}', 'car_year': 2022} for i in range(n)]
+
+    def test_requires_login(self):
+        res = self.client.post('/djangoapp/add_reviews_bulk', data=json.dumps(self.rows(1)),
+                               content_type='application/json')
+        self.assertEqual(json.loads(res.content)['status'], 403)
+
+    def test_partial_errors_do_not_abort(self):
+        self.client.login(username='feeduser', password='testpass123')
+        rows = self.rows(3) + [{'dealership': 999999, 'review': 'x'}, {'dealership': self.dealer.id},
+                               {'dealership': self.dealer.id, 'review': 'ok', 'purchase_date': 'soon'}]
+        data = json.loads(self.client.post('/djangoapp/add_reviews_bulk', data=json.dumps(rows),
+                                           content_type='application/json').content)
+        self.assertEqual(data['created'], 3)
+        self.assertEqual([e['row'] for e in data['errors']], [3, 4, 5])
+        self.assertEqual(Review.objects.filter(dealer=self.dealer).count(), 3)
+        self.assertEqual(DealerStats.objects.get(dealer=self.dealer).positive_count, 3)
+
+    def test_query_count_independent_of_batch_size(self):
+        self.client.login(username='feeduser', password='testpass123')
+        self.client.post('/djangoapp/add_reviews_bulk', data='[]', content_type='application/json')
+        counts = []
+        for n in (5, 60):  # both fit in one INSERT, even with SQLite's 999-parameter limit
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post('/djangoapp/add_reviews_bulk', data=json.dumps(self.rows(n)),
+                                 content_type='application/json')
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_import_command(self):
+        lines = [json.dumps(r) for r in self.rows(4)] + ['', 'not json', json.dumps({'review': 'x'})]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write("\n".join(lines))
+        self.addCleanup(os.unlink, f.name)
+        out, err = StringIO(), StringIO()
+        call_command("import_reviews", f.name, "--chunk-size", "3", stdout=out, stderr=err)
+        self.assertIn("4 reviews created, 2 rejected", out.getvalue())
+        self.assertIn("line 6: Invalid JSON", err.getvalue())
+        self.assertIn("line 7: Missing or invalid dealership", err.getvalue())
+
+
+class CarCatalogTest(TestCase):
+    def setUp(self):
+        init_data()
+        cache.clear()
+        catalog.invalidate()
+        self.client = Client()
+
+    def get(self, query=''):
+        return json.loads(self.client.get(f'/djangoapp/get_cars{query}').content)
+
+    def test_filters(self):
+        data = self.get('?make=toyota&car_type=suv')
+        self.assertEqual([c['CarModel'] for c in data['CarModels']], ['RAV4'])
+        data = self.get('?country=Germany&year_min=2023')
+        self.assertEqual(sorted(c['CarModel'] for c in data['CarModels']), ['3 Series', 'C-Class', 'Jetta'])
+        data = self.get('?q=ford%20mus')
+        self.assertEqual([c['CarModel'] for c in data['CarModels']], ['Mustang'])
+
+    def test_facets(self):
+        data = self.get('?make=Honda')
+        self.assertEqual(data['facets']['CarMake'], {'Honda': 3})
+        self.assertEqual(data['facets']['CarType'], {'SUV': 1, 'Sedan': 2})
+        self.assertEqual(data['facets']['ModelYear'], {'2021': 1, '2022': 1, '2023': 1})
+
+    def test_invalid_year(self):
+        self.assertEqual(self.get('?year_min=new')['status'], 400)
+
+    def test_snapshot_built_once(self):
+        self.get('?make=BMW')
+        with self.assertNumQueries(0):
+            self.get('?make=Nissan')
+
+    def test_snapshot_rebuilt_on_change(self):
+        self.get()
+        make = CarMake.objects.get(name='Subaru')
+        CarModel.objects.create(car_make=make, name='Crosstrek', car_type='SUV', year=2024)
+        self.assertEqual([c['CarModel'] for c in self.get('?year_min=2024')['CarModels']], ['Crosstrek'])
+
+
+class AsyncReadViewsTest(TestCase):
+    def setUp(self):
+        init_data()
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.client = Client()
+
+    async def check_same(self, view, path, **kwargs):
+        response = await view(self.factory.get(path), **kwargs)
+        cache.clear()
+        expected = await self.async_client.get(path)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        return json.loads(response.content)
+
+    async def test_dealers(self):
+        data = await self.check_same(async_views.get_dealerships, '/djangoapp/get_dealers/KS', state='KS')
+        self.assertEqual(len(data['dealers']), 3)
+        await self.check_same(async_views.get_dealerships, '/djangoapp/get_dealers?include_stats=1')
+
+    async def test_dealer_details(self):
+        dealer = await Dealer.objects.afirst()
+        await self.check_same(async_views.get_dealer_details, f'/djangoapp/dealer/{dealer.id}', dealer_id=dealer.id)
+        data = await self.check_same(async_views.get_dealer_details, '/djangoapp/dealer/99999', dealer_id=99999)
+        self.assertEqual(data['status'], 404)
+
+    async def test_reviews(self):
+        dealer = await Dealer.objects.aget(full_name="Sunshine Toyota")
+        path = f'/djangoapp/reviews/dealer/{dealer.id}'
+        await self.check_same(async_views.get_dealer_reviews, path, dealer_id=dealer.id)
+        data = await self.check_same(async_views.get_dealer_reviews, path + '?limit=1', dealer_id=dealer.id)
+        self.assertIsNotNone(data['next'])
+
+    async def test_reviews_ndjson(self):
+        dealer = await Dealer.objects.aget(full_name="Sunshine Toyota")
+        response = await async_views.get_dealer_reviews(
+            self.factory.get(f'/djangoapp/reviews/dealer/{dealer.id}?format=ndjson'), dealer_id=dealer.id)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(len(lines), 2)
+
+    async def test_cars(self):
+        await self.check_same(async_views.get_cars, '/djangoapp/get_cars?make=Ford')
+
+
+class ReviewChangesTest(TestCase):
+    def setUp(self):
+        init_data()
+        self.dealer = Dealer.objects.get(full_name="Sunshine Toyota")
+        self.path = f'/djangoapp/reviews/dealer/{self.dealer.id}/changes'
+        self.ids = list(Review.objects.filter(dealer=self.dealer).order_by('id').values_list('id', flat=True))
+
+    def test_only_newer_reviews(self):
+        data = self.client.get(self.path + '?since_id=0').json()
+        self.assertEqual([r['id'] for r in data['reviews']], self.ids)
+        self.assertEqual((data['last_id'], data['more']), (self.ids[-1], False))
+        data = self.client.get(f"{self.path}?since_id={data['last_id']}").json()
+        self.assertEqual((data['reviews'], data['last_id']), ([], self.ids[-1]))
+        new = Review.objects.create(dealer=self.dealer, name='n', review='Fresh')
+        data = self.client.get(f"{self.path}?since_id={self.ids[-1]}&fields=id,review").json()
+        self.assertEqual(data['reviews'], [{'id': new.id, 'review': 'Fresh'}])
+
+    def test_pages(self):
+        data = self.client.get(self.path + '?since_id=0&limit=1').json()
+        self.assertEqual(([r['id'] for r in data['reviews']], data['more']), (self.ids[:1], True))
+
+    def test_errors(self):
+        self.assertEqual(self.client.get(self.path).json()['status'], 400)
+        self.assertEqual(self.client.get(self.path + '?since_id=x').json()['status'], 400)
+        self.assertEqual(self.client.get('/djangoapp/reviews/dealer/99999/changes?since_id=0').json()['status'], 404)
+        # No live stream from the WSGI views.
+        self.assertEqual(self.client.get(self.path + '?since_id=0&format=sse').json()['status'], 501)
+
+    def test_add_review_publishes_on_commit(self):
+        user = User.objects.create_user('live', password='pw')
+        self.client.force_login(user)
+        with mock.patch.object(live.broadcaster, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/djangoapp/add_review', content_type='application/json',
+                                 data=json.dumps({'dealership': self.dealer.id, 'review': 'Nice'}))
+        publish.assert_called_once_with(self.dealer.id)
+
+    def test_broadcaster_wakes_streams_from_other_threads(self):
+        async def wait():
+            event = live.broadcaster.subscribe(self.dealer.id)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, live.publish, [self.dealer.id])
+                await asyncio.wait_for(event.wait(), 1)
+            finally:
+                live.broadcaster.unsubscribe(self.dealer.id, event)
+        async_to_sync(wait)()
+        self.assertEqual(live.broadcaster.count(), 0)
+
+    @override_settings(LIVE_BACKEND="db", LIVE_POLL_SECONDS=0.05)
+    async def test_db_poller_sees_other_writers(self):
+        event = live.broadcaster.subscribe(self.dealer.id)
+        live.ensure_poller()
+        try:
+            await asyncio.sleep(0.1)
+            self.assertFalse(event.is_set())
+            await Review.objects.acreate(dealer=self.dealer, name='n', review='From another worker')
+            await asyncio.wait_for(event.wait(), 2)
+        finally:
+            live.broadcaster.unsubscribe(self.dealer.id, event)
+        await asyncio.sleep(0.1)
+        self.assertEqual(live._pollers, {})
+
+    @override_settings(LIVE_KEEPALIVE_SECONDS=0.2, LIVE_STREAM_SECONDS=1)
+    async def test_sse_stream(self):
+        request = AsyncRequestFactory().get(self.path + '?fields=id,review', headers={
+            'Accept': 'text/event-stream', 'Last-Event-ID': str(self.ids[0])})
+        response = await async_views.get_review_changes(request, dealer_id=self.dealer.id)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = response.streaming_content
+        receive = lambda: asyncio.wait_for(anext(events), 2)  # noqa: E731
+        self.assertTrue((await receive()).startswith(b'retry:'))
+        self.assertTrue((await receive()).startswith(f'id: {self.ids[1]}\nevent: review\ndata: '.encode()))
+        self.assertEqual(await receive(), b': keepalive\n\n')
+        new = await Review.objects.acreate(dealer=self.dealer, name='n', review='Live one')
+        live.publish([self.dealer.id])
+        chunk = await receive()
+        self.assertIn(f'id: {new.id}\n'.encode(), chunk)
+        self.assertIn(b'"review":"Live one"', chunk)
+        # The stream ends at LIVE_STREAM_SECONDS and unsubscribes.
+        rest = [chunk async for chunk in events]
+        self.assertEqual(set(rest), {b': keepalive\n\n'})
+        self.assertEqual(live.broadcaster.count(), 0)
+
+
+class SentimentTrendTest(TestCase):
+    path = '/djangoapp/analytics/sentiment_trend'
+
+    def setUp(self):
+        init_data()
+        self.dealer = Dealer.objects.get(full_name="Sunshine Toyota")
+        self.user = User.objects.create_user('trend', password='pw')
+        self.client.force_login(self.user)
+
+    def rollup_rows(self):
+        fields = ('period', 'bucket', 'review_count', 'positive_count', 'negative_count', 'neutral_count')
+        # Incremental updates leave emptied buckets at zero; a rebuild drops them.
+        return (sorted(DealerSentimentRollup.objects.exclude(review_count=0).values_list('dealer_id', *fields)),
+                sorted(MakeSentimentRollup.objects.exclude(review_count=0).values_list('car_make', *fields)))
+
+    def test_incremental_updates_match_rebuild(self):
+        rollups.rebuild()
+        self.client.post('/djangoapp/add_review', content_type='application/json', data=json.dumps(
+            {'dealership': self.dealer.id, 'review': 'Awful, rude staff', 'car_make': 'Toyota'}))
+        self.client.post('/djangoapp/add_reviews_bulk', content_type='application/json', data=json.dumps(
+            [{'dealership': self.dealer.id, 'review': 'Great', 'car_make': 'Honda'},
+             {'dealership': self.dealer.id, 'review': 'It was a visit'}]))
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.filter(dealer=self.dealer).earliest('id').delete()
+        incremental = self.rollup_rows()
+        self.assertIn('Honda', [row[0] for row in incremental[1]])
+        rollups.rebuild()
+        self.assertEqual(incremental, self.rollup_rows())
+
+    def test_dealer_delete_recounts_once(self):
+        rollups.rebuild()
+        Review.objects.bulk_create([Review(dealer=self.dealer, name=f'R{i}', review='Ok', car_make='Toyota')
+                                    for i in range(30)])
+        rollups.rebuild()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, \
+                CaptureQueriesContext(connection) as ctx:
+            self.dealer.delete()
+        self.assertEqual(len(callbacks), 1)
+        # The reviews go in one DELETE, without being loaded.
+        review_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "djangoapp_review"' in q['sql']
+                          and '"djangoapp_review"."review"' in q['sql']]
+        self.assertEqual(review_queries, [])
+        self.assertEqual(sum(q['sql'].startswith('DELETE FROM "djangoapp_review"') for q in ctx.captured_queries), 1)
+        self.assertFalse(DealerSentimentRollup.objects.filter(dealer_id=self.dealer.id).exists())
+        after_delete = self.rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(after_delete, self.rollup_rows())
+        # Constraints are checked now, not at the end of the test.
+        connection.check_constraints()
+
+    def test_rebuild_command_range(self):
+        rollups.rebuild()
+        # A bulk update skips the incremental path; rebuild the months it touched.
+        day = timezone.localdate() - datetime.timedelta(days=400)
+        Review.objects.filter(dealer=self.dealer).update(
+            created_at=timezone.make_aware(datetime.datetime.combine(day, datetime.time(12))))
+        stale = self.rollup_rows()
+        call_command('rebuild_sentiment_rollups', start=str(day), end=str(day), stdout=StringIO())
+        call_command('rebuild_sentiment_rollups', start=str(timezone.localdate()), stdout=StringIO())
+        partial_rebuild = self.rollup_rows()
+        self.assertNotEqual(stale, partial_rebuild)
+        call_command('rebuild_sentiment_rollups', stdout=StringIO())
+        self.assertEqual(partial_rebuild, self.rollup_rows())
+
+    def test_trend(self):
+        today = timezone.localdate()
+        Review.objects.create(dealer=self.dealer, name='n', review='Rude', sentiment='negative', car_make='Toyota')
+        rollups.rebuild()
+        data = self.client.get(f'{self.path}?period=day&dealer={self.dealer.id}').json()
+        self.assertEqual((data['status'], data['period']), (200, 'day'))
+        self.assertEqual(len(data['trend']), 91)
+        self.assertEqual(data['trend'][0], {'bucket': (today - datetime.timedelta(days=90)).isoformat(),
+                                            'reviews': 0, 'positive': 0, 'negative': 0, 'neutral': 0})
+        last = data['trend'][-1]
+        self.assertEqual(last['bucket'], today.isoformat())
+        self.assertEqual(last['reviews'], Review.objects.filter(dealer=self.dealer).count())
+        self.assertEqual(last['negative'], Review.objects.filter(dealer=self.dealer, sentiment='negative').count())
+        months = self.client.get(self.path).json()['trend']
+        self.assertEqual(months[-1]['bucket'], today.replace(day=1).isoformat())
+        self.assertEqual(months[-1]['reviews'], Review.objects.count())
+        state = self.client.get(f'{self.path}?state={self.dealer.state}').json()['trend']
+        self.assertEqual(state[-1]['reviews'], Review.objects.filter(dealer__state=self.dealer.state).count())
+        make = self.client.get(f'{self.path}?make=toyota&start={today}&end={today}').json()['trend']
+        toyota = Review.objects.filter(car_make='Toyota')
+        self.assertEqual(make, [{'bucket': today.replace(day=1).isoformat(), 'reviews': toyota.count(),
+                                 'positive': toyota.filter(sentiment='positive').count(),
+                                 'negative': toyota.filter(sentiment='negative').count(),
+                                 'neutral': toyota.filter(sentiment='neutral').count()}])
+
+    def test_query_count_does_not_depend_on_range(self):
+        rollups.rebuild()
+        for query in ('period=day', 'period=month&start=2020-01-01', f'state={self.dealer.state}'):
+            with self.subTest(query=query), self.assertNumQueries(1):
+                self.assertEqual(self.client.get(f'{self.path}?{query}').json()['status'], 200)
+
+    def test_errors(self):
+        for query in ('period=week', 'start=yesterday', 'dealer=x', 'dealer=1&make=Kia',
+                      'period=day&start=2000-01-01'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'{self.path}?{query}').json()['status'], 400)
+
+
+class DataExportTest(TestCase):
+    def setUp(self):
+        init_data()
+        self.staff = User.objects.create_user('exporter', password='pw', is_staff=True)
+        self.client.force_login(self.staff)
+        self.ids = list(Review.objects.order_by('id').values_list('id', flat=True))
+
+    def export(self, query):
+        response = self.client.get(f'/djangoapp/export?{query}')
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson_and_resume(self):
+        response, body = self.export('kind=reviews')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r['id'] for r in rows], self.ids)
+        self.assertIn('created_at', rows[0])
+        _, body = self.export(f'kind=reviews&after_id={self.ids[2]}')
+        self.assertEqual([json.loads(line)['id'] for line in body.splitlines()], self.ids[3:])
+
+    def test_csv_gzip_and_filters(self):
+        dealer = Dealer.objects.get(full_name="Sunshine Toyota")
+        response, body = self.export(f'kind=reviews&format=csv&gzip=1&state={dealer.st}')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="reviews.csv.gz"')
+        rows = list(csv.reader(StringIO(gzip.decompress(body).decode())))
+        self.assertEqual(rows[0][:3], ['id', 'dealership', 'name'])
+        self.assertEqual([int(r[0]) for r in rows[1:]],
+                         list(Review.objects.filter(dealer__state=dealer.state).order_by('id').values_list('id', flat=True)))
+        _, body = self.export(f'kind=dealers&format=csv&dealer={dealer.id}')
+        self.assertEqual(body.decode().splitlines()[1].split(',')[:2], [str(dealer.id), dealer.full_name])
+        future = (timezone.now() + datetime.timedelta(days=1)).date()
+        _, body = self.export(f'kind=reviews&since={future}')
+        self.assertEqual(body, b'')
+
+    def test_staff_only_and_errors(self):
+        for query in ('kind=cars', 'format=xml', 'kind=dealers&since=2024-01-01', 'after_id=x', 'since=soon'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/djangoapp/export?{query}').json()['status'], 400)
+        self.client.force_login(User.objects.create_user('nonstaff', password='pw'))
+        self.assertEqual(self.client.get('/djangoapp/export').json()['status'], 403)
+
+    def test_one_query_in_chunks(self):
+        Review.objects.bulk_create([Review(dealer_id=Dealer.objects.first().id, name=f'R{i}', review='Ok')
+                                    for i in range(50)])
+        dump_ = dump.Dump('reviews', 'csv', chunk_size=7)
+        with self.assertNumQueries(1):
+            chunks = list(dump_.chunks())
+        self.assertEqual(len(chunks), -(-Review.objects.count() // 7))
+        self.assertEqual(dump_.last_id, Review.objects.latest('id').id)
+
+    def test_resume_id_covers_the_chunk_just_received(self):
+        data, last_id = next(dump.Dump('reviews', 'csv', chunk_size=2).blocks())
+        self.assertEqual(int(data.decode().splitlines()[-1].split(',')[0]), last_id)
+        dump_ = dump.Dump('reviews', 'ndjson', chunk_size=2)
+        first = next(dump_.chunks())
+        self.assertEqual(json.loads(first.splitlines()[-1])['id'], dump_.last_id)
+
+    def test_async_view_streams(self):
+        request = AsyncRequestFactory().get('/djangoapp/export?kind=dealers')
+        request.user = self.staff
+
+        async def read():
+            response = await async_views.export_data(request)
+            return b''.join([chunk async for chunk in response.streaming_content])
+        body = async_to_sync(read)()
+        self.assertEqual(len(body.splitlines()), Dealer.objects.count())
+
+    def test_dump_data_command_resumes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reviews.csv')
+            err = StringIO()
+            call_command('dump_data', 'reviews', format='csv', output=path, chunk_size=2,
+                         dealer=Review.objects.get(id=self.ids[0]).dealer_id, stderr=err)
+            last_id = int(err.getvalue().split('last id ')[1].rstrip('.\n'))
+            # Resumed without the dealer filter: the rest of the table is appended.
+            call_command('dump_data', 'reviews', format='csv', output=path, after_id=last_id, stderr=StringIO())
+            with open(path) as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(rows[0][0], 'id')
+        self.assertEqual([int(r[0]) for r in rows[1:]], self.ids)
+
+
+class MetricsTest(TestCase):
+    def setUp(self):
+        init_data()
+        cache.clear()
+        metrics.registry.reset()
+        self.client = Client()
+
+    def test_server_timing_and_registry(self):
+        res = self.client.get('/djangoapp/get_dealers')
+        timing = res['Server-Timing']
+        for name in ('app;dur=', 'db;dur=', 'serialize;dur='):
+            self.assertIn(name, timing)
+        route = metrics.registry.snapshot()['get_dealers']
+        self.assertEqual(route['count'], 1)
+        self.assertGreaterEqual(route['queries'], 1)
+        self.assertEqual(route['bytes'], len(res.content))
+
+    def test_sentiment_span(self):
+        res = self.client.get('/djangoapp/analyze_review?text=Great+staff')
+        self.assertIn('sentiment;dur=', res['Server-Timing'])
+        self.assertIn('sentiment', metrics.registry.snapshot()['analyze_review']['spans'])
+
+    async def test_async_requests_count_queries(self):
+        await self.async_client.get('/djangoapp/get_cars')
+        self.assertGreaterEqual(metrics.registry.snapshot()['get_cars']['queries'], 1)
+
+    def test_prometheus_endpoint(self):
+        self.client.get('/djangoapp/get_dealers')
+        res = self.client.get('/djangoapp/metrics')
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        body = res.content.decode()
+        self.assertIn('# TYPE bestcars_request_duration_seconds histogram', body)
+        self.assertIn('bestcars_requests_total{route="get_dealers"} 1', body)
+        self.assertIn('bestcars_request_duration_seconds_bucket{route="get_dealers",le="+Inf"} 1', body)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/djangoapp/metrics').json()['status'], 401)
+        res = self.client.get('/djangoapp/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertIn(b'bestcars_requests_total', res.content)
+
+    @override_settings(SLOW_REQUEST_MS=0.001)
+    def test_slow_request_log(self):
+        with self.assertLogs('djangoapp.slow_requests', level='WARNING') as logs:
+            self.client.get('/djangoapp/get_dealers/KS')
+        self.assertIn('get_dealers_by_state', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class BenchmarkCheckTest(TestCase):
+    def test_compare_with_baseline(self):
+        from benchmarks.check import compare
+        baseline = {'view.dealer': {'p95_ms': 2.0, 'queries': 1}, 'gone': {'p95_ms': 1.0}}
+        failures, notes = compare({'view.dealer': {'p95_ms': 3.0, 'queries': 1}, 'new': {}}, baseline, 2.0)
+        self.assertEqual(failures, [])
+        self.assertEqual(len(notes), 2)
+        failures, _ = compare({'view.dealer': {'p95_ms': 4.5, 'queries': 2}}, baseline, 2.0)
+        self.assertEqual(len(failures), 2)
+
+
+# ─── Query budgets ───────────────────────────────────────────────────────────
+# Exact SQL query count of one request per route, with cold caches (response
+# cache, catalog snapshot, geo index). The count must not depend on the data
+# size: every budget is checked at each of QUERY_BUDGET_SIZES. Requests marked
+# "user" are sent logged in, with the session and the user already cached.
+# $dealer is the id of a dealer holding <size> reviews.
+
+QUERY_BUDGET_SIZES = [10, 1000]
+if os.environ.get("QUERY_BUDGET_100K"):
+    QUERY_BUDGET_SIZES.append(100000)
+
+QUERY_BUDGETS = [
+    # (url name, method, path, JSON body, user, queries)
+    ("get_dealers", "GET", "/djangoapp/get_dealers", None, False, 1),
+    ("get_dealers", "GET", "/djangoapp/get_dealers?include_stats=1", None, False, 1),
+    ("get_dealers_by_state", "GET", "/djangoapp/get_dealers/TX", None, False, 1),
+    ("dealers_nearby", "GET", "/djangoapp/dealers/nearby?lat=32.7&lng=-96.8&radius_km=300", None, False, 2),
+    ("dealer_details", "GET", "/djangoapp/dealer/$dealer", None, False, 1),
+    ("dealer_reviews", "GET", "/djangoapp/reviews/dealer/$dealer", None, False, 2),
+    ("dealer_reviews", "GET", "/djangoapp/reviews/dealer/$dealer?limit=20", None, False, 2),
+    ("dealer_reviews", "GET", "/djangoapp/reviews/dealer/$dealer?format=ndjson", None, False, 2),
+    ("review_changes", "GET", "/djangoapp/reviews/dealer/$dealer/changes?since_id=0", None, False, 2),
+    ("sentiment_trend", "GET", "/djangoapp/analytics/sentiment_trend?dealer=$dealer", None, False, 1),
+    ("search_reviews", "GET", "/djangoapp/reviews/search?q=good+service&limit=20", None, False, 2),
+    # Inline jobs: review_added runs in the request (5 queries with JOBS_MODE=db).
+    ("add_review", "POST", "/djangoapp/add_review", '{"dealership": $dealer, "review": "Great staff"}', True, 8),
+    ("add_reviews_bulk", "POST", "/djangoapp/add_reviews_bulk",
+     '[{"dealership": $dealer, "review": "Great"}, {"dealership": $dealer, "review": "Rude"}]', True, 11),
+    ("get_cars", "GET", "/djangoapp/get_cars", None, False, 1),
+    ("get_cars", "GET", "/djangoapp/get_cars?make=Toyota&year_min=2015", None, False, 1),
+    ("login", "POST", "/djangoapp/login", '{"userName": "budget", "password": "budget-pass"}', False, 9),
+    ("logout", "GET", "/djangoapp/logout", None, True, 3),
+    ("register", "POST", "/djangoapp/register",
+     '{"userName": "budget2", "password": "pw", "firstName": "B", "lastName": "G"}', False, 10),
+    ("analyze_review", "GET", "/djangoapp/analyze_review?text=great", None, False, 0),
+    ("analyze_reviews", "POST", "/djangoapp/analyze_reviews", '["great", "rude"]', False, 0),
+    ("metrics", "GET", "/djangoapp/metrics", None, False, 0),
+    ("export", "GET", "/djangoapp/export?kind=reviews&format=csv&gzip=1", None, True, 2),
+]
+
+
+class QueryBudgetTest(TestCase):
+    def test_every_route_has_a_budget(self):
+        self.assertEqual({p.name for p in urls.urlpatterns} - {b[0] for b in QUERY_BUDGETS}, set())
+
+    def populate(self, size):
+        from benchmarks.datagen import generate_car_models, generate_dealers
+        generate_dealers(size)
+        generate_car_models(size)
+        dealer = Dealer.objects.order_by("-id").first()
+        Review.objects.bulk_create([Review(dealer=dealer, name=f"R{i}", review="Good service", sentiment="positive")
+                                    for i in range(size)], batch_size=5000)
+        rebuild_dealer_stats([dealer.id])
+        User.objects.create_user("budget", password="budget-pass", is_staff=True)  # staff: export
+        views.ensure_seeded()
+        return dealer
+
+    def check_budgets(self, size):
+        dealer = self.populate(size)
+        user = User.objects.get(username="budget")
+        for name, method, path, body, logged_in, budget in QUERY_BUDGETS:
+            path = string.Template(path).substitute(dealer=dealer.id)
+            client = Client()
+            if logged_in:
+                client.force_login(user)
+            cache.clear()
+            catalog.invalidate()
+            geo.invalidate()
+            if logged_in:
+                # Steady state: session already cached. The user is read from
+                # the database (AUTH_USER_CACHE_TIMEOUT is 0 without a shared cache).
+                client.session.load()
+            with self.subTest(route=name, path=path, size=size):
+                with CaptureQueriesContext(connection) as ctx:
+                    if method == "GET":
+                        response = client.get(path)
+                    else:
+                        response = client.post(path, data=string.Template(body).substitute(dealer=dealer.id),
+                                               content_type="application/json")
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(ctx.captured_queries), budget,
+                                 "\n".join(q["sql"] for q in ctx.captured_queries))
+
+    def test_budgets_10_rows(self):
+        self.check_budgets(10)
+
+    def test_budgets_1k_rows(self):
+        self.check_budgets(1000)
+
+    @unittest.skipUnless(100000 in QUERY_BUDGET_SIZES, "set QUERY_BUDGET_100K=1")
+    def test_budgets_100k_rows(self):
+        self.check_budgets(100000)
+
+
+class SqlitePragmasTest(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        from django.conf import settings
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        with tempfile.TemporaryDirectory() as tmp:
+            wrapper = DatabaseWrapper({**connection.settings_dict, "NAME": os.path.join(tmp, "db.sqlite3")},
+                                      alias="pragmas")
+            try:
+                with wrapper.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA synchronous")
+                    self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                    cursor.execute("PRAGMA busy_timeout")
+                    self.assertEqual(cursor.fetchone()[0], settings.SQLITE_BUSY_TIMEOUT_MS)
+                    self.assertEqual(settings.DATABASES["default"]["OPTIONS"]["timeout"] * 1000,
+                                     settings.SQLITE_BUSY_TIMEOUT_MS)
+            finally:
+                wrapper.close()
+
+    def test_persistent_connections(self):
+        from django.conf import settings
+        self.assertTrue(settings.DATABASES["default"]["CONN_HEALTH_CHECKS"])
+        self.assertGreater(settings.DATABASES["default"]["CONN_MAX_AGE"], 0)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"], DATABASE_ROUTERS=["djangoapp.routers.PrimaryReplicaRouter"])
+class ReplicaRoutingTest(TestCase):
+    """The in-memory test database is the primary, a SQLite file copy of it the replica."""
+
+    @classmethod
+    def setUpClass(cls):
+        # Copied before TestCase opens its class-wide transaction.
+        cls.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.tmp.name, "replica.sqlite3")
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.close()
+        super().setUpClass()
+        # Registered after setUpClass, which would block queries to an alias
+        # missing from `databases` (and the system checks need it in settings).
+        connections.settings["replica"] = {**connection.settings_dict, "NAME": path}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        super().tearDownClass()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        self.dealer = Dealer.objects.get(full_name="Sunshine Toyota")
+        self.user = User.objects.create_user('writer', password='pw')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def review_ids(self, client):
+        return [r['id'] for r in client.get(f'/djangoapp/reviews/dealer/{self.dealer.id}').json()['reviews']]
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(Dealer.objects.all().db, "replica")
+        self.assertEqual(routers.PrimaryReplicaRouter().db_for_write(Dealer), "default")
+
+    def test_writer_is_pinned_to_primary(self):
+        # As after a real login, whose session write pinned the client.
+        self.client.cookies[routers.PIN_COOKIE] = "1"
+        res = self.client.post('/djangoapp/add_review', content_type='application/json',
+                               data=json.dumps({'dealership': self.dealer.id, 'review': 'Great staff'}))
+        new_id = res.json()['review']['id']
+        self.assertEqual(res.cookies[routers.PIN_COOKIE]['max-age'], 5)
+        # The writer reads its own review from the primary...
+        self.assertIn(new_id, self.review_ids(self.client))
+        # ...other clients read the (not yet replicated) replica.
+        self.assertNotIn(new_id, self.review_ids(Client()))
+
+    def test_reads_do_not_pin(self):
+        res = Client().get('/djangoapp/get_dealers')
+        self.assertNotIn(routers.PIN_COOKIE, res.cookies)
+
+    def test_unpinned_session_is_read_from_replica(self):
+        # The session row only exists on the primary: without the pin the
+        # replica does not know it yet.
+        res = self.client.post('/djangoapp/add_review', content_type='application/json',
+                               data=json.dumps({'dealership': self.dealer.id, 'review': 'Great'}))
+        self.assertEqual(res.json()['status'], 403)
+
+
+class ReviewSearchTest(TestCase):
+    def setUp(self):
+        init_data()
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user('searcher', password='pw')
+        self.client.force_login(self.user)
+
+    def search(self, query):
+        return self.client.get('/djangoapp/reviews/search?' + query).json()
+
+    def test_matches_every_word_with_stemming(self):
+        names = {r['name'] for r in self.search('q=helpful')['reviews']}
+        self.assertEqual(names, {'Alice Williams', 'Emma Davis'})
+        self.assertEqual([r['name'] for r in self.search('q=helpful+professional')['reviews']], ['Alice Williams'])
+        # Stemmed: "recommending" matches "recommend".
+        self.assertEqual([r['name'] for r in self.search('q=recommending')['reviews']], ['Jane Doe'])
+
+    def test_filters(self):
+        dealer = Dealer.objects.get(full_name='Sunshine Toyota')
+        data = self.search(f'q=staff&state={dealer.st.lower()}')
+        self.assertEqual({r['dealership'] for r in data['reviews']}, {dealer.id})
+        data = self.search('q=staff&sentiment=negative')
+        self.assertEqual([r['name'] for r in data['reviews']], ['Charlie Brown'])
+        self.assertEqual(self.search('q=staff&sentiment=angry')['status'], 400)
+        self.assertEqual(self.search('q=')['status'], 400)
+
+    def test_ranked_keyset_pages(self):
+        dealer = Dealer.objects.first()
+        Review.objects.bulk_create([Review(dealer=dealer, name=f'F{i}', review='financing ' * (1 + i % 4) + 'ok')
+                                    for i in range(25)])
+        seen, ranks, query = [], [], 'q=financing&limit=10'
+        while True:
+            data = self.search(query)
+            seen += [r['id'] for r in data['reviews']]
+            ranks += [r['rank'] for r in data['reviews']]
+            if not data['next']:
+                break
+            query = f"q=financing&limit=10&cursor={data['next']}"
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_index_follows_writes(self):
+        dealer = Dealer.objects.first()
+        res = self.client.post('/djangoapp/add_review', content_type='application/json',
+                               data=json.dumps({'dealership': dealer.id, 'review': 'Zero-interest financing offered'}))
+        review_id = res.json()['review']['id']
+        self.assertEqual([r['id'] for r in self.search('q=financing')['reviews']], [review_id])
+        Review.objects.filter(id=review_id).update(review='Cash only')
+        self.assertEqual(self.search('q=financing')['reviews'], [])
+        self.assertEqual([r['id'] for r in self.search('q=cash')['reviews']], [review_id])
+        Review.objects.filter(id=review_id).delete()
+        self.assertEqual(self.search('q=cash')['reviews'], [])
+
+
+@override_settings(AUTH_USER_CACHE_TIMEOUT=300)  # as with REDIS_URL or CACHE_DIR
+class AuthCostTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('hasher', password='pw-12345')
+
+    def login(self, client=None):
+        return (client or self.client).post('/djangoapp/login', content_type='application/json',
+                                            data=json.dumps({'userName': 'hasher', 'password': 'pw-12345'})).json()
+
+    def test_new_passwords_use_the_preferred_hasher(self):
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+    def test_old_hash_is_upgraded_on_login(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password('pw-12345', hasher='pbkdf2_sha256'))
+        self.assertEqual(self.login()['status'], 'Authenticated')
+        self.assertTrue(User.objects.get(pk=self.user.pk).password.startswith('scrypt$'))
+        self.assertEqual(self.login(Client())['status'], 'Authenticated')
+
+    def test_argon2_cost_follows_settings(self):
+        self.assertEqual(Argon2PasswordHasher().memory_cost, 19456)
+        with override_settings(ARGON2_MEMORY_COST=65536, ARGON2_TIME_COST=3):
+            self.assertEqual((Argon2PasswordHasher().memory_cost, Argon2PasswordHasher().time_cost), (65536, 3))
+
+    def warm(self):
+        # Any authenticated request loads the session user into the cache.
+        self.client.post('/djangoapp/add_reviews_bulk', content_type='application/json', data='x')
+
+    def test_session_user_is_cached(self):
+        self.login()
+        self.warm()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/djangoapp/logout')
+        self.assertEqual(res.json()['userName'], 'hasher')
+        self.assertFalse([q for q in ctx.captured_queries if 'auth_user' in q['sql']])
+
+    def test_user_changes_evict_the_cache(self):
+        self.login()
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.post('/djangoapp/add_review', content_type='application/json',
+                               data=json.dumps({'dealership': 1, 'review': 'Great'}))
+        self.assertEqual(res.json()['status'], 403)
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_no_user_cache_without_a_shared_cache(self):
+        self.login()
+        self.warm()
+        # Changed by another worker: no eviction reaches this one.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        res = self.client.post('/djangoapp/add_review', content_type='application/json',
+                               data=json.dumps({'dealership': 1, 'review': 'Great'}))
+        self.assertEqual(res.json()['status'], 403)
+
+    def test_sessions_from_model_backend_stay_valid(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get('/djangoapp/logout').json()['userName'], 'hasher')
+
+    def test_wrong_password_is_checked_once(self):
+        with mock.patch.object(User, 'check_password', autospec=True, return_value=False) as check:
+            res = self.client.post('/djangoapp/login', content_type='application/json',
+                                   data=json.dumps({'userName': 'hasher', 'password': 'nope'}))
+        self.assertEqual(res.json()['status'], 'Failed')
+        self.assertEqual(check.call_count, 1)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        self.login()
+        self.warm()
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/djangoapp/logout')
+        self.assertEqual(res.json()['userName'], 'hasher')
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+
+@override_settings(RATE_LIMITS={"login": {"ip": "5/m", "user": "3/m"}, "add_review": {"user": "2/m"}},
+                   EXPENSIVE_CONCURRENCY=2)
+class RateLimitTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user('limited', password='pw')
+
+    def login(self, username='limited', ip='10.0.0.1'):
+        return self.client.post('/djangoapp/login', content_type='application/json', REMOTE_ADDR=ip,
+                                data=json.dumps({'userName': username, 'password': 'wrong'}))
+
+    def test_burst_per_username(self):
+        statuses = [self.login(ip=f'10.0.0.{i}').status_code for i in range(5)]
+        self.assertEqual(statuses, [200, 200, 200, 429, 429])
+        res = self.login(ip='10.0.0.9')
+        self.assertEqual(res.json()['status'], 429)
+        self.assertIn(int(res['Retry-After']), range(1, 61))
+        self.assertEqual(self.login(username='other').status_code, 200)
+
+    def test_burst_per_ip(self):
+        statuses = [self.login(username=f'user{i}').status_code for i in range(7)]
+        self.assertEqual(statuses, [200] * 5 + [429] * 2)
+        self.assertEqual(self.login(username='user9', ip='10.0.0.2').status_code, 200)
+
+    def test_sliding_window(self):
+        for now in (0, 0, 0):
+            self.assertEqual(ratelimit.take('window', '3/m', now=now), 0)
+        self.assertEqual(ratelimit.take('window', '3/m', now=10), 50)
+        # Next window: the 3 earlier requests still count in full, then slide out.
+        self.assertEqual(ratelimit.take('window', '3/m', now=60), 20)
+        self.assertEqual(ratelimit.take('window', '3/m', now=80), 0)
+
+    def test_concurrent_workers_share_the_count(self):
+        # No lock in take(): the count relies on the cache's atomic incr().
+        barrier = threading.Barrier(8)
+
+        def request(_):
+            barrier.wait()
+            return ratelimit.take('shared', '5/m', now=0)
+        with ThreadPoolExecutor(8) as pool:
+            waits = list(pool.map(request, range(8)))
+        self.assertEqual(waits.count(0), 5)
+
+    def test_authenticated_user_bucket(self):
+        init_data()
+        user = User.objects.get(username='limited')
+        self.client.force_login(user)
+        dealer = Dealer.objects.first()
+        body = json.dumps({'dealership': dealer.id, 'review': 'Great'})
+        statuses = [self.client.post('/djangoapp/add_review', body, content_type='application/json').status_code
+                    for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    @override_settings(RATE_LIMIT_PROXIES=1)
+    def test_forwarded_client_address(self):
+        for _ in range(5):
+            self.client.post('/djangoapp/login', content_type='application/json', data='{}',
+                             HTTP_X_FORWARDED_FOR='1.1.1.1, 10.0.0.1')
+        spoofed = self.client.post('/djangoapp/login', content_type='application/json', data='{}',
+                                   HTTP_X_FORWARDED_FOR='2.2.2.2, 10.0.0.1')
+        self.assertEqual(spoofed.status_code, 429)
+
+    def test_concurrency_cap_sheds_load(self):
+        slots = [ratelimit.acquire(), ratelimit.acquire()]  # two requests in flight
+        res = self.login()
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res['Retry-After'], '1')
+        ratelimit.release(slots.pop())
+        self.assertEqual(self.login().status_code, 200)
+        self.assertIsNone(ratelimit.acquire() and ratelimit.acquire())  # the login gave its slot back
+
+    def test_leaked_slot_expires(self):
+        leaked = ratelimit.acquire()  # its worker was killed: never released
+        held = ratelimit.acquire()
+        self.assertIsNone(ratelimit.acquire())
+        cache.delete(leaked[0])  # INFLIGHT_TIMEOUT later
+        late = ratelimit.acquire()
+        self.assertEqual(late[0], leaked[0])
+        ratelimit.release(leaked)  # a late release does not free the new holder's slot
+        self.assertIsNone(ratelimit.acquire())
+        ratelimit.release(held)
+        self.assertIsNotNone(ratelimit.acquire())
+
+
+class SpaShellTest(TestCase):
+    def setUp(self):
+        shell.invalidate()
+
+    def test_shell_from_memory(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/dealers/42')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, render_to_string('index.html').encode())
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertNotIn('Set-Cookie', res.headers)
+        self.assertEqual(res['X-Frame-Options'], 'DENY')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+    def test_gzip_variant_and_etag(self):
+        res = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), render_to_string('index.html').encode())
+        again = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate', HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertNotEqual(self.client.get('/')['ETag'], res['ETag'])
+
+    @unittest.skipIf(shell.brotli is None, "brotli is not installed")
+    def test_brotli_variant(self):
+        res = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(shell.brotli.decompress(res.content), render_to_string('index.html').encode())
+
+    def test_fast_path_only_for_the_catch_all(self):
+        self.assertTrue(shell.is_shell('/login'))
+        self.assertFalse(shell.is_shell('/djangoapp/get_dealers'))
+        self.assertFalse(shell.is_shell('/admin/'))
+        self.assertEqual(self.client.post('/login').status_code, 405)
+        # Unknown API paths still reach the shell through the view.
+        self.assertEqual(self.client.get('/djangoapp/nope').content, self.client.get('/').content)
+
 
 class AuthAPITest(TestCase):
     def setUp(self):
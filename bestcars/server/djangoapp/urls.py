@@ -1,15 +1,27 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Read endpoints: async versions under ASGI (see djangoproj/asgi.py)
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
 
 urlpatterns = [
-    path('get_dealers', views.get_dealerships),
-    path('get_dealers/<str:state>', views.get_dealerships),
-    path('dealer/<int:dealer_id>', views.get_dealer_details),
-    path('reviews/dealer/<int:dealer_id>', views.get_dealer_reviews),
-    path('add_review', views.add_review),
-    path('get_cars', views.get_cars),
-    path('login', views.login_request),
-    path('logout', views.logout_request),
-    path('register', views.registration),
-    path('analyze_review', views.analyze_review_view),
+    path('get_dealers', read_views.get_dealerships, name='get_dealers'),
+    path('get_dealers/<str:state>', read_views.get_dealerships, name='get_dealers_by_state'),
+    path('dealers/nearby', views.get_nearby_dealers, name='dealers_nearby'),
+    path('dealer/<int:dealer_id>', read_views.get_dealer_details, name='dealer_details'),
+    path('reviews/dealer/<int:dealer_id>', read_views.get_dealer_reviews, name='dealer_reviews'),
+    path('reviews/dealer/<int:dealer_id>/changes', read_views.get_review_changes, name='review_changes'),
+    path('reviews/search', views.search_reviews, name='search_reviews'),
+    path('add_review', views.add_review, name='add_review'),
+    path('add_reviews_bulk', views.add_reviews_bulk, name='add_reviews_bulk'),
+    path('get_cars', read_views.get_cars, name='get_cars'),
+    path('login', views.login_request, name='login'),
+    path('logout', views.logout_request, name='logout'),
+    path('register', views.registration, name='register'),
+    path('analyze_review', views.analyze_review_view, name='analyze_review'),
+    path('analyze_reviews', views.analyze_reviews_view, name='analyze_reviews'),
+    path('analytics/sentiment_trend', views.sentiment_trend, name='sentiment_trend'),
+    path('export', read_views.export_data, name='export'),
+    path('metrics', views.metrics_view, name='metrics'),
 ]
@@ -1,43 +1,65 @@
+import base64
+import binascii
+import datetime
 import json
 import logging
-from django.http import JsonResponse
+from functools import partial
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from .models import CarMake, CarModel, Dealer, Review
+from . import cache
+from . import catalog, dump, geo, ingest, jobs, live, metrics, ratelimit, rollups, search, serializers, stats, tasks
+from .models import CarMake, CarModel, Dealer, DealerSentimentRollup, MakeSentimentRollup, Review
+from .sentiment import analyze_sentiment, engine as sentiment_engine
+from .states import canonical_state
 
 logger = logging.getLogger(__name__)
 
 
-# ─── Sentiment Analysis (simple, pas besoin d'IBM) ───────────────────────────
+# ─── Init data ───────────────────────────────────────────────────────────────
 
-def analyze_sentiment(text):
-    if not text:
-        return "neutral"
-    positive = ["great","excellent","amazing","fantastic","wonderful","good","best",
-                "love","perfect","outstanding","superb","awesome","happy","satisfied",
-                "recommend","helpful","friendly","clean","fast","professional","honest"]
-    negative = ["bad","terrible","horrible","awful","worst","hate","poor","disappointing",
-                "unhappy","rude","slow","overpriced","broken","failed","waste","problem",
-                "issue","dishonest","unprofessional","scam","angry","frustrated"]
-    t = text.lower()
-    pos = sum(1 for w in positive if w in t)
-    neg = sum(1 for w in negative if w in t)
-    if pos > neg:
-        return "positive"
-    elif neg > pos:
-        return "negative"
-    return "neutral"
+# Set once this process has seen a seeded database, so request handlers stop
+# paying for the Dealer.objects.exists() round trip.
+_seeded = False
 
 
-# ─── Init data ───────────────────────────────────────────────────────────────
+def init_data(using="default"):
+    """Populate DB with sample data on first run.
+
+    Everything is written with bulk_create inside a single transaction.
+    Returns True when data was inserted, False when the DB was already seeded.
+    """
+    global _seeded
+    if Dealer.objects.using(using).exists():
+        _seeded = True
+        return False
+
+    with transaction.atomic(using=using):
+        _seed(using)
+        stats.rebuild_dealer_stats(using=using)
+        rollups.rebuild(using=using)
+    # bulk_create sends no post_save, so evict the cached responses by hand.
+    cache.invalidate_dealers(Dealer.objects.using(using).values_list("id", flat=True))
+    cache.invalidate_cars()
+    catalog.invalidate()
+    geo.invalidate()
+    _seeded = True
+    return True
+
+
+def ensure_seeded():
+    """Request-path guard: only touches the DB until the process is seeded."""
+    if not _seeded:
+        init_data()
 
-def init_data():
-    """Populate DB with sample data on first run."""
-    if Dealer.objects.exists():
-        return
 
+def _seed(using):
     dealers = [
         {"full_name": "Sunshine Toyota", "short_name": "Sunshine", "address": "123 Main St",
          "city": "Wichita", "state": "Kansas", "st": "KS", "zip_code": "67201", "lat": 37.69, "lng": -97.34},
@@ -60,7 +82,10 @@ def init_data():
         {"full_name": "Sunshine Nissan", "short_name": "Sun Nissan", "address": "900 Beach Rd",
          "city": "Miami", "state": "Florida", "st": "FL", "zip_code": "33101", "lat": 25.77, "lng": -80.19},
     ]
-    dealer_objs = [Dealer.objects.create(**d) for d in dealers]
+    dealer_objs = [Dealer(**d) for d in dealers]
+    for dealer in dealer_objs:
+        dealer.normalize()
+    Dealer.objects.using(using).bulk_create(dealer_objs)
 
     # Reviews
     sample_reviews = [
@@ -77,9 +102,10 @@ def init_data():
         {"dealer": dealer_objs[4], "name": "Emma Davis", "review": "Good selection of cars. The salesman was helpful and patient.",
          "purchase": True, "car_make": "Chevrolet", "car_model": "Equinox", "car_year": 2023},
     ]
-    for r in sample_reviews:
-        r["sentiment"] = analyze_sentiment(r["review"])
-        Review.objects.create(**r)
+    sentiments = sentiment_engine.analyze_batch([r["review"] for r in sample_reviews])
+    for r, sentiment in zip(sample_reviews, sentiments):
+        r["sentiment"] = sentiment
+    Review.objects.using(using).bulk_create([Review(**r) for r in sample_reviews])
 
     # Car makes & models
     makes_data = [
@@ -106,48 +132,267 @@ def init_data():
         ("Nissan", "Altima", "SEDAN", 2023), ("Nissan", "Rogue", "SUV", 2022),
         ("Subaru", "Outback", "SUV", 2023), ("Subaru", "Forester", "SUV", 2022),
     ]
-    make_objs = {}
-    for m in makes_data:
-        obj, _ = CarMake.objects.get_or_create(name=m["name"], defaults={"country": m["country"]})
-        make_objs[m["name"]] = obj
-    for make_name, model_name, car_type, year in models_data:
-        CarModel.objects.get_or_create(
-            car_make=make_objs[make_name], name=model_name,
-            defaults={"car_type": car_type, "year": year}
-        )
+    make_objs = {m.name: m for m in CarMake.objects.using(using).filter(
+        name__in=[m["name"] for m in makes_data])}
+    make_objs.update({m.name: m for m in CarMake.objects.using(using).bulk_create(
+        [CarMake(**m) for m in makes_data if m["name"] not in make_objs])})
+    existing = set(CarModel.objects.using(using).filter(
+        car_make__in=make_objs.values()).values_list("car_make__name", "name"))
+    CarModel.objects.using(using).bulk_create([
+        CarModel(car_make=make_objs[make_name], name=model_name, car_type=car_type, year=year)
+        for make_name, model_name, car_type, year in models_data
+        if (make_name, model_name) not in existing
+    ])
 
 
 # ─── API Views ───────────────────────────────────────────────────────────────
 
-def get_dealerships(request, state="All"):
-    init_data()
+def _flag(request, name):
+    return request.GET.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _dealers_key(request, state="All"):
+    return cache.dealers_key(state, _flag(request, "include_stats"), request.GET.get("fields", ""))
+
+
+def _dealer_queryset(state):
     if state == "All":
-        dealers = Dealer.objects.all()
-    else:
-        dealers = Dealer.objects.filter(state__iexact=state)
-    return JsonResponse({"status": 200, "dealers": [d.to_dict() for d in dealers]})
+        return Dealer.objects.order_by("id")
+    # Full name or postal code, any case: "Kansas", "kansas", "KS".
+    return Dealer.objects.filter(state_key=canonical_state(state)).order_by("id")
 
 
+@cache.cached_json(_dealers_key)
+def get_dealerships(request, state="All"):
+    ensure_seeded()
+    try:
+        ser = serializers.serializer("dealer", request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    dealers = _dealer_queryset(state)
+    if not _flag(request, "include_stats"):
+        return serializers.json_response({"status": 200, "dealers": ser.rows(dealers)})
+    # One LEFT JOIN instead of a reviews/dealer/<id> call per listed dealer.
+    return serializers.json_response({"status": 200, "dealers": serializers.dealer_rows_with_stats(dealers, ser)})
+
+
+NEARBY_MAX_RADIUS_KM = 2000
+NEARBY_MAX_LIMIT = 100
+
+
+def get_nearby_dealers(request):
+    """Dealers within radius_km of (lat, lng), closest first, with distance_km."""
+    ensure_seeded()
+    try:
+        lat = float(request.GET["lat"])
+        lng = float(request.GET["lng"])
+        radius_km = float(request.GET.get("radius_km", 50))
+        limit = int(request.GET.get("limit", 20))
+    except (KeyError, ValueError):
+        return JsonResponse({"status": 400, "message": "lat and lng are required numbers"})
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return JsonResponse({"status": 400, "message": "lat/lng out of range"})
+    radius_km = max(0.0, min(radius_km, NEARBY_MAX_RADIUS_KM))
+    limit = max(1, min(limit, NEARBY_MAX_LIMIT))
+
+    hits = geo.get_index().nearby(lat, lng, radius_km, limit)
+    ser = serializers.serializer("dealer")
+    dealers = {row["id"]: row for row in ser.rows(Dealer.objects.filter(id__in=[i for _, i in hits]))}
+    rows = []
+    for distance, dealer_id in hits:
+        if dealer_id in dealers:
+            row = dealers[dealer_id]
+            row["distance_km"] = round(distance, 2)
+            rows.append(row)
+    return serializers.json_response({"status": 200, "dealers": rows})
+
+
+def _dealer_key(request, dealer_id):
+    return cache.dealer_key(dealer_id, request.GET.get("fields", ""))
+
+
+@cache.cached_json(_dealer_key)
 def get_dealer_details(request, dealer_id):
-    init_data()
+    ensure_seeded()
     try:
-        dealer = Dealer.objects.get(id=dealer_id)
-        return JsonResponse({"status": 200, "dealer": dealer.to_dict()})
-    except Dealer.DoesNotExist:
+        ser = serializers.serializer("dealer", request.GET.get("fields"))
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    rows = ser.rows(Dealer.objects.filter(id=dealer_id))
+    if not rows:
         return JsonResponse({"status": 404, "message": "Dealer not found"})
+    return serializers.json_response({"status": 200, "dealer": rows[0]})
+
+
+REVIEWS_PAGE_MAX = 100
+
+def encode_cursor(created_at, review_id):
+    raw = json.dumps([created_at.isoformat(), review_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) for a cursor made by encode_cursor, or raise ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, review_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(created_at), int(review_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class ReviewFeed:
+    """Parsed review feed request: projection, keyset position and page size."""
+
+    def __init__(self, request, dealer_id):
+        """Raises ValueError on an invalid fields, cursor or limit parameter."""
+        self.ser = serializers.serializer("review", request.GET.get("fields"))
+        self.ndjson = request.GET.get("format") == "ndjson"
+        cursor = request.GET.get("cursor")
+        limit = request.GET.get("limit")
+        self.paginated = cursor is not None or limit is not None
+        try:
+            self.limit = max(1, min(int(limit or REVIEWS_PAGE_MAX), REVIEWS_PAGE_MAX))
+        except ValueError:
+            raise ValueError("Invalid limit")
+        reviews = Review.objects.filter(dealer_id=dealer_id).order_by('-created_at', '-id')
+        if cursor:
+            created_at, review_id = decode_cursor(cursor)
+            reviews = reviews.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=review_id))
+        self.reviews = reviews
+
+    def page_query(self):
+        # Pagination key appended after the projected columns.
+        return self.reviews.values_list(*self.ser.columns, "created_at", "id")[:self.limit + 1]
+
+    def page_payload(self, page):
+        next_cursor = None
+        if len(page) > self.limit:
+            page = page[:self.limit]
+            next_cursor = encode_cursor(page[-1][-2], page[-1][-1])
+        return {"status": 200, "reviews": [self.ser.row(values) for values in page], "next": next_cursor}
 
 
 def get_dealer_reviews(request, dealer_id):
-    init_data()
+    """Reviews of a dealer, newest first.
+
+    Without parameters the whole list is returned. `limit` and/or `cursor`
+    switch to keyset pagination on (created_at, id): the response then carries
+    a `next` cursor (null on the last page). `format=ndjson` streams one review
+    per line from the cursor position onwards.
+    """
+    ensure_seeded()
     try:
-        dealer = Dealer.objects.get(id=dealer_id)
-        reviews = Review.objects.filter(dealer=dealer).order_by('-created_at')
-        return JsonResponse({"status": 200, "reviews": [r.to_dict() for r in reviews]})
-    except Dealer.DoesNotExist:
+        feed = ReviewFeed(request, dealer_id)
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    if not Dealer.objects.filter(id=dealer_id).exists():
         return JsonResponse({"status": 404, "message": "Dealer not found"})
 
+    if feed.ndjson:
+        lines = (serializers.dumps(r) + b"\n" for r in feed.ser.rows(feed.reviews, chunk_size=500))
+        return StreamingHttpResponse(lines, content_type="application/x-ndjson")
+    if not feed.paginated:
+        return serializers.json_response({"status": 200, "reviews": feed.ser.rows(feed.reviews)})
+    return serializers.json_response(feed.page_payload(list(feed.page_query())))
+
+
+class ReviewChanges:
+    """Parsed change-feed request: a dealer's reviews with an id above since_id, oldest first."""
+
+    def __init__(self, request, dealer_id):
+        """Raises ValueError on an invalid fields, since_id or limit parameter."""
+        self.ser = serializers.serializer("review", request.GET.get("fields"))
+        # EventSource sends the id of the last event it got when it reconnects.
+        since_id = request.GET.get("since_id", request.headers.get("Last-Event-ID"))
+        try:
+            self.since_id = int(since_id)
+        except (TypeError, ValueError):
+            raise ValueError("since_id must be a review id")
+        try:
+            self.limit = max(1, min(int(request.GET.get("limit") or REVIEWS_PAGE_MAX), REVIEWS_PAGE_MAX))
+        except ValueError:
+            raise ValueError("Invalid limit")
+        self.stream = (request.GET.get("format") == "sse"
+                       or "text/event-stream" in request.headers.get("Accept", ""))
+        self.dealer_id = dealer_id
+
+    def reviews(self, since_id):
+        # Range scan of review_dealer_id_idx.
+        return Review.objects.filter(dealer_id=self.dealer_id, id__gt=since_id).order_by("id")
+
+    def query(self, since_id):
+        # One extra row tells if there are more.
+        return self.reviews(since_id).values_list(*self.ser.columns, "id")[:self.limit + 1]
+
+    def payload(self, rows):
+        more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        return {"status": 200, "reviews": [self.ser.row(values) for values in rows],
+                "last_id": rows[-1][-1] if rows else self.since_id, "more": more}
+
+
+def get_review_changes(request, dealer_id):
+    """Reviews of a dealer newer than `since_id`, oldest first, at most `limit`.
+
+    Poll with the returned `last_id` as the next since_id; `more` says that
+    another page is waiting. The live (Server-Sent Events) version of this
+    feed, `format=sse`, is served by the ASGI deployment only.
+    """
+    try:
+        changes = ReviewChanges(request, dealer_id)
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    if changes.stream:
+        return JsonResponse({"status": 501, "message": "Live updates need the ASGI server; poll with since_id"})
+    if not Dealer.objects.filter(id=dealer_id).exists():
+        return JsonResponse({"status": 404, "message": "Dealer not found"})
+    return serializers.json_response(changes.payload(list(changes.query(changes.since_id))))
+
+
+def search_reviews(request):
+    """Reviews containing every word of `q`, best match first.
+
+    Optional `state` (name or code) and `sentiment` filters; pages of `limit`
+    reviews with a `next` cursor, as reviews/dealer/<id>. Each review carries
+    its `rank`.
+    """
+    ensure_seeded()
+    words = search.terms(request.GET.get("q"))
+    if not words:
+        return JsonResponse({"status": 400, "message": "q is required"})
+    sentiment = request.GET.get("sentiment") or None
+    if sentiment and sentiment not in dict(Review.SENTIMENT_CHOICES):
+        return JsonResponse({"status": 400, "message": "Invalid sentiment"})
+    state = request.GET.get("state")
+    try:
+        ser = serializers.serializer("review", request.GET.get("fields"))
+        limit = max(1, min(int(request.GET.get("limit") or 20), REVIEWS_PAGE_MAX))
+        cursor = request.GET.get("cursor")
+        after = search.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+
+    hits = search.search(words, state=canonical_state(state) if state else None,
+                         sentiment=sentiment, limit=limit + 1, after=after)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last_id, last_rank = hits[-1]
+        next_cursor = search.encode_cursor(last_rank, last_id)
+    # id appended after the projected columns, ignored by ser.row()
+    rows = {values[-1]: ser.row(values) for values in
+            Review.objects.filter(id__in=[review_id for review_id, _ in hits]).values_list(*ser.columns, "id")}
+    reviews = []
+    for review_id, rank in hits:
+        if review_id in rows:
+            rows[review_id]["rank"] = round(rank, 6)
+            reviews.append(rows[review_id])
+    return serializers.json_response({"status": 200, "reviews": reviews, "next": next_cursor})
+
 
 @csrf_exempt
+@ratelimit.limit("add_review")
 def add_review(request):
     if request.method != "POST":
         return JsonResponse({"status": 405, "message": "Method not allowed"})
@@ -159,7 +404,6 @@ def add_review(request):
         review_text = data.get("review", "")
         sentiment = analyze_sentiment(review_text)
 
-        import datetime
         purchase_date = None
         pd_str = data.get("purchase_date", "")
         if pd_str:
@@ -168,18 +412,22 @@ def add_review(request):
             except:
                 pass
 
-        review = Review.objects.create(
-            dealer=dealer,
-            user=request.user,
-            name=f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username,
-            review=review_text,
-            purchase=data.get("purchase", False),
-            purchase_date=purchase_date,
-            car_make=data.get("car_make", ""),
-            car_model=data.get("car_model", ""),
-            car_year=data.get("car_year") or None,
-            sentiment=sentiment,
-        )
+        with transaction.atomic():
+            review = Review.objects.create(
+                dealer=dealer,
+                user=request.user,
+                name=f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username,
+                review=review_text,
+                purchase=data.get("purchase", False),
+                purchase_date=purchase_date,
+                car_make=data.get("car_make", ""),
+                car_model=data.get("car_model", ""),
+                car_year=data.get("car_year") or None,
+                sentiment=sentiment,
+            )
+            # Stats and whatever else follows a new review run in the background.
+            jobs.enqueue("review_added", key=f"review_added:{review.id}", **tasks.review_added_payload(review))
+            transaction.on_commit(partial(live.publish, [dealer.id]))
         return JsonResponse({"status": 200, "review": review.to_dict()})
     except Dealer.DoesNotExist:
         return JsonResponse({"status": 404, "message": "Dealer not found"})
@@ -188,7 +436,31 @@ def add_review(request):
         return JsonResponse({"status": 500, "message": str(e)})
 
 
+BULK_REVIEWS_MAX = 5000
+
+
+@csrf_exempt
+@ratelimit.limit("add_reviews_bulk")
+def add_reviews_bulk(request):
+    """POST a JSON array of reviews (add_review format); returns a per-row error report."""
+    if request.method != "POST":
+        return JsonResponse({"status": 405, "message": "Method not allowed"})
+    if not request.user.is_authenticated:
+        return JsonResponse({"status": 403, "message": "Unauthorized"})
+    try:
+        rows = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"status": 400, "message": "Invalid JSON"})
+    if not isinstance(rows, list):
+        return JsonResponse({"status": 400, "message": "Expected a JSON array of reviews"})
+    if len(rows) > BULK_REVIEWS_MAX:
+        return JsonResponse({"status": 413, "message": f"At most {BULK_REVIEWS_MAX} reviews per call"})
+    result = ingest.ingest_reviews(rows, user=request.user)
+    return JsonResponse({"status": 200, **result})
+
+
 @csrf_exempt
+@ratelimit.limit("login")
 def login_request(request):
     if request.method != "POST":
         return JsonResponse({"status": 405})
@@ -218,6 +490,7 @@ def logout_request(request):
 
 
 @csrf_exempt
+@ratelimit.limit("register")
 def registration(request):
     if request.method != "POST":
         return JsonResponse({"status": 405})
@@ -233,7 +506,7 @@ def registration(request):
             email=data.get("email", ""),
             password=data.get("password", ""),
         )
-        login(request, user)
+        login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
         return JsonResponse({
             "userName": username,
             "status": "Authenticated",
@@ -245,15 +518,109 @@ def registration(request):
         return JsonResponse({"status": "Error", "message": str(e)})
 
 
+def _cars_key(request):
+    return cache.cars_key([(name, request.GET.get(name, "")) for name in catalog.FILTERS])
+
+
+def _car_filters(request):
+    """get_cars filters from the query string; raises ValueError on a bad year."""
+    filters = {name: request.GET.get(name) or None for name in catalog.FILTERS}
+    for name in ("year_min", "year_max"):
+        if filters[name] is not None:
+            try:
+                filters[name] = int(filters[name])
+            except ValueError:
+                raise ValueError("year_min/year_max must be integers")
+    return filters
+
+
+def _cars_payload(entries):
+    return {
+        "CarModels": [{
+            "CarMake": e.make,
+            "CarModel": e.model,
+            "CarType": e.type_display,
+            "ModelYear": e.year,
+        } for e in entries],
+        "facets": catalog.CatalogSnapshot.facets(entries),
+    }
+
+
+@cache.cached_json(_cars_key)
 def get_cars(request):
-    init_data()
-    cars = CarModel.objects.select_related('car_make').all()
-    return JsonResponse({"CarModels": [{
-        "CarMake": c.car_make.name,
-        "CarModel": c.name,
-        "CarType": c.get_car_type_display(),
-        "ModelYear": c.year,
-    } for c in cars]})
+    """Car models, filtered by make, car_type, year_min, year_max, country and q.
+
+    `facets` counts the matching models per make, per type and per year.
+    """
+    ensure_seeded()
+    try:
+        filters = _car_filters(request)
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+    return serializers.json_response(_cars_payload(catalog.get_snapshot().search(**filters)))
+
+
+TREND_MAX_BUCKETS = {"day": 731, "month": 120}
+TREND_DEFAULT_DAYS = {"day": 90, "month": 730}
+
+
+def _trend_range(request, period):
+    try:
+        end = datetime.date.fromisoformat(request.GET["end"]) if request.GET.get("end") else timezone.localdate()
+        start = (datetime.date.fromisoformat(request.GET["start"]) if request.GET.get("start")
+                 else end - datetime.timedelta(days=TREND_DEFAULT_DAYS[period]))
+    except ValueError:
+        raise ValueError("start and end must be YYYY-MM-DD dates")
+    start, end = rollups.bucket(start, period), rollups.bucket(end, period)
+    buckets = []
+    while start <= end:
+        buckets.append(start)
+        start = rollups.next_month(start) if period == "month" else start + datetime.timedelta(days=1)
+        if len(buckets) > TREND_MAX_BUCKETS[period]:
+            raise ValueError(f"At most {TREND_MAX_BUCKETS[period]} {period} buckets per request")
+    return buckets
+
+
+def sentiment_trend(request):
+    """Review counts by sentiment per day or month (`period`), from the rollup tables only.
+
+    Scope: one of `dealer` (id), `state` (name or code) or `make`; all dealers
+    without. `start` / `end` (YYYY-MM-DD) default to the last two years of
+    months or the last 90 days. Buckets without reviews are returned as zeros.
+    """
+    period = request.GET.get("period", "month")
+    if period not in TREND_MAX_BUCKETS:
+        return JsonResponse({"status": 400, "message": "period must be day or month"})
+    scopes = [name for name in ("dealer", "state", "make") if request.GET.get(name)]
+    if len(scopes) > 1:
+        return JsonResponse({"status": 400, "message": "Use only one of dealer, state and make"})
+    try:
+        buckets = _trend_range(request, period)
+    except ValueError as e:
+        return JsonResponse({"status": 400, "message": str(e)})
+
+    rows = DealerSentimentRollup.objects.all()
+    if scopes == ["dealer"]:
+        try:
+            dealer_id = int(request.GET["dealer"])
+        except ValueError:
+            return JsonResponse({"status": 400, "message": "dealer must be an id"})
+        rows = rows.filter(dealer_id=dealer_id)
+    elif scopes == ["state"]:
+        rows = rows.filter(dealer__state_key=canonical_state(request.GET["state"]))
+    elif scopes == ["make"]:
+        rows = MakeSentimentRollup.objects.filter(car_make__iexact=request.GET["make"])
+    rows = (rows.filter(period=period, bucket__gte=buckets[0], bucket__lte=buckets[-1])
+            .values("bucket").order_by("bucket")
+            .annotate(reviews=Sum("review_count"), positive=Sum("positive_count"),
+                      negative=Sum("negative_count"), neutral=Sum("neutral_count")))
+    found = {row.pop("bucket"): row for row in rows}
+    empty = {"reviews": 0, "positive": 0, "negative": 0, "neutral": 0}
+    return serializers.json_response({
+        "status": 200,
+        "period": period,
+        "trend": [{"bucket": day.isoformat(), **found.get(day, empty)} for day in buckets],
+    })
 
 
 def analyze_review_view(request):
@@ -262,3 +629,61 @@ def analyze_review_view(request):
         return JsonResponse({"status": 400, "message": "No text provided"})
     sentiment = analyze_sentiment(text)
     return JsonResponse({"status": 200, "sentiment": sentiment, "text": text})
+
+
+ANALYZE_BATCH_MAX = 10000
+
+
+@csrf_exempt
+def analyze_reviews_view(request):
+    """POST a JSON array of texts, get their sentiments back in the same order."""
+    if request.method != "POST":
+        return JsonResponse({"status": 405, "message": "Method not allowed"})
+    try:
+        texts = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"status": 400, "message": "Invalid JSON"})
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return JsonResponse({"status": 400, "message": "Expected a JSON array of strings"})
+    if len(texts) > ANALYZE_BATCH_MAX:
+        return JsonResponse({"status": 413, "message": f"At most {ANALYZE_BATCH_MAX} texts per call"})
+    return JsonResponse({"status": 200, "sentiments": sentiment_engine.analyze_batch(texts)})
+
+
+def export_request(request):
+    """(Dump, None) for a staff request with valid parameters, else (None, error response)."""
+    if not request.user.is_staff:
+        return None, JsonResponse({"status": 403, "message": "Staff only"})
+    try:
+        return dump.Dump.from_params(request.GET), None
+    except ValueError as e:
+        return None, JsonResponse({"status": 400, "message": str(e)})
+
+
+def export_response(export, chunks):
+    response = StreamingHttpResponse(chunks, content_type=export.content_type)
+    response["Content-Disposition"] = f'attachment; filename="{export.filename}"'
+    return response
+
+
+def export_data(request):
+    """Staff-only bulk export of reviews or dealers (see djangoapp/dump.py), streamed.
+
+    `kind` reviews|dealers, `format` ndjson|csv, `gzip=1`; filters `since`
+    (reviews), `dealer`, `state`; `after_id` resumes after the last id received.
+    """
+    export, error = export_request(request)
+    if error:
+        return error
+    return export_response(export, export.chunks())
+
+
+def metrics_view(request):
+    """Per-route request metrics in the Prometheus text format."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return JsonResponse({"status": 401, "message": "Unauthorized"})
+    body = metrics.registry.render()
+    if jobs.mode() == "db":
+        body += jobs.render_metrics()
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,9 @@
+import os
+from django.core.asgi import get_asgi_application
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
+application = get_asgi_application()
+
+# Render the SPA shell now rather than on the first request
+from djangoapp import shell  # noqa: E402
+shell.variants()
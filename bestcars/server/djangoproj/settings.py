@@ -41,6 +41,12 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    # The pre-rendered index.html shell, served without sessions or CSRF
+    "djangoapp.shell.ShellMiddleware",
+    # After WhiteNoise: static files are not measured
+    "djangoapp.middleware.MetricsMiddleware",
+    # Before SessionMiddleware: saving the session counts as a write
+    "djangoapp.middleware.ReplicaPinMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -52,6 +58,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = "djangoproj.urls"
 WSGI_APPLICATION = "djangoproj.wsgi.application"
+ASGI_APPLICATION = "djangoproj.asgi.application"
+
+# Serve the read endpoints with the async views (set by djangoproj/asgi.py)
+ASYNC_READ_VIEWS = os.environ.get("ASYNC_READ_VIEWS", "False") == "True"
 
 # ─────────────────────────────────────────────────────
 # Templates
@@ -75,30 +85,175 @@ TEMPLATES = [
 # ─────────────────────────────────────────────────────
 # Database (SQLite local / PostgreSQL Render)
 # ─────────────────────────────────────────────────────
+# Persistent connections: reused for DB_CONN_MAX_AGE seconds per worker and
+# checked before reuse (CONN_HEALTH_CHECKS).
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "600"))
+# Behind pgbouncer in transaction pooling mode: server-side cursors cannot
+# outlive a transaction there, so .iterator() falls back to client-side ones.
+DB_PGBOUNCER = os.environ.get("DB_PGBOUNCER", "False") == "True"
+# SQLite: how long a writer waits for the lock, used for both the sqlite3
+# module timeout and PRAGMA busy_timeout (which would otherwise override it).
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "20000"))
+
 if "RENDER" in os.environ:
     # PostgreSQL sur Render
     DATABASES = {
         "default": dj_database_url.parse(
             os.environ.get("DATABASE_URL"),
-            conn_max_age=600,
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=True,
             ssl_require=True
         )
     }
+    if DB_PGBOUNCER:
+        DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
 else:
     # SQLite en local
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
         }
     }
 
+# Read replicas: DATABASE_REPLICA_URLS="postgres://...,postgres://..."
+# (or sqlite:////path/to/replica.sqlite3 locally). Reads go to a replica,
+# writes to "default"; a client that wrote reads from the primary for the
+# next REPLICA_PIN_SECONDS (djangoapp/routers.py).
+DATABASE_REPLICAS = []
+for _i, _url in enumerate(u.strip() for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u.strip()):
+    _alias = f"replica{_i + 1}"
+    DATABASES[_alias] = dj_database_url.parse(
+        _url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+        ssl_require="RENDER" in os.environ and not _url.startswith("sqlite"),
+    )
+    DATABASES[_alias]["TEST"] = {"MIRROR": "default"}
+    DATABASE_REPLICAS.append(_alias)
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["djangoapp.routers.PrimaryReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "5"))
+
+# PRAGMAs run on every new SQLite connection (djangoapp/db.py). WAL lets
+# readers work during a write, busy_timeout makes writers wait for the lock
+# instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": "NORMAL",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024))),
+}
+
+# Seed the sample dealers/reviews/cars right after `migrate`
+# (also available as `python manage.py seed_data`)
+SEED_DATA_ON_MIGRATE = os.environ.get("SEED_DATA_ON_MIGRATE", "True") == "True"
+
+# ─────────────────────────────────────────────────────
+# Cache (locmem by default, file or Redis from the environment)
+# locmem is per process: with several workers, use CACHE_DIR or REDIS_URL
+# so that evictions reach every worker.
+# ─────────────────────────────────────────────────────
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+elif os.environ.get("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Cached API responses (get_dealers, dealer/<id>, get_cars)
+API_CACHE_ALIAS = "default"
+API_CACHE_TIMEOUT = int(os.environ.get("API_CACHE_TIMEOUT", "3600"))
+
+# Seconds before the in-process "dealers near me" index is rebuilt, so that
+# dealer changes made by other workers are picked up
+GEO_INDEX_TTL = int(os.environ.get("GEO_INDEX_TTL", "300"))
+
+# Same for the in-process car catalog snapshot behind get_cars
+CATALOG_TTL = int(os.environ.get("CATALOG_TTL", "300"))
+
+# ─────────────────────────────────────────────────────
+# Rate limiting (djangoapp/ratelimit.py: login, register, add_review)
+# ─────────────────────────────────────────────────────
+# Sliding windows per IP and per username, "n/s|m|h|d". Kept in the API
+# cache: per process with locmem, shared with REDIS_URL or CACHE_DIR.
+# Off under manage.py test (djangoproj/test_runner.py) and in the benchmarks,
+# which send their bursts from 127.0.0.1; RateLimitTest turns them on.
+RATE_LIMITS = {
+    "login": {"ip": "20/m", "user": "5/m"},
+    "register": {"ip": "5/h"},
+    "add_review": {"ip": "30/m", "user": "10/m"},
+    "add_reviews_bulk": {"ip": "10/m", "user": "5/m"},
+}
+if os.environ.get("RATE_LIMITS_OFF") == "True":
+    RATE_LIMITS = {}
+TEST_RUNNER = "djangoproj.test_runner.DiscoverRunner"
+# Trusted proxies in front of the app (Render: 1), which append the client
+# address to X-Forwarded-For
+RATE_LIMIT_PROXIES = int(os.environ.get("RATE_LIMIT_PROXIES", "1" if "RENDER" in os.environ else "0"))
+# Write requests in flight at once (all workers with a shared cache); beyond
+# it they are answered 503 + Retry-After instead of queuing. 0 disables
+EXPENSIVE_CONCURRENCY = int(os.environ.get("EXPENSIVE_CONCURRENCY", "8"))
+
+# ─────────────────────────────────────────────────────
+# Background jobs (djangoapp/jobs.py)
+# ─────────────────────────────────────────────────────
+# "db": a queue in the database, run by `manage.py run_jobs` (the Procfile
+# worker). "inline" runs each job at once in the request (tests, local dev).
+JOBS_MODE = os.environ.get("JOBS_MODE", "db" if "RENDER" in os.environ else "inline")
+JOBS_WORKER_THREADS = int(os.environ.get("JOBS_WORKER_THREADS", "4"))
+JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", "5"))
+# Seconds before the first retry, doubled on each further attempt
+JOBS_RETRY_DELAY = int(os.environ.get("JOBS_RETRY_DELAY", "10"))
+# Jobs "running" for longer belong to a dead worker and are queued again
+JOBS_TIMEOUT = int(os.environ.get("JOBS_TIMEOUT", "300"))
+
+# ─────────────────────────────────────────────────────
+# Live review feed (reviews/dealer/<id>/changes?format=sse, ASGI only)
+# ─────────────────────────────────────────────────────
+# "local": broadcast within the process. "db" also polls the Review table
+# every LIVE_POLL_SECONDS while streams are open, for several workers.
+LIVE_BACKEND = os.environ.get("LIVE_BACKEND", "local")
+LIVE_POLL_SECONDS = float(os.environ.get("LIVE_POLL_SECONDS", "2"))
+LIVE_KEEPALIVE_SECONDS = 15
+# Streams are closed after this; EventSource reconnects with Last-Event-ID
+LIVE_STREAM_SECONDS = int(os.environ.get("LIVE_STREAM_SECONDS", "300"))
+
+# ─────────────────────────────────────────────────────
+# Metrics (djangoapp/metrics, Server-Timing, slow-request log)
+# ─────────────────────────────────────────────────────
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "True") == "True"
+# Requests slower than this (ms) are logged with their SQL; 0 disables
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", "500"))
+# If set, GET djangoapp/metrics needs "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
 # ─────────────────────────────────────────────────────
 # Static files
 # ─────────────────────────────────────────────────────
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "frontend" / "static"]
+# collectstatic writes hashed names plus .gz and, with the Brotli package
+# (requirements.txt), .br files; WhiteNoise serves the hashed names with
+# "max-age=315360000, public, immutable".
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # ─────────────────────────────────────────────────────
@@ -114,6 +269,43 @@ SESSION_COOKIE_SAMESITE = "Lax"
 CSRF_COOKIE_SAMESITE = "Lax"
 SESSION_COOKIE_AGE = 86400
 
+# Session storage: "cached_db" (cache + DB, reads without an SQL query)
+# or "signed_cookies" (no server-side storage at all; logout cannot revoke a
+# copied cookie before it expires). "db" is Django's default.
+SESSION_STRATEGY = os.environ.get("SESSION_STRATEGY", "cached_db")
+SESSION_ENGINE = f"django.contrib.sessions.backends.{SESSION_STRATEGY}"
+
+# Session users are cached too (djangoapp/backends.py), only in a cache shared
+# by every worker: evicting a user whose password changed must reach them all.
+# ModelBackend stays listed for the sessions opened with it (it never checks a
+# password: CachedModelBackend stops at a wrong one).
+AUTHENTICATION_BACKENDS = [
+    "djangoapp.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get(
+    "AUTH_USER_CACHE_TIMEOUT", "300" if os.environ.get("REDIS_URL") or os.environ.get("CACHE_DIR") else "0"))
+
+# Password hashing: "scrypt" (default), "argon2" (argon2-cffi) or
+# "pbkdf2". The others stay listed to verify older hashes, which are
+# re-hashed with the preferred one on the next login.
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt")
+if PASSWORD_HASHER == "argon2":
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        PASSWORD_HASHER = "scrypt"
+_HASHERS = {
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+    "argon2": "djangoapp.hashers.Argon2PasswordHasher",
+    "pbkdf2": "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [h for k, h in _HASHERS.items() if k != PASSWORD_HASHER] + [
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+ARGON2_TIME_COST = int(os.environ.get("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.environ.get("ARGON2_MEMORY_COST", "19456"))  # KiB
+
 # ─────────────────────────────────────────────────────
 # Internationalization
 # ─────────────────────────────────────────────────────
@@ -0,0 +1,15 @@
+from django.test.runner import DiscoverRunner as BaseRunner
+from django.test.utils import override_settings
+
+
+class DiscoverRunner(BaseRunner):
+    """manage.py test with the rate limits off; the tests that need them set RATE_LIMITS."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._no_limits = override_settings(RATE_LIMITS={})
+        self._no_limits.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._no_limits.disable()
+        super().teardown_test_environment(**kwargs)
@@ -2,3 +2,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangoproj.settings')
 application = get_wsgi_application()
+
+# Render the SPA shell now rather than on the first request
+from djangoapp import shell  # noqa: E402
+shell.variants()